@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Collects location samples into location_batch frames
+
+The batcher does not own a timer. Callers add samples as they are produced and
+schedule a flush for when the window expires (see next_flush_in), so it can be
+driven from a thread or from an asyncio loop alike.
+"""
+import threading
+import time
+
+import robot_protocol as protocol
+
+
+class LocationBatcher:
+    """Buffers location samples until flush_window seconds or max_points samples"""
+
+    def __init__(self, flush_window=0.05, max_points=10, location_type="location", clock=time.monotonic):
+        if flush_window <= 0 and max_points < 1:
+            raise ValueError("a batch needs a flush window or a maximum size")
+        self.flush_window = flush_window
+        self.max_points = max_points
+        self.location_type = location_type
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._points = []
+        self._opened = None  # When the first sample of the pending batch was added
+        self.batches = 0
+        self.samples = 0
+
+    @property
+    def pending(self):
+        return len(self._points)
+
+    def add(self, lat, lng, direction, timestamp=None):
+        """Add a sample; returns a location_batch message if the batch is now due"""
+        point = {
+            "lat": lat,
+            "lng": lng,
+            "direction": direction,
+            "timestamp": timestamp or protocol.timestamp()
+        }
+        with self._lock:
+            if not self._points:
+                self._opened = self.clock()
+            self._points.append(point)
+            if self._is_due():
+                return self._take()
+        return None
+
+    def next_flush_in(self):
+        """Seconds until the pending batch is due, or None if nothing is pending"""
+        with self._lock:
+            if not self._points:
+                return None
+            return max(0.0, self._opened + self.flush_window - self.clock())
+
+    def flush_if_due(self):
+        with self._lock:
+            if self._points and self._is_due():
+                return self._take()
+        return None
+
+    def flush(self):
+        """Return the pending samples as a batch (None if empty), regardless of age"""
+        with self._lock:
+            if self._points:
+                return self._take()
+        return None
+
+    def _is_due(self):
+        if self.max_points and len(self._points) >= self.max_points:
+            return True
+        return self.flush_window > 0 and self.clock() - self._opened >= self.flush_window
+
+    def _take(self):
+        points, self._points = self._points, []
+        self._opened = None
+        self.batches += 1
+        self.samples += len(points)
+        return protocol.location_batch_message(points, self.location_type)
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""Benchmark the client's send and receive paths against a local stand-in server
+
+Drives send_message, send_location_auto, on_message dispatch and log_message at
+increasing rates and reports, for every scenario and rate, the achieved
+throughput, latency percentiles, CPU time and peak Python memory as JSON.
+Nothing leaves localhost.
+
+    python benchmarks/bench_client.py --rates 100,1000,5000 --duration 3 --output bench.json
+    python benchmarks/bench_client.py --compare bench.json --threshold 15
+
+The client needs a Tk root; on a headless machine run it under xvfb-run.
+CPU time excludes the stand-in server thread. tracemalloc is on by default for
+the memory numbers, which slows every scenario by the same factor; pass
+--no-tracemalloc for raw throughput.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tkinter as tk
+
+import robot_protocol as protocol
+import scheduler
+from standin_server import StandInServer
+from websocket_react_client import WebSocketReactClient
+
+SCENARIOS = ("log_message", "on_message", "send_message", "send_location_auto", "receive")
+UI_PUMP_INTERVAL = 0.02  # How often the Tk event loop is pumped while a scenario runs
+
+
+def latency_summary(samples):
+    """Latency percentiles in microseconds"""
+    samples = sorted(samples)
+    return {
+        "count": len(samples),
+        "p50_us": scheduler.percentile(samples, 50) * 1000000,
+        "p95_us": scheduler.percentile(samples, 95) * 1000000,
+        "p99_us": scheduler.percentile(samples, 99) * 1000000,
+        "max_us": (samples[-1] * 1000000) if samples else 0.0
+    }
+
+
+class ClientBench:
+    """Runs each scenario against one client instance and one stand-in server"""
+
+    def __init__(self, duration, trace_memory=True):
+        self.duration = duration
+        self.trace_memory = trace_memory
+
+        self.server = StandInServer().start()
+        self.root = tk.Tk()
+        self.root.withdraw()
+        self.app = WebSocketReactClient(self.root)
+        self._last_pump = 0.0
+
+    def pump(self, force=False):
+        now = time.perf_counter()
+        if force or now - self._last_pump >= UI_PUMP_INTERVAL:
+            self._last_pump = now
+            self.root.update()
+
+    def wait_for(self, condition, timeout=10.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                return False
+            self.pump(force=True)
+            time.sleep(0.005)
+        return True
+
+    def connect(self):
+        if self.app.connected:
+            return
+        self.app.url_var.set(self.server.url)
+        self.app.connect()
+        if not self.wait_for(lambda: self.app.connected):
+            raise RuntimeError(f"client did not connect to {self.server.url}")
+
+    def drain(self):
+        """Wait until everything queued has reached the server, then settle the UI"""
+        self.wait_for(lambda: self.app.outbound_queue.depth == 0)
+        time.sleep(0.05)
+        self.pump(force=True)
+
+    def measure(self, rate, body):
+        """Run body(rate) and wrap it with CPU and memory accounting"""
+        self.server.reset()
+        self.pump(force=True)
+        if self.trace_memory:
+            tracemalloc.start()
+            tracemalloc.reset_peak()
+        server_cpu = self.server.thread_cpu_time()
+        cpu = time.process_time()
+        wall = time.perf_counter()
+
+        result = body(rate)
+
+        wall = time.perf_counter() - wall
+        cpu = (time.process_time() - cpu) - (self.server.thread_cpu_time() - server_cpu)
+        peak = 0
+        if self.trace_memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+        count = result.pop("count")
+        result.update({
+            "target_rate": rate,
+            "messages": count,
+            "throughput_per_s": count / result.pop("elapsed", wall),
+            "cpu_s": cpu,
+            "cpu_per_message_us": (cpu / count * 1000000) if count else 0.0,
+            "peak_memory_kb": peak / 1024
+        })
+        return result
+
+    def run_at_rate(self, rate, call):
+        """Call call(seq) at rate per second for the configured duration"""
+        timer = scheduler.FixedRateScheduler(1.0 / rate, policy=scheduler.DROP)
+        latencies = []
+        seq = 0
+        end = time.monotonic() + self.duration
+
+        def tick():
+            nonlocal seq
+            started = time.perf_counter()
+            call(seq)
+            latencies.append(time.perf_counter() - started)
+            seq += 1
+            self.pump()
+            return time.monotonic() < end
+
+        timer.run(tick)
+        stats = timer.stats()
+        return {
+            "count": seq,
+            "elapsed": stats["elapsed_s"] or self.duration,
+            "call_latency": latency_summary(latencies),
+            "schedule_jitter_p95_ms": stats["jitter_p95_ms"]
+        }
+
+    # Scenarios
+
+    def bench_log_message(self, rate):
+        payload = protocol.location_message(37.7749, -122.4194, 90.0)
+        return self.run_at_rate(rate, lambda seq: self.app.log_message("INFO", "📨 Benchmark entry: ", payload))
+
+    def bench_on_message(self, rate):
+        frame = json.dumps({
+            "type": "robot_location",
+            "robotId": "bench",
+            "data": {"lat": 37.7749, "lng": -122.4194, "direction": 90.0}
+        })
+        result = self.run_at_rate(rate, lambda seq: self.app.on_message(None, frame))
+        self.pump(force=True)
+        return result
+
+    def bench_send_message(self, rate):
+        self.connect()
+        sent_at = {}
+
+        def send(seq):
+            message = protocol.status_message()
+            message["benchSeq"] = seq
+            sent_at[seq] = time.perf_counter()
+            self.app.send_message(message)
+
+        result = self.run_at_rate(rate, send)
+        self.drain()
+        delivered = []
+        for arrived, frame in self.server.arrivals:
+            if isinstance(frame, str) and '"benchSeq"' in frame:
+                seq = json.loads(frame).get("benchSeq")
+                if seq in sent_at:
+                    delivered.append(arrived - sent_at[seq])
+        result["delivery_latency"] = latency_summary(delivered)
+        return result
+
+    def bench_send_location_auto(self, rate):
+        self.connect()
+        sent_at = {}
+
+        def send(seq):
+            # Encode the sequence number in the latitude so arrivals can be matched
+            lat = round(10.0 + seq * 0.000001, 6)
+            sent_at[lat] = time.perf_counter()
+            # send_location_auto runs on the event loop in the client
+            self.app.loop.call(self.app.send_location_auto, lat, -122.4194)
+
+        result = self.run_at_rate(rate, send)
+        self.drain()
+        delivered = []
+        for arrived, frame in self.server.arrivals:
+            if isinstance(frame, str) and '"location"' in frame:
+                lat = round(json.loads(frame)["data"]["lat"], 6)
+                if lat in sent_at:
+                    delivered.append(arrived - sent_at[lat])
+        result["delivery_latency"] = latency_summary(delivered)
+        result["coalesced"] = result["count"] - len(delivered)
+        return result
+
+    def bench_receive(self, rate):
+        self.connect()
+        latencies = []
+        original = self.app.on_message
+
+        def timed_on_message(ws, event_data):
+            original(ws, event_data)
+            sent = json.loads(event_data).get("benchT") if isinstance(event_data, str) else None
+            if sent is not None:
+                latencies.append(time.perf_counter() - sent)
+
+        # The receive loop looks up on_message for every frame
+        self.app.on_message = timed_on_message
+        broadcaster = {}
+
+        def broadcast():
+            broadcaster["count"] = self.server.broadcast_at_rate(
+                lambda seq: json.dumps({
+                    "type": "robot_location",
+                    "robotId": "bench",
+                    "data": {"lat": 37.7749, "lng": -122.4194, "direction": 90.0},
+                    "benchT": time.perf_counter()
+                }),
+                rate,
+                self.duration
+            )
+
+        started = time.perf_counter()
+        thread = threading.Thread(target=broadcast, daemon=True)
+        thread.start()
+        while thread.is_alive():
+            self.pump(force=True)
+            time.sleep(UI_PUMP_INTERVAL)
+        self.wait_for(lambda: len(latencies) >= broadcaster.get("count", 0), timeout=5)
+        elapsed = time.perf_counter() - started
+        del self.app.on_message
+        return {
+            "count": len(latencies),
+            "elapsed": elapsed,
+            "receive_to_handled_latency": latency_summary(latencies)
+        }
+
+    def run(self, scenarios, rates):
+        results = {}
+        for name in scenarios:
+            bench = getattr(self, f"bench_{name}")
+            results[name] = {}
+            for rate in rates:
+                print(f"  {name} @ {rate}/s ...", file=sys.stderr, flush=True)
+                results[name][str(rate)] = self.measure(rate, bench)
+                self.app.clear_messages()
+        return results
+
+    def close(self):
+        if self.app.connected:
+            self.app.reconnect_attempts = self.app.max_reconnect_attempts  # No reconnect on shutdown
+            self.app.disconnect()
+            self.wait_for(lambda: not self.app.connected, timeout=5)
+        self.app.loop.stop()
+        self.app.ui.stop()
+        self.root.destroy()
+        self.server.stop()
+
+
+def compare(baseline, current, threshold):
+    """List scenarios whose throughput fell or p95 latency rose by more than threshold percent"""
+    regressions = []
+    for scenario, rates in current["results"].items():
+        for rate, result in rates.items():
+            before = baseline.get("results", {}).get(scenario, {}).get(rate)
+            if not before:
+                continue
+            if result["throughput_per_s"] < before["throughput_per_s"] * (1 - threshold / 100.0):
+                regressions.append(f"{scenario}@{rate}: throughput {before['throughput_per_s']:.0f} -> {result['throughput_per_s']:.0f}/s")
+            for key in ("call_latency", "delivery_latency", "receive_to_handled_latency"):
+                if key in result and key in before and before[key]["p95_us"] > 0:
+                    if result[key]["p95_us"] > before[key]["p95_us"] * (1 + threshold / 100.0):
+                        regressions.append(f"{scenario}@{rate}: {key} p95 {before[key]['p95_us']:.0f} -> {result[key]['p95_us']:.0f}us")
+            if before["cpu_per_message_us"] > 0 and result["cpu_per_message_us"] > before["cpu_per_message_us"] * (1 + threshold / 100.0):
+                regressions.append(f"{scenario}@{rate}: cpu/msg {before['cpu_per_message_us']:.1f} -> {result['cpu_per_message_us']:.1f}us")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the client's send and receive paths offline")
+    parser.add_argument("--rates", default="100,1000,5000", help="Comma-separated message rates per second")
+    parser.add_argument("--duration", type=float, default=3.0, help="Seconds per scenario and rate")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated subset of: " + ", ".join(SCENARIOS))
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument("--compare", help="Baseline JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Regression threshold in percent")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Skip peak memory tracking")
+    args = parser.parse_args()
+
+    rates = [float(rate) if "." in rate else int(rate) for rate in args.rates.split(",")]
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    try:
+        bench = ClientBench(args.duration, trace_memory=not args.no_tracemalloc)
+    except tk.TclError as e:
+        print(f"Cannot create a Tk root ({e}); on a headless machine run under xvfb-run", file=sys.stderr)
+        sys.exit(2)
+
+    try:
+        results = bench.run(scenarios, rates)
+    finally:
+        bench.close()
+
+    report = {
+        "created": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "duration_s": args.duration,
+        "tracemalloc": not args.no_tracemalloc,
+        "results": results
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Idle cost and Tk bridge latency of the client's event-loop architecture
+
+Connects the client to a local stand-in server with auto ping on, then:
+  - idle: runs the Tk event loop for --duration seconds and reports the CPU
+    time of the client (stand-in server thread excluded), its threads and how
+    often the bridge polled;
+  - bridge: posts a call from the loop thread every --interval ms and reports
+    how long each waited for the Tk thread, idle and while receiving --rate
+    robot_location frames a second.
+
+    python benchmarks/bench_event_loop.py [--duration 5] [--interval 20] [--rate 500]
+
+The client needs a Tk root; on a headless machine run it under xvfb-run.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tkinter as tk
+
+from latency import LatencyHistogram
+from standin_server import StandInServer
+from websocket_react_client import WebSocketReactClient
+
+
+def run_tk(root, seconds):
+    """Like mainloop for a while: handle events as they come, sleep in between"""
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        root.update()
+        time.sleep(0.001)
+
+
+def idle(app, root, server, duration):
+    polls = app.ui.polls
+    server_cpu = server.thread_cpu_time()
+    cpu = time.process_time()
+    run_tk(root, duration)
+    cpu = (time.process_time() - cpu) - (server.thread_cpu_time() - server_cpu)
+    return {
+        "seconds": duration,
+        "cpu_ms_per_s": cpu * 1000 / duration,
+        "threads": sorted(thread.name for thread in threading.enumerate() if thread is not server.thread),
+        "bridge_polls_per_s": (app.ui.polls - polls) / duration
+    }
+
+
+def bridge_latency(app, root, duration, interval):
+    """Post from the loop thread every interval seconds and time each call until it runs on Tk"""
+    waits = LatencyHistogram()
+    running = [True]
+
+    def arrived(posted):
+        waits.record(time.perf_counter() - posted)
+
+    async def poster():
+        import asyncio
+        while running[0]:
+            app.ui.post(arrived, time.perf_counter())
+            await asyncio.sleep(interval)
+
+    task = app.loop.spawn(poster())
+    run_tk(root, duration)
+    running[0] = False
+    task.cancel()
+    run_tk(root, 0.1)
+    return waits.summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--interval", type=float, default=20.0, help="ms between bridge posts")
+    parser.add_argument("--rate", type=int, default=500, help="robot_location frames per second while busy")
+    args = parser.parse_args()
+
+    server = StandInServer().start()
+    root = tk.Tk()
+    root.withdraw()
+    app = WebSocketReactClient(root)
+    app.url_var.set(server.url)
+    app.connect()
+    run_tk(root, 1.0)
+    if not app.connected:
+        raise SystemExit(f"client did not connect to {server.url}")
+
+    results = {"idle": idle(app, root, server, args.duration)}
+    results["bridge_idle"] = bridge_latency(app, root, args.duration, args.interval / 1000)
+
+    frame = json.dumps({"type": "robot_location", "robotId": "bench",
+                        "data": {"lat": 37.7749, "lng": -122.4194, "direction": 90.0}})
+    broadcaster = threading.Thread(target=server.broadcast_at_rate, args=(lambda seq: frame, args.rate, args.duration),
+                                   daemon=True)
+    broadcaster.start()
+    results["bridge_busy"] = bridge_latency(app, root, args.duration, args.interval / 1000)
+    broadcaster.join()
+
+    app.reconnect_attempts = app.max_reconnect_attempts  # No reconnect on shutdown
+    app.disconnect()
+    run_tk(root, 0.5)
+    app.loop.stop()
+    app.ui.stop()
+    root.destroy()
+    server.stop()
+
+    print(f"idle: {results['idle']['cpu_ms_per_s']:.2f}ms CPU/s, {len(results['idle']['threads'])} threads, "
+          f"{results['idle']['bridge_polls_per_s']:.0f} bridge polls/s", file=sys.stderr)
+    for name in ("bridge_idle", "bridge_busy"):
+        summary = results[name]
+        print(f"{name}: p50 {summary['p50_ms']:.2f}ms, p95 {summary['p95_ms']:.2f}ms, max {summary['max_ms']:.2f}ms",
+              file=sys.stderr)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
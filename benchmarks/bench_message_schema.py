@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Compare per-message cost of the dict + json.dumps path with the compiled schemas
+
+For every outbound message type, times building the robot_protocol dict and
+json.dumps-ing it against constructing the message_schema Message and encoding
+it (which validates every field). Also times the timestamp formatting on its
+own and the validation of a received robot_location.
+
+    python benchmarks/bench_message_schema.py [--iterations 100000]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import message_schema
+import robot_protocol as protocol
+
+
+def bench(func, iterations):
+    """Best-of-three time per call in microseconds"""
+    return min(timeit.repeat(func, number=iterations, repeat=3)) / iterations * 1000000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+    n = args.iterations
+
+    cases = {
+        "location": (
+            lambda: json.dumps(protocol.location_message(37.7749123, -122.4194456, 312.5)),
+            lambda: message_schema.location(37.7749123, -122.4194456, 312.5).encode()
+        ),
+        "location_track": (
+            lambda: json.dumps(protocol.location_track_message(37.7749123, -122.4194456, 312.5)),
+            lambda: message_schema.location_track(37.7749123, -122.4194456, 312.5).encode()
+        ),
+        "status": (
+            lambda: json.dumps(protocol.status_message()),
+            lambda: message_schema.status().encode()
+        ),
+        "ping": (
+            lambda: json.dumps(protocol.ping_message(42)),
+            lambda: message_schema.ping(42).encode()
+        ),
+        "icon_pin": (
+            lambda: json.dumps(protocol.icon_pin_message(37.7749123, -122.4194456, "warehouse")),
+            lambda: message_schema.icon_pin(37.7749123, -122.4194456, "warehouse").encode()
+        ),
+        "route_waypoints": (
+            lambda: json.dumps(protocol.route_waypoints_message()),
+            lambda: message_schema.route_waypoints().encode()
+        )
+    }
+
+    results = {}
+    for name, (dict_path, schema_path) in cases.items():
+        dict_us = bench(dict_path, n)
+        schema_us = bench(schema_path, n)
+        results[name] = {
+            "dict_json_us": dict_us,
+            "schema_us": schema_us,
+            "speedup": dict_us / schema_us if schema_us else 0.0
+        }
+
+    received = json.dumps({
+        "type": "robot_location",
+        "robotId": "robot-0042",
+        "data": {"lat": 37.7749123, "lng": -122.4194456, "direction": 312.5}
+    })
+    results["timestamp"] = {
+        "datetime_isoformat_us": bench(lambda: datetime.now().isoformat() + "Z", n),
+        "cached_us": bench(protocol.timestamp, n)
+    }
+    results["inbound_robot_location"] = {
+        "json_loads_us": bench(lambda: json.loads(received), n),
+        "json_loads_validate_us": bench(lambda: message_schema.validate(json.loads(received)), n)
+    }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Cost of the hot-path profiler per hooked call: off, timings, cProfile and tracemalloc
+
+Feeds robot_location frames through a MessageDispatcher whose handler encodes a
+reply with json.dumps (both hooked, as in the client) and reports the time per
+frame in microseconds:
+  - baseline: never hooked
+  - off: after a start/stop cycle, which must match the baseline
+  - timing, cprofile, cprofile+tracemalloc: while profiling
+
+    python benchmarks/bench_profiling.py [--frames 20000] [--repeat 5]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import profiling
+from dispatch import MessageDispatcher
+
+MODES = {
+    "timing": {},
+    "cprofile": {"cprofile": True},
+    "cprofile+tracemalloc": {"cprofile": True, "tracemalloc": True}
+}
+
+
+class Client:
+    """Stand-in for the GUI's receive path"""
+
+    def __init__(self):
+        self.dispatcher = MessageDispatcher()
+        self.dispatcher.register("robot_location", self.handle_robot_location)
+        self.last = None
+
+    def on_message(self, frame):
+        self.dispatcher.dispatch(frame)
+
+    def handle_robot_location(self, message):
+        self.last = json.dumps({"type": "ack", "robotId": message["robotId"]})
+
+
+def make_frames(count):
+    return [json.dumps({"type": "robot_location", "robotId": f"r{i % 100}",
+                        "data": {"lat": 37.7749 + i * 1e-6, "lng": -122.4194, "direction": i % 360}})
+            for i in range(count)]
+
+
+def per_frame_us(client, frames, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for frame in frames:
+            client.on_message(frame)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(frames) * 1000000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    frames = make_frames(args.frames)
+    client = Client()
+    profiler = profiling.HotPathProfiler()
+    profiler.hook(client, "on_message")
+    profiler.hook(json, "dumps", "json.dumps")
+
+    results = {"frames": args.frames, "us_per_frame": {"baseline": per_frame_us(client, frames, args.repeat)}}
+    profiler.start()
+    profiler.stop()
+    results["us_per_frame"]["off"] = per_frame_us(client, frames, args.repeat)
+    for mode, options in MODES.items():
+        profiler.start(**options)
+        try:
+            results["us_per_frame"][mode] = per_frame_us(client, frames, args.repeat)
+        finally:
+            profiler.stop()
+    results["restored"] = "on_message" not in vars(client) and not hasattr(json.dumps, "__wrapped__")
+
+    baseline = results["us_per_frame"]["baseline"]
+    for mode, value in results["us_per_frame"].items():
+        print(f"{mode:<22} {value:7.2f} us/frame ({value / baseline:.2f}x)", file=sys.stderr)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""Time and peak memory of chunked route uploads against file size
+
+Generates GPX and CSV routes of each size, then encodes them as a chunked
+upload (rate limit off, chunks discarded after encoding), plain and compressed,
+and as a single route_waypoints message holding every point. Each case is timed
+once as is, then run again under tracemalloc for its peak memory. The chunked
+upload reads the file twice (count, then send), which shows in its time.
+
+    python benchmarks/bench_route_upload.py [--points 10000 100000 500000] [--chunk-size 1000]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import message_schema
+import route_upload
+
+
+def write_route(path, points):
+    """A wiggly track heading north-east from San Francisco"""
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith(".gpx"):
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                    '<gpx version="1.1" creator="bench" xmlns="http://www.topografix.com/GPX/1/1">\n'
+                    '<trk><name>bench</name><trkseg>\n')
+            for i in range(points):
+                f.write(f'<trkpt lat="{37.7749 + i * 1e-6:.7f}" lon="{-122.4194 + (i % 100) * 1e-6:.7f}">'
+                        f'<ele>{10 + i % 7}</ele></trkpt>\n')
+            f.write("</trkseg></trk>\n</gpx>\n")
+        else:
+            f.write("lat,lng\n")
+            for i in range(points):
+                f.write(f"{37.7749 + i * 1e-6:.7f},{-122.4194 + (i % 100) * 1e-6:.7f}\n")
+
+
+def measure(func):
+    """(seconds, peak MiB under tracemalloc, result) of a function"""
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024), result
+
+
+def chunked(path, chunk_size, compress):
+    sent = [0]
+
+    def send(message):
+        sent[0] += len(message.encode())
+
+    upload = route_upload.RouteUpload(path, chunk_size=chunk_size, rate=0, compress=compress)
+    upload.run(send)
+    return sent[0]
+
+
+def single_message(path):
+    waypoints = [{"lat": lat, "lng": lng} for lat, lng in route_upload.iter_waypoints(path)]
+    return len(message_schema.route_waypoints(waypoints).encode())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, nargs="+", default=[10000, 100000, 500000])
+    parser.add_argument("--chunk-size", type=int, default=route_upload.DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for points in args.points:
+            for extension in ("gpx", "csv"):
+                path = os.path.join(directory, f"route_{points}.{extension}")
+                write_route(path, points)
+                row = {"format": extension, "points": points, "file_mib": os.path.getsize(path) / (1024 * 1024)}
+                for name, func in (
+                    ("chunked", lambda: chunked(path, args.chunk_size, False)),
+                    ("chunked_deflate", lambda: chunked(path, args.chunk_size, True)),
+                    ("single_message", lambda: single_message(path))
+                ):
+                    elapsed, peak_mib, sent_bytes = measure(func)
+                    row[name] = {"seconds": elapsed, "peak_mib": peak_mib, "sent_mib": sent_bytes / (1024 * 1024)}
+                results.append(row)
+                os.remove(path)
+                print(f"{extension} {points:>7} points ({row['file_mib']:.1f} MiB): " + ", ".join(
+                    f"{name} {row[name]['seconds']:.2f}s peak {row[name]['peak_mib']:.1f} MiB"
+                    for name in ("chunked", "chunked_deflate", "single_message")), file=sys.stderr)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Time of route simplification and segment geometry, NumPy against plain Python
+
+Generates a GPS-like track (about a meter between fixes, a slowly wandering
+heading and half a meter of noise), then times route_simplify.segment_geometry
+and route_simplify.simplify at each tolerance with NumPy and with the pure-Python
+fallback, and reports how many points were kept. RouteGeometry is timed too, as
+the playback precompute that uses segment_geometry.
+
+    python benchmarks/bench_simplify.py [--points 1000000] [--tolerance 1 5 20] [--window 4096] [--no-python]
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import route_playback
+import route_simplify
+
+
+def make_track(points, seed=1):
+    rng = random.Random(seed)
+    lats = []
+    lngs = []
+    north = east = heading = 0.0
+    meters_per_lng = 111195.0 * math.cos(math.radians(37.7749))
+    for _ in range(points):
+        heading += rng.gauss(0, 0.05)
+        north += math.cos(heading)
+        east += math.sin(heading)
+        lats.append(37.7749 + (north + rng.gauss(0, 0.5)) / 111195.0)
+        lngs.append(-122.4194 + (east + rng.gauss(0, 0.5)) / meters_per_lng)
+    return lats, lngs
+
+
+def timed(func):
+    started = time.perf_counter()
+    result = func()
+    return time.perf_counter() - started, result
+
+
+def run_backend(lats, lngs, tolerances, window):
+    row = {}
+    row["segment_geometry_s"], _ = timed(lambda: route_simplify.segment_geometry(lats, lngs))
+    waypoints = list(zip(lats, lngs))
+    row["route_geometry_s"], _ = timed(lambda: route_playback.RouteGeometry(waypoints))
+    for tolerance in tolerances:
+        elapsed, kept = timed(lambda: route_simplify.simplify(lats, lngs, tolerance, window))
+        row[f"simplify_{tolerance:g}m"] = {"seconds": elapsed, "kept": len(kept)}
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=1000000)
+    parser.add_argument("--tolerance", type=float, nargs="+", default=[1.0, 5.0, 20.0])
+    parser.add_argument("--window", type=int, default=route_simplify.DEFAULT_WINDOW)
+    parser.add_argument("--no-python", action="store_true", help="Skip the (slow) pure-Python fallback")
+    args = parser.parse_args()
+
+    lats, lngs = make_track(args.points)
+    results = {"points": args.points, "window": args.window}
+    use_numpy = route_simplify.USE_NUMPY
+    if use_numpy:
+        import numpy
+        results["numpy"] = run_backend(numpy.array(lats), numpy.array(lngs), args.tolerance, args.window)
+    if not args.no_python:
+        route_simplify.USE_NUMPY = False
+        try:
+            results["python"] = run_backend(lats, lngs, args.tolerance, args.window)
+        finally:
+            route_simplify.USE_NUMPY = use_numpy
+
+    for backend in ("numpy", "python"):
+        if backend in results:
+            row = results[backend]
+            print(f"{backend}: geometry {row['segment_geometry_s']:.3f}s, " + ", ".join(
+                f"{name} {value['seconds']:.3f}s ({value['kept']} kept)"
+                for name, value in row.items() if name.startswith("simplify_")), file=sys.stderr)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
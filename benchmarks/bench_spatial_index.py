@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Time spatial index updates and queries against a linear scan of every robot
+
+Scatters robots over a city-sized area (dense) or the whole globe (sparse), then
+times position updates, k-nearest, radius and box queries on the grid, next to
+a brute-force scan over all positions with robot_protocol.distance_m.
+
+    python benchmarks/bench_spatial_index.py [--robots 30000] [--layout city|world]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import robot_protocol as protocol
+from spatial_index import SpatialGrid
+
+
+def per_call_ms(func, args_list):
+    started = time.perf_counter()
+    for args in args_list:
+        func(*args)
+    return (time.perf_counter() - started) / len(args_list) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--robots", type=int, default=30000)
+    parser.add_argument("--layout", choices=("city", "world"), default="city")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--radius", type=float, default=None, help="Radius query in meters")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    if args.layout == "city":
+        point = lambda: (37.70 + rng.random() * 0.2, -122.52 + rng.random() * 0.2)
+        radius = args.radius or 500.0
+    else:
+        point = lambda: (rng.uniform(-85, 85), rng.uniform(-180, 180))
+        radius = args.radius or 100000.0
+
+    positions = {f"robot-{i:05d}": point() for i in range(args.robots)}
+    grid = SpatialGrid()
+    started = time.perf_counter()
+    for robot_id, (lat, lng) in positions.items():
+        grid.update(robot_id, lat, lng)
+    insert_us = (time.perf_counter() - started) / args.robots * 1000000
+
+    moves = [(robot_id, lat + rng.uniform(-0.0005, 0.0005), lng + rng.uniform(-0.0005, 0.0005))
+             for robot_id, (lat, lng) in positions.items()]
+    move_us = per_call_ms(grid.update, moves) * 1000
+    positions = {robot_id: (lat, lng) for robot_id, lat, lng in moves}
+
+    queries = [point() for _ in range(args.queries)]
+
+    def scan_nearest(lat, lng):
+        return sorted((protocol.distance_m(lat, lng, a, b), robot_id) for robot_id, (a, b) in positions.items())[:args.k]
+
+    def scan_within(lat, lng):
+        return [robot_id for robot_id, (a, b) in positions.items() if protocol.distance_m(lat, lng, a, b) <= radius]
+
+    scan_queries = queries[:max(1, args.queries // 20)]
+    results = {
+        "robots": args.robots,
+        "layout": args.layout,
+        "insert_us": insert_us,
+        "move_us": move_us,
+        "nearest_ms": per_call_ms(lambda lat, lng: grid.nearest(lat, lng, args.k), queries),
+        "within_ms": per_call_ms(lambda lat, lng: grid.within(lat, lng, radius), queries),
+        "in_box_ms": per_call_ms(lambda lat, lng: grid.in_box(lat - 0.01, lng - 0.01, lat + 0.01, lng + 0.01), queries),
+        "scan_nearest_ms": per_call_ms(scan_nearest, scan_queries),
+        "scan_within_ms": per_call_ms(scan_within, scan_queries)
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
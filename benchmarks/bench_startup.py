@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Import time and startup time of the command-line client against its budget
+
+Measures, as the median of several fresh interpreters:
+  - the cumulative import time of robot_cli (python -X importtime)
+  - the wall clock of `robot_cli.py --help` and of `robot_cli.py connect` to a
+    local stand-in server, with a bare `python -c pass` for reference
+  - the import time of the GUI module (websocket_react_client), for comparison
+and checks that the headless commands never import tkinter, asyncio or numpy.
+Every command runs once unmeasured first, so the OS cache is warm and bytecode
+is written as on an installed copy. The budgets are the ones documented in
+robot_cli; with --check the exit status is 1 if one is exceeded.
+
+    python benchmarks/bench_startup.py [--runs 7] [--check]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from standin_server import StandInServer
+
+BUDGET_MS = {
+    "import_robot_cli": 30,
+    "help_wall": 100,
+    "connect_wall": 300
+}
+HEADLESS_FORBIDDEN = ("tkinter", "asyncio", "numpy")
+
+
+def environment():
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env["PYTHONPATH"] = REPO_DIR
+    return env
+
+
+def run(args, env):
+    return subprocess.run([sys.executable] + args, cwd=REPO_DIR, env=env, capture_output=True, text=True)
+
+
+def import_time_ms(module, env):
+    """Cumulative import time of module, and every module imported along the way"""
+    result = run(["-X", "importtime", "-c", f"import {module}"], env)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    modules = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                modules[name.strip()] = int(cumulative) / 1000.0
+    return modules[module], modules
+
+
+def imported_modules(args, env):
+    result = run(["-X", "importtime"] + args, env)
+    return {line.split("|")[-1].strip() for line in result.stderr.splitlines() if line.startswith("import time:")}
+
+
+def wall_ms(args, env):
+    started = time.perf_counter()
+    result = run(args, env)
+    elapsed = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed: {result.stderr.strip()}")
+    return elapsed
+
+
+def median_of(runs, func):
+    func()  # Warm-up
+    return statistics.median(func() for _ in range(runs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 when over budget")
+    args = parser.parse_args()
+
+    env = environment()
+    server = StandInServer(port=0).start()
+    try:
+        measured = {
+            "import_robot_cli": median_of(args.runs, lambda: import_time_ms("robot_cli", env)[0]),
+            "help_wall": median_of(args.runs, lambda: wall_ms(["robot_cli.py", "--help"], env)),
+            "connect_wall": median_of(args.runs, lambda: wall_ms(["robot_cli.py", "connect", "--url", server.url], env)),
+            "python_wall": median_of(args.runs, lambda: wall_ms(["-c", "pass"], env))
+        }
+        try:
+            measured["import_gui"] = median_of(args.runs, lambda: import_time_ms("websocket_react_client", env)[0])
+        except RuntimeError as e:
+            measured["import_gui"] = None
+            print(f"GUI import not measured: {e}", file=sys.stderr)
+        headless = set()
+        for command in (["robot_cli.py", "--help"], ["robot_cli.py", "connect", "--url", server.url]):
+            headless |= imported_modules(command, env)
+    finally:
+        server.stop()
+
+    forbidden = sorted(name for name in headless if name.split(".")[0] in HEADLESS_FORBIDDEN)
+    over = [name for name, budget in BUDGET_MS.items() if measured[name] > budget]
+    results = {
+        "measured_ms": measured,
+        "budget_ms": BUDGET_MS,
+        "over_budget": over,
+        "forbidden_imports": forbidden
+    }
+    for name, value in measured.items():
+        budget = BUDGET_MS.get(name)
+        if value is not None:
+            print(f"{name:<18} {value:7.1f} ms" + (f"  (budget {budget} ms)" if budget else ""), file=sys.stderr)
+    print(json.dumps(results, indent=2))
+    if args.check and (over or forbidden):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
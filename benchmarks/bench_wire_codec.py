@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Compare bytes per message and encode/decode time of JSON vs the binary wire codec
+
+    python benchmarks/bench_wire_codec.py [--iterations 100000]
+"""
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import robot_protocol as protocol
+import wire_codec
+
+
+def bench(func, iterations):
+    """Best-of-three time per call in microseconds"""
+    return min(timeit.repeat(func, number=iterations, repeat=3)) / iterations * 1000000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+
+    location = protocol.location_message(37.7749123, -122.4194456, 312.5)
+    robot_location = dict(protocol.location_message(37.7749123, -122.4194456, 312.5, msg_type="robot_location"),
+                          robotId="robot-0042")
+
+    results = {}
+    for name, message in (("location", location), ("robot_location", robot_location)):
+        json_frame = json.dumps(message)
+        binary_frame = wire_codec.encode(message)
+        data = message["data"]
+        results[name] = {
+            "json_bytes": len(json_frame.encode("utf-8")),
+            "binary_bytes": len(binary_frame),
+            "json_encode_us": bench(lambda: json.dumps(message), args.iterations),
+            "binary_encode_us": bench(lambda: wire_codec.encode(message), args.iterations),
+            "binary_encode_fields_us": bench(
+                lambda: wire_codec.encode_location(data["lat"], data["lng"], data["direction"],
+                                                   msg_type=name, robot_id=message.get("robotId")),
+                args.iterations
+            ),
+            "json_decode_us": bench(lambda: json.loads(json_frame), args.iterations),
+            "binary_decode_us": bench(lambda: wire_codec.decode(binary_frame), args.iterations)
+        }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
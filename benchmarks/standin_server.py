@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""Local WebSocket server standing in for the fan-out server during benchmarks
+
+Runs on its own asyncio loop in a background thread and only binds to
+localhost. It records when each frame arrives, answers ping with pong and
+codec_hello with codec_ack, and can broadcast robot_location frames at a fixed
+rate to every connected client. With a self-signed certificate (made with the
+openssl command-line tool) it serves wss:// instead.
+
+    python benchmarks/standin_server.py --port 8000 [--tls]
+"""
+import argparse
+import asyncio
+import json
+import os
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+
+import websockets
+
+
+def self_signed_context(directory=None, host="127.0.0.1"):
+    """(server SSL context, certificate path) for a new self-signed certificate valid for host and localhost"""
+    directory = directory or tempfile.mkdtemp(prefix="standin-tls-")
+    cert_path = os.path.join(directory, "cert.pem")
+    key_path = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-keyout", key_path, "-out", cert_path, "-subj", "/CN=localhost",
+         "-addext", f"subjectAltName=IP:{host},DNS:localhost"],
+        check=True, capture_output=True
+    )
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path, key_path)
+    return context, cert_path
+
+
+class StandInServer:
+    """In-process WebSocket server bound to localhost"""
+
+    def __init__(self, host="127.0.0.1", port=0, ssl_context=None, accept_binary=True):
+        self.host = host
+        self.port = port
+        self.ssl_context = ssl_context
+        self.accept_binary = accept_binary
+
+        self.loop = None
+        self.thread = None
+        self.server = None
+        self.clients = set()
+        self._ready = threading.Event()
+
+        self.arrivals = []  # (perf_counter at arrival, frame)
+        self.record_arrivals = True
+        self.received = 0
+        self.received_bytes = 0
+
+    @property
+    def url(self):
+        scheme = "wss" if self.ssl_context else "ws"
+        return f"{scheme}://{self.host}:{self.port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, daemon=True, name="standin-server")
+        self.thread.start()
+        if not self._ready.wait(10):
+            raise RuntimeError("stand-in server did not start")
+        return self
+
+    def _run(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.server = self.loop.run_until_complete(
+            websockets.serve(self._handler, self.host, self.port, ssl=self.ssl_context, compression=None, close_timeout=1)
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self.loop.run_forever()
+
+    async def _handler(self, ws, path=None):
+        self.clients.add(ws)
+        try:
+            async for frame in ws:
+                arrived = time.perf_counter()
+                self.received += 1
+                self.received_bytes += len(frame)
+                if self.record_arrivals:
+                    self.arrivals.append((arrived, frame))
+                if isinstance(frame, str):
+                    await self._reply(ws, frame)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.clients.discard(ws)
+
+    async def _reply(self, ws, frame):
+        # Cheap check before parsing; most frames are locations
+        if '"ping"' not in frame and '"codec_hello"' not in frame:
+            return
+        try:
+            message = json.loads(frame)
+        except ValueError:
+            return
+        msg_type = message.get("type")
+        if msg_type == "ping":
+            pong = {key: value for key, value in message.items() if key != "type"}
+            pong["type"] = "pong"
+            await ws.send(json.dumps(pong))
+        elif msg_type == "codec_hello" and self.accept_binary and "bin1" in message.get("codecs", []):
+            await ws.send(json.dumps({"type": "codec_ack", "codec": "bin1"}))
+
+    def call(self, coro, timeout=None):
+        """Run a coroutine on the server loop from another thread and wait for it"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def broadcast(self, frame):
+        """Send one frame to every connected client"""
+        async def send_all():
+            if self.clients:
+                await asyncio.gather(*(ws.send(frame) for ws in list(self.clients)), return_exceptions=True)
+        self.call(send_all())
+
+    def broadcast_at_rate(self, make_frame, rate, duration):
+        """Broadcast make_frame(seq) at rate frames per second for duration seconds"""
+        async def run():
+            interval = 1.0 / rate
+            start = time.monotonic()
+            seq = 0
+            while time.monotonic() - start < duration:
+                deadline = start + seq * interval
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                frame = make_frame(seq)
+                for ws in list(self.clients):
+                    try:
+                        await ws.send(frame)
+                    except websockets.ConnectionClosed:
+                        pass
+                seq += 1
+            return seq
+        return self.call(run())
+
+    def thread_cpu_time(self):
+        """CPU seconds used by the server thread, so callers can subtract it"""
+        async def cpu():
+            return time.thread_time()
+        return self.call(cpu())
+
+    def reset(self):
+        self.arrivals = []
+        self.received = 0
+        self.received_bytes = 0
+
+    def stop(self):
+        if self.loop is None:
+            return
+
+        async def shutdown():
+            self.server.close()
+            try:
+                await asyncio.wait_for(self.server.wait_closed(), 3)
+            except asyncio.TimeoutError:
+                pass
+
+        try:
+            self.call(shutdown(), timeout=5)
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(5)
+            self.loop = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the local stand-in WebSocket server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--broadcast-rate", type=float, default=0, help="robot_location frames per second (0 = none)")
+    parser.add_argument("--tls", action="store_true", help="Serve wss:// with a new self-signed certificate")
+    args = parser.parse_args()
+
+    ssl_context = None
+    if args.tls:
+        ssl_context, cert_path = self_signed_context(host=args.host)
+    server = StandInServer(args.host, args.port, ssl_context=ssl_context).start()
+    server.record_arrivals = False
+    print(f"Stand-in server listening on {server.url}", flush=True)
+    if args.tls:
+        print(f"Self-signed certificate: {cert_path} (skip verification in the client, or trust this file)", flush=True)
+    try:
+        while True:
+            if args.broadcast_rate:
+                server.broadcast_at_rate(
+                    lambda seq: json.dumps({
+                        "type": "robot_location",
+                        "robotId": "standin",
+                        "data": {"lat": 37.7749 + seq * 0.00001, "lng": -122.4194, "direction": 0}
+                    }),
+                    args.broadcast_rate,
+                    60
+                )
+            else:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
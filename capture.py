@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""Append-only capture of WebSocket traffic with an index for seeking and replay
+
+A capture is three files:
+
+    <name>          data: FILE_MAGIC, then one record per frame
+                    (timestamp f64, direction u8, kind u8, length u32, payload)
+    <name>.idx      index: one fixed-size entry per record
+                    (timestamp f64, data offset u64, robot ref u32)
+    <name>.robots   robotIds as JSON strings, one per line; robot ref N is line N (0 = none)
+
+Records are written by a background thread, so capturing never blocks the
+receive path. The reader memory-maps the data and index files and seeks by
+time (binary search over the index) or by robotId (per robot record lists,
+built from the 20-byte index entries on the first robotId query) without
+reading the payloads it skips.
+"""
+import array
+import asyncio
+import bisect
+import json
+import mmap
+import os
+import queue
+import re
+import struct
+import threading
+import time
+
+import wire_codec
+
+FILE_MAGIC = b"RBCAP001"
+
+INBOUND = 0
+OUTBOUND = 1
+DIRECTION_NAMES = {INBOUND: "in", OUTBOUND: "out"}
+
+KIND_TEXT = 0
+KIND_BINARY = 1
+
+_RECORD = struct.Struct("<dBBI")
+_INDEX = struct.Struct("<dQI")
+_ROBOT_ID = re.compile(r'"robotId"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+def robot_id_of(frame):
+    """robotId of a frame without parsing all of it (None if it has none)"""
+    if isinstance(frame, bytes):
+        if len(frame) > 1 and frame[1] == wire_codec.TYPE_IDS["robot_location"]:
+            try:
+                return wire_codec.decode(frame).get("robotId")
+            except wire_codec.WireCodecError:
+                return None
+        return None
+    match = _ROBOT_ID.search(frame)
+    if match is None:
+        return None
+    robot_id = match.group(1)
+    if "\\" in robot_id:
+        # Escaped in the frame; decode so it matches the robotId handlers and filters see
+        try:
+            robot_id = json.loads(f'"{robot_id}"')
+        except ValueError:
+            pass
+    return robot_id
+
+
+def _read_robot_ids(f):
+    return [json.loads(line) for line in f if line.strip()]
+
+
+def _robot_id_line(robot_id):
+    # JSON, so ids with newlines or escapes round-trip through the line-based file
+    return json.dumps(robot_id, ensure_ascii=False) + "\n"
+
+
+class CaptureWriter:
+    """Streams frames to an append-only capture from a background thread"""
+
+    def __init__(self, path, max_pending=100000, flush_interval=1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_pending)
+        self.records = 0
+        self.dropped = 0
+        self.bytes_written = 0
+
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._data = open(path, "ab")
+        self._index = open(path + ".idx", "ab")
+        self._robots_file = open(path + ".robots", "a+", encoding="utf-8")
+        if new_file:
+            self._data.write(FILE_MAGIC)
+        else:
+            with open(path, "rb") as f:
+                if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+                    self._close_files()
+                    raise ValueError(f"{path} is not a capture file")
+        self._offset = self._data.tell()
+
+        # Continue numbering robots from an existing capture
+        self._robots_file.seek(0)
+        self._robot_refs = {robot_id: ref for ref, robot_id in enumerate(_read_robot_ids(self._robots_file), 1)}
+
+        self._thread = threading.Thread(target=self._run, daemon=True, name="capture-writer")
+        self._thread.start()
+
+    def record(self, direction, frame, timestamp=None):
+        """Queue a frame for writing; never blocks (drops when the writer falls behind)"""
+        try:
+            self._queue.put_nowait((timestamp or time.time(), direction, frame))
+        except queue.Full:
+            self.dropped += 1
+
+    def _robot_ref(self, robot_id):
+        if robot_id is None:
+            return 0
+        ref = self._robot_refs.get(robot_id)
+        if ref is None:
+            ref = len(self._robot_refs) + 1
+            self._robot_refs[robot_id] = ref
+            self._robots_file.write(_robot_id_line(robot_id))
+        return ref
+
+    def _write(self, timestamp, direction, frame):
+        if isinstance(frame, bytes):
+            kind, payload = KIND_BINARY, frame
+        else:
+            kind, payload = KIND_TEXT, frame.encode("utf-8")
+        self._data.write(_RECORD.pack(timestamp, direction, kind, len(payload)))
+        self._data.write(payload)
+        self._index.write(_INDEX.pack(timestamp, self._offset, self._robot_ref(robot_id_of(frame))))
+        size = _RECORD.size + len(payload)
+        self._offset += size
+        self.bytes_written += size
+        self.records += 1
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                self._write(*item)
+            if time.monotonic() - last_flush >= self.flush_interval:
+                self._flush()
+                last_flush = time.monotonic()
+        self._flush()
+
+    def _flush(self):
+        # Data before index, so an index entry never points past the data on disk
+        self._data.flush()
+        self._robots_file.flush()
+        self._index.flush()
+
+    def _close_files(self):
+        for f in (self._data, self._index, self._robots_file):
+            f.close()
+
+    def close(self):
+        """Write everything still queued and close the files"""
+        self._queue.put(None)
+        self._thread.join()
+        self._close_files()
+
+
+class CaptureReader:
+    """Memory-mapped reader over a capture and its index"""
+
+    def __init__(self, path):
+        self.path = path
+        self._data_file = open(path, "rb")
+        if self._data_file.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            self._data_file.close()
+            raise ValueError(f"{path} is not a capture file")
+        self._data = mmap.mmap(self._data_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        index_path = path + ".idx"
+        if not os.path.exists(index_path) or self._index_is_stale(index_path):
+            self.rebuild_index()
+        self._index_file = open(index_path, "rb")
+        size = os.path.getsize(index_path)
+        self._index = mmap.mmap(self._index_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.count = size // _INDEX.size
+
+        self.robot_ids = [None]
+        robots_path = path + ".robots"
+        if os.path.exists(robots_path):
+            with open(robots_path, encoding="utf-8") as f:
+                self.robot_ids.extend(_read_robot_ids(f))
+        self.robot_refs = {robot_id: ref for ref, robot_id in enumerate(self.robot_ids) if ref}
+        self._by_robot = None  # robot ref -> array of record numbers, built on the first robotId query
+
+    def _index_is_stale(self, index_path):
+        """True if the index is torn or does not cover the data (e.g. after a crash)"""
+        size = os.path.getsize(index_path)
+        if size % _INDEX.size:
+            return True
+        if not size:
+            return len(self._data) > len(FILE_MAGIC)
+        with open(index_path, "rb") as f:
+            f.seek(size - _INDEX.size)
+            _, offset, _ = _INDEX.unpack(f.read(_INDEX.size))
+        if offset + _RECORD.size > len(self._data):
+            return True
+        _, _, _, length = _RECORD.unpack_from(self._data, offset)
+        return offset + _RECORD.size + length != len(self._data)
+
+    def rebuild_index(self):
+        """Recreate the index (and robots table) by scanning the data file"""
+        robot_refs = {}
+        offset = len(FILE_MAGIC)
+        end = len(self._data)
+        with open(self.path + ".idx", "wb") as index, open(self.path + ".robots", "w", encoding="utf-8") as robots:
+            while offset + _RECORD.size <= end:
+                timestamp, _, kind, length = _RECORD.unpack_from(self._data, offset)
+                if offset + _RECORD.size + length > end:
+                    break  # Torn final record
+                payload = self._data[offset + _RECORD.size:offset + _RECORD.size + length]
+                robot_id = robot_id_of(payload if kind == KIND_BINARY else payload.decode("utf-8", "replace"))
+                ref = 0
+                if robot_id is not None:
+                    ref = robot_refs.get(robot_id)
+                    if ref is None:
+                        ref = robot_refs[robot_id] = len(robot_refs) + 1
+                        robots.write(_robot_id_line(robot_id))
+                index.write(_INDEX.pack(timestamp, offset, ref))
+                offset += _RECORD.size + length
+
+    def __len__(self):
+        return self.count
+
+    def _entry(self, i):
+        return _INDEX.unpack_from(self._index, i * _INDEX.size)
+
+    def timestamp_at(self, i):
+        return self._entry(i)[0]
+
+    def record_at(self, i):
+        """(timestamp, direction, frame) of record i; frame is str or bytes like on the wire"""
+        offset = self._entry(i)[1]
+        timestamp, direction, kind, length = _RECORD.unpack_from(self._data, offset)
+        payload = self._data[offset + _RECORD.size:offset + _RECORD.size + length]
+        return timestamp, direction, payload if kind == KIND_BINARY else payload.decode("utf-8")
+
+    def _robot_records(self, ref):
+        if self._by_robot is None:
+            by_robot = {}
+            for i, (_, _, entry_ref) in enumerate(_INDEX.iter_unpack(self._index)):
+                records = by_robot.get(entry_ref)
+                if records is None:
+                    records = by_robot[entry_ref] = array.array("I")
+                records.append(i)
+            self._by_robot = by_robot
+        return self._by_robot.get(ref, ())
+
+    def find_time(self, timestamp):
+        """Index of the first record at or after timestamp"""
+        return bisect.bisect_left(_IndexTimes(self), timestamp)
+
+    def records(self, start_time=None, end_time=None, robot_id=None, direction=None):
+        """Yield (timestamp, direction, frame) in capture order, filtered"""
+        start = self.find_time(start_time) if start_time is not None else 0
+        positions = range(start, self.count)
+        if robot_id is not None:
+            ref = self.robot_refs.get(robot_id)
+            if ref is None:
+                return
+            robot_records = self._robot_records(ref)
+            positions = robot_records[bisect.bisect_left(robot_records, start):]
+        for i in positions:
+            if end_time is not None and self.timestamp_at(i) > end_time:
+                break
+            record = self.record_at(i)
+            if direction is not None and record[1] != direction:
+                continue
+            yield record
+
+    def close(self):
+        if self._index:
+            self._index.close()
+        self._index_file.close()
+        self._data.close()
+        self._data_file.close()
+
+
+class _IndexTimes:
+    """Sequence view of the index timestamps for bisect"""
+
+    def __init__(self, reader):
+        self.reader = reader
+
+    def __len__(self):
+        return self.reader.count
+
+    def __getitem__(self, i):
+        return self.reader.timestamp_at(i)
+
+
+async def replay(records, dispatch, speed=1.0, is_running=lambda: True):
+    """Feed captured frames to dispatch(frame) with their original spacing, on an asyncio loop
+
+    speed is a multiplier (1.0 = real time, 10.0 = ten times faster); None
+    replays as fast as dispatch allows. Stops early once is_running() is false.
+    Returns the number of frames replayed.
+    """
+    count = 0
+    first = None
+    started = time.monotonic()
+    for timestamp, _, frame in records:
+        if not is_running():
+            break
+        if speed:
+            if first is None:
+                first = timestamp
+            delay = (timestamp - first) / speed - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+                if not is_running():
+                    break
+        elif count % 256 == 255:
+            await asyncio.sleep(0)  # Let the connection and timers run during a flat-out replay
+        dispatch(frame)
+        count += 1
+    return count
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Table-driven dispatch of received frames by message type
+
+Handlers are registered per message type and can be switched off individually.
+Before a text frame is parsed its type (and robotId) are peeked with an anchored
+regex, so frames of disabled types, or from robots outside the filter, are
+dropped without being decoded. Per type it counts frames received, skipped,
+handled and failed, and records handler run times.
+"""
+import json
+import re
+import time
+
+import message_schema
+import wire_codec
+from latency import LatencyHistogram
+
+OTHER = "*"  # Handler and enable flag for types without a handler of their own
+
+# Only trusted when "type" is the first key, so a nested "type" can't be mistaken for it
+_PEEK_TYPE = re.compile(r'\s*\{\s*"type"\s*:\s*"([^"\\]*)"')
+_PEEK_ROBOT_ID = re.compile(r'"robotId"\s*:\s*"([^"\\]*)"')
+
+
+def peek(frame):
+    """(type, robotId) of a frame without decoding it; None where it can't be told cheaply
+
+    The robotId is a best-effort hint and is only used for filtering.
+    """
+    if isinstance(frame, bytes):
+        if len(frame) < 2 or frame[0] != wire_codec.BINARY_VERSION:
+            return None, None
+        msg_type = wire_codec.TYPE_NAMES.get(frame[1])
+        robot_id = None
+        if msg_type == "robot_location" and len(frame) > 30:
+            robot_id = frame[31:31 + frame[30]].decode("utf-8", "replace")
+        return msg_type, robot_id
+    match = _PEEK_TYPE.match(frame)
+    if match is None:
+        return None, None
+    robot_match = _PEEK_ROBOT_ID.search(frame, match.end())
+    return match.group(1), robot_match.group(1) if robot_match else None
+
+
+def decode_frame(frame):
+    """Decode a received frame: binary location frames or schema-checked JSON"""
+    if isinstance(frame, bytes):
+        return wire_codec.decode(frame)
+    return message_schema.validate(json.loads(frame))
+
+
+class TypeStats:
+    __slots__ = ("received", "skipped", "handled", "errors", "timings")
+
+    def __init__(self):
+        self.received = 0
+        self.skipped = 0
+        self.handled = 0
+        self.errors = 0
+        self.timings = LatencyHistogram()
+
+
+class MessageDispatcher:
+    """Routes frames to the handler registered for their message type"""
+
+    def __init__(self, decode=decode_frame, clock=time.perf_counter):
+        self.decode = decode
+        self.clock = clock
+        self.handlers = {}
+        self.disabled = set()
+        self.robot_filter = None  # Set of robotIds to keep, or None for all
+        self.type_stats = {}
+
+    def register(self, msg_type, handler):
+        """handler(message) for msg_type (OTHER catches every type without its own handler)"""
+        self.handlers[msg_type] = handler
+
+    def handler_key(self, msg_type):
+        return msg_type if msg_type in self.handlers else OTHER
+
+    def is_enabled(self, msg_type):
+        return self.handler_key(msg_type) not in self.disabled
+
+    def set_enabled(self, msg_type, enabled):
+        if enabled:
+            self.disabled.discard(msg_type)
+        else:
+            self.disabled.add(msg_type)
+
+    def set_robot_filter(self, robot_ids):
+        self.robot_filter = set(robot_ids) if robot_ids else None
+
+    def _stats(self, msg_type):
+        stats = self.type_stats.get(msg_type)
+        if stats is None:
+            stats = self.type_stats[msg_type] = TypeStats()
+        return stats
+
+    def _skip(self, msg_type, robot_id):
+        return (self.handler_key(msg_type) in self.disabled or
+                (self.robot_filter is not None and robot_id is not None and robot_id not in self.robot_filter))
+
+    def dispatch(self, frame):
+        """Decode and handle one frame; returns the message, or None if it was skipped
+
+        Decoding errors propagate to the caller. Handler errors are counted and re-raised.
+        """
+        msg_type, robot_id = peek(frame)
+        if msg_type is not None:
+            stats = self._stats(msg_type)
+            stats.received += 1
+            if self._skip(msg_type, robot_id):
+                stats.skipped += 1
+                return None
+
+        try:
+            message = self.decode(frame)
+        except Exception:
+            if msg_type is not None:
+                stats.errors += 1
+            raise
+        if msg_type is None:
+            # Could not peek: apply the same checks to the decoded message
+            msg_type = message.get("type", "unknown")
+            stats = self._stats(msg_type)
+            stats.received += 1
+            if self._skip(msg_type, message.get("robotId")):
+                stats.skipped += 1
+                return None
+
+        handler = self.handlers.get(msg_type) or self.handlers.get(OTHER)
+        if handler is None:
+            return message
+        started = self.clock()
+        try:
+            handler(message)
+        except Exception:
+            stats.errors += 1
+            raise
+        stats.timings.record(self.clock() - started)
+        stats.handled += 1
+        return message
+
+    def stats(self):
+        """Per type counters and handler timings in milliseconds"""
+        result = {}
+        for msg_type, stats in sorted(self.type_stats.items()):
+            timings = stats.timings.summary()
+            result[msg_type] = {
+                "received": stats.received,
+                "skipped": stats.skipped,
+                "handled": stats.handled,
+                "errors": stats.errors,
+                "handler_p50_ms": timings["p50_ms"],
+                "handler_p95_ms": timings["p95_ms"],
+                "handler_max_ms": timings["max_ms"]
+            }
+        return result
+
+    def summary(self):
+        return ", ".join(
+            f"{msg_type}: {stats['handled']}/{stats['received']} handled, {stats['skipped']} skipped, "
+            f"p95 {stats['handler_p95_ms'] * 1000:.0f}us"
+            for msg_type, stats in self.stats().items()
+        ) or "no messages"
+
+    def reset_stats(self):
+        self.type_stats = {}
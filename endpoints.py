@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""Probing of alternative server endpoints and latency-based selection
+
+A probe opens a WebSocket to the endpoint and times the handshake (TCP, TLS and
+HTTP upgrade), then times a few protocol-level ping/pong round trips, so it works
+whatever the server does with application messages. Endpoints are ranked by RTT
+(then handshake time); one that fails is put on a cool-down so failover moves on
+to the next best. probe_endpoint_async and EndpointManager.probe_all_async do the
+same on an asyncio loop (websockets, imported when first used).
+"""
+import threading
+import time
+
+import websocket
+
+DEFAULT_ENDPOINTS = ("wss://sibl.online/ws", "ws://localhost:8000", "ws://localhost:3000")
+PROBE_TIMEOUT = 3.0  # Seconds for the handshake and for each pong
+PROBE_PINGS = 3
+FAILURE_COOLDOWN = 30.0  # Seconds a failed endpoint is ranked behind every other one
+
+
+def probe_endpoint(url, sslopt=None, timeout=PROBE_TIMEOUT, pings=PROBE_PINGS, clock=time.perf_counter):
+    """(handshake_ms, rtt_ms) of one endpoint, rtt being the median of the pings; raises on failure"""
+    started = clock()
+    ws = websocket.create_connection(url, timeout=timeout, sslopt=sslopt or {})
+    try:
+        handshake_ms = (clock() - started) * 1000
+        return handshake_ms, ping_rtt(ws, pings, timeout, clock)
+    finally:
+        ws.close()
+
+
+def ping_rtt(ws, pings=PROBE_PINGS, timeout=PROBE_TIMEOUT, clock=time.perf_counter):
+    """Median round trip in ms of protocol-level pings on an open websocket-client connection"""
+    rtts = []
+    for seq in range(pings):
+        payload = f"probe-{seq}".encode()
+        sent = clock()
+        ws.ping(payload)
+        while True:
+            # Broadcasts may arrive before the pong; each recv is bounded by the socket timeout
+            opcode, data = ws.recv_data(control_frame=True)
+            if opcode == websocket.ABNF.OPCODE_PONG and data == payload:
+                rtts.append((clock() - sent) * 1000)
+                break
+            if clock() - sent > timeout:
+                raise TimeoutError(f"no pong within {timeout}s")
+    rtts.sort()
+    return rtts[len(rtts) // 2]
+
+
+async def probe_endpoint_async(url, ssl_context=None, timeout=PROBE_TIMEOUT, pings=PROBE_PINGS,
+                               clock=time.perf_counter):
+    """probe_endpoint with websockets on the running loop; ssl_context is used for wss:// only"""
+    import asyncio
+    import websockets
+    started = clock()
+    async with websockets.connect(url, ssl=ssl_context if url.startswith("wss:") else None, open_timeout=timeout,
+                                  ping_interval=None, compression=None, max_queue=None) as ws:
+        handshake_ms = (clock() - started) * 1000
+        rtts = []
+        for seq in range(pings):
+            sent = clock()
+            pong = await ws.ping(f"probe-{seq}".encode())
+            try:
+                await asyncio.wait_for(pong, timeout)
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"no pong within {timeout}s") from None
+            rtts.append((clock() - sent) * 1000)
+    rtts.sort()
+    return handshake_ms, rtts[len(rtts) // 2]
+
+
+class EndpointStats:
+    __slots__ = ("url", "handshake_ms", "rtt_ms", "error", "probed_at", "failures", "down_until")
+
+    def __init__(self, url):
+        self.url = url
+        self.handshake_ms = None
+        self.rtt_ms = None
+        self.error = None
+        self.probed_at = None
+        self.failures = 0
+        self.down_until = None
+
+    def snapshot(self):
+        return {
+            "url": self.url,
+            "handshake_ms": self.handshake_ms,
+            "rtt_ms": self.rtt_ms,
+            "error": self.error,
+            "failures": self.failures
+        }
+
+
+class EndpointManager:
+    """Ranks a set of endpoints by measured latency and tracks which ones failed"""
+
+    def __init__(self, urls=DEFAULT_ENDPOINTS, probe=probe_endpoint, cooldown=FAILURE_COOLDOWN, clock=time.monotonic,
+                 async_probe=probe_endpoint_async):
+        self.probe = probe
+        self.async_probe = async_probe
+        self.cooldown = cooldown
+        self.clock = clock
+        self._endpoints = {}  # url -> EndpointStats, in configured order
+        self._lock = threading.Lock()
+        self.set_urls(urls)
+
+    def set_urls(self, urls):
+        """Replace the endpoint list, keeping measurements of URLs that stay"""
+        with self._lock:
+            old = self._endpoints
+            self._endpoints = {}
+            for url in urls:
+                url = url.strip()
+                if url and url not in self._endpoints:
+                    self._endpoints[url] = old.get(url) or EndpointStats(url)
+
+    @property
+    def urls(self):
+        return list(self._endpoints)
+
+    def _get(self, url):
+        stats = self._endpoints.get(url)
+        if stats is None:
+            stats = self._endpoints[url] = EndpointStats(url)
+        return stats
+
+    def record_probe(self, url, handshake_ms, rtt_ms):
+        with self._lock:
+            stats = self._get(url)
+            stats.handshake_ms = handshake_ms
+            stats.rtt_ms = rtt_ms
+            stats.error = None
+            stats.probed_at = self.clock()
+            stats.down_until = None
+
+    def record_failure(self, url, error):
+        """A probe or a live connection failed: rank the endpoint last for a cool-down"""
+        with self._lock:
+            stats = self._get(url)
+            stats.error = str(error) or type(error).__name__
+            stats.failures += 1
+            stats.down_until = self.clock() + self.cooldown
+
+    def mark_connected(self, url):
+        with self._lock:
+            stats = self._get(url)
+            stats.failures = 0
+            stats.down_until = None
+
+    def probe_all(self, **probe_options):
+        """Probe every endpoint in parallel; returns the ranking afterwards"""
+        def run(url):
+            try:
+                handshake_ms, rtt_ms = self.probe(url, **probe_options)
+            except Exception as e:
+                self.record_failure(url, e)
+            else:
+                self.record_probe(url, handshake_ms, rtt_ms)
+
+        threads = [threading.Thread(target=run, args=(url,), daemon=True, name=f"probe-{url}") for url in self.urls]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.ranked()
+
+    async def probe_all_async(self, **probe_options):
+        """probe_all on the running asyncio loop, every endpoint concurrently with async_probe"""
+        import asyncio
+
+        async def run(url):
+            try:
+                handshake_ms, rtt_ms = await self.async_probe(url, **probe_options)
+            except Exception as e:
+                self.record_failure(url, e)
+            else:
+                self.record_probe(url, handshake_ms, rtt_ms)
+
+        await asyncio.gather(*(run(url) for url in self.urls))
+        return self.ranked()
+
+    def ranked(self):
+        """Endpoint snapshots, best first: measured, then unmeasured, then cooling down"""
+        now = self.clock()
+        with self._lock:
+            endpoints = list(self._endpoints.values())
+
+        def rank(item):
+            order, stats = item
+            if stats.down_until is not None and stats.down_until > now:
+                return (2, stats.down_until, order)
+            if stats.rtt_ms is None:
+                return (1, 0.0, order)
+            return (0, stats.rtt_ms, stats.handshake_ms or 0.0, order)
+
+        return [stats.snapshot() for _, stats in sorted(enumerate(endpoints), key=rank)]
+
+    def best(self, exclude=()):
+        """URL of the best endpoint not in exclude and not cooling down, or None"""
+        now = self.clock()
+        for snapshot in self.ranked():
+            stats = self._endpoints.get(snapshot["url"])
+            if snapshot["url"] in exclude or (stats is not None and stats.down_until is not None and stats.down_until > now):
+                continue
+            return snapshot["url"]
+        return None
+
+    def summary(self):
+        parts = []
+        for snapshot in self.ranked():
+            if snapshot["rtt_ms"] is not None and snapshot["error"] is None:
+                parts.append(f"{snapshot['url']}: RTT {snapshot['rtt_ms']:.1f}ms, handshake {snapshot['handshake_ms']:.1f}ms")
+            else:
+                parts.append(f"{snapshot['url']}: {snapshot['error'] or 'not probed'}")
+        return ", ".join(parts) or "no endpoints"
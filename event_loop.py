@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""One asyncio loop thread for network and timing work, and the one bridge back to Tk
+
+The GUI runs on two threads:
+  - the Tk thread owns every widget and Tk variable and handles user input;
+  - the loop thread (LoopThread) runs the WebSocket connection, the outbound
+    writer, pings, reconnect backoff, auto-increment, route playback, route
+    upload, capture replay and endpoint probes as tasks on one asyncio loop.
+
+The loop never touches Tk. Work that must reach the UI goes through
+TkBridge.post(func, *args), which queues the call; the Tk thread runs queued
+calls in order, polling often while calls keep coming and backing off while
+idle. Tk settings (entry fields, checkboxes) are read on the Tk thread and
+handed to the loop with LoopThread.spawn(coro) or LoopThread.call(func, *args).
+Blocking work that would stall the loop (parsing a large route file) goes to
+the loop's default executor.
+"""
+import asyncio
+import sys
+import threading
+from collections import deque
+
+BRIDGE_MIN_INTERVAL_MS = 4  # Poll period while calls are arriving
+BRIDGE_MAX_INTERVAL_MS = 50  # Idle poll period; the longest a call waits for an idle Tk thread
+
+
+class LoopThread:
+    """An asyncio event loop running forever in a daemon thread"""
+
+    def __init__(self, name="event-loop"):
+        self.name = name
+        self.loop = None
+        self.thread = None
+
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run, daemon=True, name=self.name)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    def in_loop(self):
+        return threading.current_thread() is self.thread
+
+    def spawn(self, coro):
+        """Run a coroutine as a task on the loop; returns a concurrent.futures.Future (cancel() is thread-safe)"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call(self, func, *args):
+        """Call func(*args) on the loop thread"""
+        self.loop.call_soon_threadsafe(func, *args)
+
+    def stop(self, timeout=2.0):
+        """Cancel every task, give them timeout seconds to finish, then stop the loop"""
+        if self.loop is None or self.loop.is_closed():
+            return
+
+        async def shutdown():
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.wait(tasks, timeout=timeout)
+            self.loop.stop()
+
+        try:
+            self.spawn(shutdown())
+        except RuntimeError:
+            return  # Already stopped
+        self.thread.join(timeout + 1.0)
+
+
+class TkBridge:
+    """Calls posted from any thread, run in order on the Tk thread
+
+    Posting only appends to a deque, so the posting thread never waits for Tk.
+    Exceptions go to Tk's report_callback_exception, like any other callback.
+    """
+
+    def __init__(self, root, min_interval_ms=BRIDGE_MIN_INTERVAL_MS, max_interval_ms=BRIDGE_MAX_INTERVAL_MS):
+        self.root = root
+        self.min_interval_ms = min_interval_ms
+        self.max_interval_ms = max_interval_ms
+        self.interval_ms = min_interval_ms
+        self._calls = deque()
+        self._after_id = None
+        self.ran = 0
+        self.polls = 0
+
+    def post(self, func, *args):
+        self._calls.append((func, args))
+
+    @property
+    def backlog(self):
+        """Calls waiting for the Tk thread"""
+        return len(self._calls)
+
+    def start(self):
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval_ms, self._drain)
+        return self
+
+    def stop(self):
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _drain(self):
+        self.polls += 1
+        # Only what was queued before this poll, so a steady stream can't starve Tk of its own events
+        count = len(self._calls)
+        for _ in range(count):
+            func, args = self._calls.popleft()
+            try:
+                func(*args)
+            except Exception:
+                self.root.report_callback_exception(*sys.exc_info())
+        self.ran += count
+        if count or self._calls:
+            self.interval_ms = self.min_interval_ms
+        else:
+            self.interval_ms = min(self.interval_ms * 2, self.max_interval_ms)
+        self._after_id = self.root.after(self.interval_ms, self._drain)
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""Headless asyncio engine that simulates many robot connections in one process
+
+Every simulated robot is a coroutine on a single event loop, so a load test with
+thousands of connections needs no Tk window and no thread per connection.
+
+    python headless_engine.py --url ws://localhost:8000 --robots 1000 --interval 100
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+import websockets
+
+import robot_protocol as protocol
+import scheduler
+import wire_codec
+import message_schema
+import dispatch
+import tls_session
+from batching import LocationBatcher
+from route_playback import RouteGeometry, RoutePlayback
+
+# Broadcast types the simulated robots never act on; skipped before parsing
+IGNORED_TYPES = frozenset(("robot_location", "location_batch", "robot_status", "location", "location_track", "pong"))
+
+
+class SimulatedRobot:
+    """One simulated robot connection: moves north (or along a route) and streams its location"""
+
+    def __init__(self, engine, robot_id, lat, lng):
+        self.engine = engine
+        self.robot_id = robot_id
+        self.lat = lat
+        self.lng = lng
+        self.last_lat = None
+        self.last_lng = None
+        self.current_direction = 0
+
+        self.ws = None
+        self.connected = False
+        self.reconnect_attempts = 0
+        self.error = None
+        self.scheduler = None
+        self.wire_codec = wire_codec.CODEC_JSON
+        self.batcher = None
+        self.flush_handle = None
+        self.playback = None
+
+    async def run(self):
+        """Connect and keep reconnecting with the same backoff policy as the GUI client"""
+        engine = self.engine
+        while engine.running:
+            try:
+                async with websockets.connect(
+                    engine.url,
+                    ssl=engine.ssl_context,
+                    open_timeout=engine.open_timeout,
+                    ping_interval=None,
+                    compression=None,
+                    max_queue=engine.max_queue
+                ) as ws:
+                    self.on_open(ws)
+                    if engine.prefer_binary:
+                        await ws.send(json.dumps(wire_codec.hello_message()))
+                    sender = asyncio.ensure_future(self.send_loop())
+                    try:
+                        async for event_data in ws:
+                            await self.on_message(event_data)
+                    finally:
+                        sender.cancel()
+            except asyncio.CancelledError:
+                self.on_close()
+                raise
+            except Exception as e:
+                self.error = str(e)
+                engine.stats["errors"] += 1
+
+            self.on_close()
+            if not engine.running:
+                break
+
+            # Attempt to reconnect (matching React hook behavior)
+            if self.reconnect_attempts < engine.max_reconnect_attempts:
+                self.reconnect_attempts += 1
+                engine.stats["reconnects"] += 1
+                await asyncio.sleep(protocol.reconnect_delay_ms(self.reconnect_attempts) / 1000.0)
+            else:
+                self.error = "Failed to reconnect to WebSocket server"
+                engine.stats["failed"] += 1
+                break
+
+    def on_open(self, ws):
+        self.ws = ws
+        self.connected = True
+        self.error = None
+        self.reconnect_attempts = 0
+        self.engine.stats["connected"] += 1
+        self.engine.stats["opens"] += 1
+        ssl_object = ws.transport.get_extra_info("ssl_object")
+        if ssl_object is not None:
+            # Robots connecting later (and reconnects) offer the latest session; the server
+            # ticket has normally arrived by the time the upgrade response was read
+            self.engine.ssl_context.save_session_from(ssl_object)
+            self.engine.stats["tls_resumed"] += ssl_object.session_reused
+
+    def on_close(self):
+        if self.ws is not None and self.engine.ssl_context is not None:
+            self.engine.ssl_context.save_session_from(self.ws.transport.get_extra_info("ssl_object"))
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        if self.connected:
+            self.engine.stats["connected"] -= 1
+        self.connected = False
+        self.wire_codec = wire_codec.CODEC_JSON
+        self.ws = None
+
+    async def on_message(self, event_data):
+        self.engine.stats["received"] += 1
+        if isinstance(event_data, bytes):
+            # Binary frames only carry locations, which the simulated robots ignore
+            return
+        if dispatch.peek(event_data)[0] in IGNORED_TYPES:
+            self.engine.stats["skipped"] += 1
+            return
+        try:
+            message = json.loads(event_data)
+        except (ValueError, TypeError):
+            self.engine.stats["parse_errors"] += 1
+            return
+        if not isinstance(message, dict):
+            return
+        codec = wire_codec.accepted_codec(message)
+        if codec is not None:
+            if self.engine.prefer_binary:
+                self.wire_codec = codec
+        elif message.get('command') == 'sendlocation':
+            await self.send_location()
+
+    async def send(self, message):
+        if self.ws is None:
+            return
+        await self.ws.send(message_schema.to_json(message))
+        self.engine.stats["sent"] += 1
+
+    def update_direction(self):
+        if self.playback is None and self.last_lat is not None and self.last_lng is not None:
+            self.current_direction = protocol.calculate_direction(self.last_lat, self.last_lng, self.lat, self.lng)
+
+    async def batch_location(self):
+        """Add the current position to the pending batch and send it once it is due"""
+        self.update_direction()
+        self.last_lat = self.lat
+        self.last_lng = self.lng
+        batch = self.batcher.add(self.lat, self.lng, self.current_direction)
+        if batch:
+            await self.send(batch)
+        elif self.flush_handle is None:
+            self.flush_handle = asyncio.get_running_loop().call_later(
+                self.batcher.next_flush_in(), lambda: asyncio.ensure_future(self.flush_batch()))
+
+    async def flush_batch(self):
+        self.flush_handle = None
+        batch = self.batcher.flush()
+        if batch and self.connected:
+            try:
+                await self.send(batch)
+            except websockets.ConnectionClosed:
+                pass
+
+    async def send_location(self):
+        """Send the current position, updating direction from the previous one"""
+        self.update_direction()
+        if self.wire_codec == wire_codec.CODEC_BINARY:
+            if self.ws is not None:
+                await self.ws.send(wire_codec.encode_location(self.lat, self.lng, self.current_direction,
+                                                              msg_type=self.engine.location_type))
+                self.engine.stats["sent"] += 1
+        else:
+            await self.send(message_schema.location(self.lat, self.lng, self.current_direction,
+                                                    msg_type=self.engine.location_type))
+        self.last_lat = self.lat
+        self.last_lng = self.lng
+
+    async def send_loop(self):
+        try:
+            await self.stream_location()
+        except websockets.ConnectionClosed:
+            pass
+        except message_schema.SchemaError as e:
+            # e.g. the latitude walked off the map; this robot stops sending
+            self.error = str(e)
+            self.engine.stats["errors"] += 1
+
+    async def stream_location(self):
+        engine = self.engine
+        if engine.send_route:
+            await self.send(message_schema.route_waypoints())
+        if engine.icon_type:
+            await self.send(message_schema.icon_pin(self.lat, self.lng, engine.icon_type))
+
+        # Spread the robots over the interval so sends don't arrive in bursts
+        await asyncio.sleep(random.uniform(0, engine.send_interval))
+        next_status = time.monotonic() + engine.status_interval if engine.status_interval else None
+
+        if engine.batch_window or engine.batch_size > 1:
+            self.batcher = LocationBatcher(engine.batch_window, engine.batch_size, location_type=engine.location_type)
+
+        if engine.route_geometry is not None:
+            # Every robot loops the shared route geometry from its own starting point
+            self.playback = RoutePlayback(engine.route_geometry, engine.playback_speed, loop=True,
+                                          start_distance=random.uniform(0, engine.route_geometry.total_length))
+
+        async def tick():
+            nonlocal next_status
+            if self.playback is not None:
+                self.lat, self.lng, self.current_direction = self.playback.position(self.scheduler.scheduled_elapsed())
+            else:
+                self.lat += engine.increment_step
+            if self.batcher:
+                await self.batch_location()
+            else:
+                await self.send_location()
+            if next_status is not None and time.monotonic() >= next_status:
+                await self.send(message_schema.status())
+                next_status += engine.status_interval
+
+        self.scheduler = scheduler.FixedRateScheduler(engine.send_interval, policy=engine.late_policy)
+        await self.scheduler.run_async(tick, lambda: self.connected)
+
+
+class HeadlessEngine:
+    """Runs many SimulatedRobot connections on one asyncio loop"""
+
+    def __init__(self, url, robots=10, send_interval=0.1, increment_step=0.0001,
+                 start_lat=37.7749, start_lng=-122.4194, spread=0.01,
+                 location_type="location", status_interval=0, send_route=False, icon_type=None,
+                 skip_ssl_verification=True, ramp_per_second=200, open_timeout=10,
+                 max_reconnect_attempts=protocol.MAX_RECONNECT_ATTEMPTS, max_queue=32,
+                 late_policy=scheduler.DROP, prefer_binary=False, batch_window=0, batch_size=1,
+                 playback_speed=None, route_waypoints=None):
+        self.url = url
+        self.robot_count = robots
+        self.send_interval = send_interval
+        self.increment_step = increment_step
+        self.start_lat = start_lat
+        self.start_lng = start_lng
+        self.spread = spread
+        self.location_type = location_type
+        self.status_interval = status_interval
+        self.send_route = send_route
+        self.icon_type = icon_type
+        self.ramp_per_second = ramp_per_second
+        self.open_timeout = open_timeout
+        self.max_reconnect_attempts = max_reconnect_attempts
+        self.max_queue = max_queue
+        self.late_policy = late_policy
+        self.prefer_binary = prefer_binary or wire_codec.url_requests_binary(url)
+        self.batch_window = batch_window
+        self.batch_size = batch_size
+        self.playback_speed = playback_speed
+        self.route_geometry = None
+        if playback_speed:
+            self.route_geometry = RouteGeometry(route_waypoints or protocol.DEFAULT_ROUTE_WAYPOINTS)
+
+        self.ssl_context = None
+        if url.startswith('wss://'):
+            self.ssl_context = tls_session.client_context(verify=not skip_ssl_verification)
+
+        self.robots = []
+        self.tasks = []
+        self.running = False
+        self.stats = {
+            "connected": 0,
+            "opens": 0,
+            "tls_resumed": 0,
+            "sent": 0,
+            "received": 0,
+            "errors": 0,
+            "parse_errors": 0,
+            "skipped": 0,
+            "reconnects": 0,
+            "failed": 0
+        }
+
+    async def start(self):
+        """Create the robots and ramp up their connections"""
+        self.running = True
+        for i in range(self.robot_count):
+            robot = SimulatedRobot(
+                self,
+                f"sim-{i:05d}",
+                self.start_lat + random.uniform(-self.spread, self.spread),
+                self.start_lng + random.uniform(-self.spread, self.spread)
+            )
+            self.robots.append(robot)
+            self.tasks.append(asyncio.ensure_future(robot.run()))
+            if self.ramp_per_second:
+                await asyncio.sleep(1.0 / self.ramp_per_second)
+
+    async def stop(self):
+        """Close every connection and wait for the robots to finish"""
+        self.running = False
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    async def run(self, duration=None, report_interval=5.0):
+        """Run the engine, printing stats every report_interval seconds"""
+        started = time.monotonic()
+        await self.start()
+        try:
+            last_sent = 0
+            last_report = time.monotonic()
+            while self.running:
+                await asyncio.sleep(report_interval)
+                now = time.monotonic()
+                rate = (self.stats["sent"] - last_sent) / (now - last_report)
+                last_sent, last_report = self.stats["sent"], now
+                print(f"[{now - started:7.1f}s] connected={self.stats['connected']}/{self.robot_count} "
+                      f"sent={self.stats['sent']} ({rate:.0f}/s) received={self.stats['received']} "
+                      f"reconnects={self.stats['reconnects']} errors={self.stats['errors']} "
+                      f"failed={self.stats['failed']}", flush=True)
+                if duration is not None and now - started >= duration:
+                    break
+                if self.stats["failed"] == self.robot_count:
+                    break
+        finally:
+            await self.stop()
+        return dict(self.stats)
+
+
+def raise_open_file_limit(needed):
+    """Raise the soft file descriptor limit so each connection can get a socket"""
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < needed:
+        target = needed if hard == resource.RLIM_INFINITY else min(needed, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate many robot WebSocket connections without a GUI")
+    parser.add_argument("--url", default="wss://sibl.online/ws", help="WebSocket URL")
+    parser.add_argument("--robots", type=int, default=10, help="Number of simulated robots")
+    parser.add_argument("--interval", type=float, default=100, help="Send interval per robot (ms)")
+    parser.add_argument("--step", type=float, default=0.0001, help="Latitude step per send")
+    parser.add_argument("--duration", type=float, default=None, help="Stop after this many seconds")
+    parser.add_argument("--ramp", type=float, default=200, help="New connections per second (0 = all at once)")
+    parser.add_argument("--late-ticks", choices=scheduler.POLICIES, default=scheduler.DROP, help="What to do with sends that fall behind schedule")
+    parser.add_argument("--binary", action="store_true", help="Offer binary location frames to the server")
+    parser.add_argument("--batch-window", type=float, default=0, help="Batch locations for this many ms (0 = off)")
+    parser.add_argument("--batch-size", type=int, default=1, help="Send a batch once it holds this many locations")
+    parser.add_argument("--playback-speed", type=float, default=None, help="Drive every robot around the route at this speed (m/s)")
+    parser.add_argument("--track", action="store_true", help="Send location_track instead of location")
+    parser.add_argument("--status-interval", type=float, default=0, help="Send a status message every N seconds")
+    parser.add_argument("--send-route", action="store_true", help="Send route waypoints after connecting")
+    parser.add_argument("--icon-pin", default=None, help="Send an icon pin of this type after connecting")
+    parser.add_argument("--verify-ssl", action="store_true", help="Verify SSL certificates")
+    parser.add_argument("--report-interval", type=float, default=5.0, help="Seconds between stats lines")
+    args = parser.parse_args()
+
+    raise_open_file_limit(args.robots + 64)
+    engine = HeadlessEngine(
+        args.url,
+        robots=args.robots,
+        send_interval=args.interval / 1000.0,
+        increment_step=args.step,
+        location_type="location_track" if args.track else "location",
+        status_interval=args.status_interval,
+        send_route=args.send_route,
+        icon_type=args.icon_pin,
+        skip_ssl_verification=not args.verify_ssl,
+        ramp_per_second=args.ramp,
+        late_policy=args.late_ticks,
+        prefer_binary=args.binary,
+        batch_window=args.batch_window / 1000.0,
+        batch_size=args.batch_size,
+        playback_speed=args.playback_speed
+    )
+    try:
+        stats = asyncio.run(engine.run(duration=args.duration, report_interval=args.report_interval))
+    except KeyboardInterrupt:
+        return
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Round-trip latency tracking for ping/pong"""
+import threading
+import time
+from collections import deque
+
+
+class LatencyHistogram:
+    """Log-linear (HDR-style) histogram of durations
+
+    Each power-of-two range of microseconds is split into sub_buckets linear
+    buckets, so memory is fixed and every recorded value keeps roughly
+    1/sub_buckets relative precision however many samples are recorded.
+    """
+
+    def __init__(self, highest_us=60000000, sub_buckets=32):
+        self.sub_buckets = sub_buckets
+        self.max_exponent = max(1, int(highest_us).bit_length())
+        self.counts = [0] * ((self.max_exponent + 1) * sub_buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * len(self.counts)
+            self.count = 0
+            self.total_us = 0
+            self.min_us = None
+            self.max_us = 0
+
+    def _index(self, value_us):
+        exponent = value_us.bit_length() - 1
+        if exponent > self.max_exponent:
+            return len(self.counts) - 1
+        sub = ((value_us - (1 << exponent)) * self.sub_buckets) >> exponent
+        return exponent * self.sub_buckets + sub
+
+    def _bucket_value(self, index):
+        exponent, sub = divmod(index, self.sub_buckets)
+        width = (1 << exponent) / self.sub_buckets
+        return (1 << exponent) + sub * width + width / 2
+
+    def record(self, seconds):
+        value_us = max(1, int(seconds * 1000000))
+        with self._lock:
+            self.counts[self._index(value_us)] += 1
+            self.count += 1
+            self.total_us += value_us
+            self.max_us = max(self.max_us, value_us)
+            self.min_us = value_us if self.min_us is None else min(self.min_us, value_us)
+
+    def percentile_us(self, p):
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = max(1, int(round(p / 100.0 * self.count)))
+            seen = 0
+            for index, bucket_count in enumerate(self.counts):
+                seen += bucket_count
+                if seen >= rank:
+                    return min(max(self._bucket_value(index), self.min_us), self.max_us)
+            return float(self.max_us)
+
+    def summary(self):
+        """Count and p50/p95/p99/max in milliseconds"""
+        return {
+            "count": self.count,
+            "p50_ms": self.percentile_us(50) / 1000,
+            "p95_ms": self.percentile_us(95) / 1000,
+            "p99_ms": self.percentile_us(99) / 1000,
+            "max_ms": self.max_us / 1000,
+            "mean_ms": (self.total_us / self.count / 1000) if self.count else 0.0
+        }
+
+
+class PingTracker:
+    """Matches sequenced pings with their pongs and keeps RTT statistics"""
+
+    def __init__(self, timeout=5.0, window=20, degraded_rtt_ms=1000.0, degraded_losses=3, clock=time.perf_counter):
+        self.timeout = timeout
+        self.degraded_rtt_ms = degraded_rtt_ms
+        self.degraded_losses = degraded_losses
+        self.clock = clock
+
+        self.histogram = LatencyHistogram()
+        self.recent = deque(maxlen=window)  # Recent RTTs in seconds, for degradation checks
+        self._lock = threading.Lock()
+        self._pending = {}  # seq -> (sent_at, manual); sent_at is None until the frame is written
+        self._next_seq = 1
+        self.sent = 0
+        self.lost = 0
+        self.consecutive_losses = 0
+        self.answered = False  # A pong arrived on this connection, so the server answers pings
+        self.last_rtt = None
+
+    def next_ping(self, manual=False):
+        """Reserve a sequence number for a ping about to be queued; mark_sent starts its clock"""
+        with self._lock:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._pending[seq] = (None, manual)
+            return seq
+
+    def mark_sent(self, seq):
+        """The ping was just written to the socket, so its RTT leaves out time spent in the send queue"""
+        with self._lock:
+            if seq not in self._pending:
+                return
+            sent_at, manual = self._pending[seq]
+            if sent_at is None:
+                self.sent += 1
+            self._pending[seq] = (self.clock(), manual)
+
+    def on_pong(self, seq=None):
+        """Record a pong; returns (rtt_seconds, manual) or None if it matches no ping
+
+        Servers that don't echo seq are matched to the oldest outstanding ping.
+        """
+        now = self.clock()
+        with self._lock:
+            if seq is None:
+                sent = [pending for pending, (sent_at, _) in self._pending.items() if sent_at is not None]
+                if not sent:
+                    return None
+                seq = min(sent)
+            pending = self._pending.get(seq)
+            if pending is None or pending[0] is None:
+                return None
+            sent_at, manual = self._pending.pop(seq)
+            self.consecutive_losses = 0
+            self.answered = True
+        rtt = now - sent_at
+        self.last_rtt = rtt
+        self.recent.append(rtt)
+        self.histogram.record(rtt)
+        return rtt, manual
+
+    def expire(self):
+        """Count pings older than timeout as lost; returns how many expired"""
+        cutoff = self.clock() - self.timeout
+        with self._lock:
+            expired = [seq for seq, (sent_at, _) in self._pending.items() if sent_at is not None and sent_at < cutoff]
+            for seq in expired:
+                del self._pending[seq]
+            self.lost += len(expired)
+            self.consecutive_losses += len(expired)
+        return len(expired)
+
+    def reset_connection(self):
+        """Forget outstanding pings and the recent window (new connection)"""
+        with self._lock:
+            self._pending.clear()
+            self.recent.clear()
+            self.consecutive_losses = 0
+            self.answered = False
+
+    def is_degraded(self):
+        """True if pongs stopped coming back or the recent RTTs are too slow
+
+        Lost pongs only count once the server has answered a ping on this
+        connection; servers without pong support are never degraded by losses.
+        """
+        if self.answered and self.consecutive_losses >= self.degraded_losses:
+            return True
+        recent = sorted(self.recent)
+        if len(recent) < max(3, self.recent.maxlen // 2):
+            return False
+        p95 = recent[min(len(recent) - 1, int(round(0.95 * (len(recent) - 1))))]
+        return p95 * 1000 > self.degraded_rtt_ms
+
+    def stats(self):
+        summary = self.histogram.summary()
+        summary.update({
+            "sent": self.sent,
+            "lost": self.lost,
+            "pending": len(self._pending),
+            "last_ms": (self.last_rtt * 1000) if self.last_rtt is not None else None
+        })
+        return summary
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""Bounded message log and a viewer that only renders the visible entries"""
+import json
+import tkinter as tk
+from tkinter import ttk
+
+DEFAULT_CAPACITY = 5000
+
+# Color coding
+LOG_COLORS = {
+    "SUCCESS": "darkgreen",
+    "ERROR": "red",
+    "INFO": "purple",
+    "WARNING": "orange",
+    "DIAGNOSTIC": "darkblue",
+    "CONNECTED": "darkgreen",
+    "DISCONNECTED": "red",
+    "RECEIVED": "green",
+    "ROBOT_LOCATION": "green",
+    "ROBOT_STATUS": "darkgreen",
+    "SENT": "blue",
+    "RAW_MESSAGE": "black",
+    "PARSED_MESSAGE": "darkblue"
+}
+
+
+class LogEntry:
+    """One log line
+
+    The payload is kept as the raw object and only pretty-printed the first time
+    the entry is displayed or exported.
+    """
+    __slots__ = ("timestamp", "message_type", "content", "payload", "_text")
+
+    def __init__(self, timestamp, message_type, content, payload=None):
+        self.timestamp = timestamp
+        self.message_type = message_type
+        self.content = content
+        self.payload = payload
+        self._text = None
+
+    def format(self):
+        if self._text is None:
+            content = self.content
+            if self.payload is not None:
+                payload = self.payload.to_dict() if hasattr(self.payload, "to_dict") else self.payload
+                content = f"{content}{json.dumps(payload, indent=2)}"
+            self._text = f"[{self.timestamp}] {self.message_type}: {content}"
+        return self._text
+
+
+class MessageLog:
+    """Fixed-capacity ring buffer of log entries; the oldest entry is evicted when full"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._entries = [None] * capacity
+        self._head = 0  # Index of the oldest entry
+        self._size = 0
+        self.total = 0  # Entries appended since the last clear, including evicted ones
+        self.muted = set()  # Categories that are dropped before an entry is built
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("log index out of range")
+        return self._entries[(self._head + index) % self.capacity]
+
+    def append(self, entry):
+        if self._size < self.capacity:
+            self._entries[(self._head + self._size) % self.capacity] = entry
+            self._size += 1
+        else:
+            self._entries[self._head] = entry
+            self._head = (self._head + 1) % self.capacity
+        self.total += 1
+
+    def window(self, start, count):
+        """Return up to count entries starting at start (0 = oldest retained)"""
+        start = max(0, start)
+        stop = min(self._size, start + count)
+        return [self._entries[(self._head + i) % self.capacity] for i in range(start, stop)]
+
+    def is_enabled(self, message_type):
+        return message_type not in self.muted
+
+    def set_enabled(self, message_type, enabled):
+        if enabled:
+            self.muted.discard(message_type)
+        else:
+            self.muted.add(message_type)
+
+    def export(self, path):
+        """Write the retained entries to a text file, oldest first"""
+        with open(path, "w", encoding="utf-8") as f:
+            for entry in self.window(0, self._size):
+                f.write(entry.format() + "\n")
+
+    def clear(self):
+        self._entries = [None] * self.capacity
+        self._head = 0
+        self._size = 0
+        self.total = 0
+
+    @property
+    def evicted(self):
+        return self.total - self._size
+
+
+class LogView(ttk.Frame):
+    """Read-only view over a MessageLog that renders only the entries on screen
+
+    The text widget never holds more than one screen of entries, so its size and
+    the cost of a refresh do not depend on how many entries have been logged.
+    """
+
+    def __init__(self, parent, message_log, height=20, colors=LOG_COLORS):
+        super().__init__(parent)
+        self.message_log = message_log
+        self.rows = height
+        self.first = 0  # Index of the first visible entry
+        self.follow = True  # Stick to the newest entry until the user scrolls up
+        self._refresh_pending = False
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        self.text = tk.Text(self, height=height, wrap=tk.NONE, state=tk.DISABLED)
+        self.text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.scrollbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+
+        # Configure color tags once instead of on every insert
+        for message_type, color in colors.items():
+            self.text.tag_config(message_type, foreground=color)
+
+        self.text.bind("<Configure>", self.on_configure)
+        self.text.bind("<MouseWheel>", self.on_mousewheel)
+        self.text.bind("<Button-4>", lambda event: self.scroll_by(-3))
+        self.text.bind("<Button-5>", lambda event: self.scroll_by(3))
+
+    def refresh(self):
+        """Schedule a redraw; repeated calls before the next idle cycle collapse into one"""
+        if not self._refresh_pending:
+            self._refresh_pending = True
+            self.after_idle(self.render)
+
+    def render(self):
+        self._refresh_pending = False
+        size = len(self.message_log)
+        max_first = max(0, size - self.rows)
+        if self.follow or self.first > max_first:
+            self.first = max_first
+
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        for entry in self.message_log.window(self.first, self.rows):
+            tags = (entry.message_type,) if entry.message_type in LOG_COLORS else ()
+            self.text.insert(tk.END, entry.format() + "\n", tags)
+        self.text.config(state=tk.DISABLED)
+        if self.follow:
+            # Multi-line entries can overflow the widget; keep the newest one in view
+            self.text.see(tk.END)
+
+        if size:
+            self.scrollbar.set(self.first / size, min(1.0, (self.first + self.rows) / size))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll_to(self, first):
+        max_first = max(0, len(self.message_log) - self.rows)
+        self.first = min(max(0, first), max_first)
+        self.follow = self.first >= max_first
+        self.refresh()
+
+    def scroll_by(self, delta):
+        self.scroll_to(self.first + delta)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == tk.MOVETO:
+            self.scroll_to(int(float(amount) * len(self.message_log)))
+        elif action == tk.SCROLL:
+            step = self.rows if unit == tk.PAGES else 1
+            self.scroll_by(int(amount) * step)
+
+    def on_mousewheel(self, event):
+        self.scroll_by(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def on_configure(self, event):
+        line_height = max(1, int(self.text.tk.call("font", "metrics", self.text.cget("font"), "-linespace")))
+        rows = max(1, event.height // line_height)
+        if rows != self.rows:
+            self.rows = rows
+            self.refresh()
@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""Declared message schemas compiled to JSON templates
+
+Every message type the client sends is declared once as a layout of constant
+and typed fields. Each layout is compiled at import into a %-format template
+that produces the same text as json.dumps of the equivalent dict, so sending a
+message costs a few field checks and one string format instead of building
+nested dicts and walking them with the JSON encoder. The same layouts validate
+decoded messages (see validate), including the inbound types the client
+dispatches on.
+
+    message = location(37.7749, -122.4194, 90.0)
+    message.encode()   # '{"type": "location", "data": {"lat": 37.7749, ...}}'
+    message.to_dict()  # the same message as a plain dict, for logging
+"""
+import binascii
+import json
+import math
+import sys
+import time
+import zlib
+from json.encoder import encode_basestring_ascii
+
+import robot_protocol as protocol
+import wire_codec
+
+
+class SchemaError(ValueError):
+    """Raised when a message or field value does not match its declared schema"""
+
+
+# Field kinds. check() validates a decoded value; for encoding, prepare() validates
+# a value and returns what goes into the kind's slot in the template.
+
+class Number:
+    slot = "%r"  # repr() of an int or float is its JSON text
+
+    def __init__(self, minimum=None, maximum=None, integer=False):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.integer = integer
+        # Bounds for the fast path; NaN and infinities always fail it
+        self.low = -sys.float_info.max if minimum is None else minimum
+        self.high = sys.float_info.max if maximum is None else maximum
+
+    def check(self, value):
+        value_type = type(value)
+        if value_type is float and not self.integer and self.low <= value <= self.high:
+            return value
+        if value_type is bool or not isinstance(value, (int, float)):
+            raise SchemaError(f"expected a number, got {value_type.__name__}")
+        if self.integer and not isinstance(value, int):
+            raise SchemaError(f"expected an integer, got {value!r}")
+        if isinstance(value, float) and (value != value or value in (math.inf, -math.inf)):
+            raise SchemaError(f"expected a finite number, got {value!r}")
+        if (self.minimum is not None and value < self.minimum) or (self.maximum is not None and value > self.maximum):
+            raise SchemaError(f"{value!r} is outside [{self.minimum}, {self.maximum}]")
+        return value
+
+    def prepare(self, value):
+        if type(value) is float and not self.integer and self.low <= value <= self.high:
+            return value
+        self.check(value)
+        # Plain int/float, so subclasses (numpy scalars) repr like JSON numbers
+        return float(value) if isinstance(value, float) else int(value)
+
+
+class String:
+    slot = "%s"
+
+    def __init__(self, min_length=0, max_length=None):
+        self.min_length = min_length
+        self.max_length = max_length
+
+    def check(self, value):
+        if type(value) is not str:
+            raise SchemaError(f"expected a string, got {type(value).__name__}")
+        if len(value) < self.min_length or (self.max_length is not None and len(value) > self.max_length):
+            raise SchemaError(f"length {len(value)} is outside [{self.min_length}, {self.max_length}]")
+        return value
+
+    def prepare(self, value):
+        return encode_basestring_ascii(self.check(value))
+
+
+class Timestamp(String):
+    """Timestamps from protocol.timestamp(); plain ASCII, so no escaping is needed"""
+
+    slot = '"%s"'
+
+    def prepare(self, value):
+        if type(value) is str and value:
+            return value
+        return self.check(value)
+
+
+class Waypoints:
+    slot = "%s"
+
+    def check(self, value):
+        if not isinstance(value, list) or not value:
+            raise SchemaError("expected a non-empty list of waypoints")
+        for i, waypoint in enumerate(value):
+            if not isinstance(waypoint, dict):
+                raise SchemaError(f"waypoint {i} is not an object")
+            try:
+                LAT.check(waypoint.get("lat"))
+                LNG.check(waypoint.get("lng"))
+            except SchemaError as e:
+                raise SchemaError(f"waypoint {i}: {e}")
+        return value
+
+    def prepare(self, value):
+        return json.dumps(self.check(value))
+
+
+class Points:
+    """List of location samples, e.g. the points of a location_batch (validation only)"""
+
+    def check(self, value):
+        if not isinstance(value, list):
+            raise SchemaError("expected a list of points")
+        for i, point in enumerate(value):
+            if not isinstance(point, dict):
+                raise SchemaError(f"point {i} is not an object")
+            try:
+                LAT.check(point.get("lat"))
+                LNG.check(point.get("lng"))
+                if "direction" in point:
+                    DIRECTION.check(point["direction"])
+            except SchemaError as e:
+                raise SchemaError(f"point {i}: {e}")
+        return value
+
+
+class Identifier:
+    """A string or integer id, e.g. robotId (validation only)"""
+
+    def check(self, value):
+        if type(value) is not str and (type(value) is bool or not isinstance(value, int)):
+            raise SchemaError(f"expected a string or integer id, got {type(value).__name__}")
+        return value
+
+
+class Optional:
+    """Field that may be missing from a decoded message (validation only)"""
+
+    def __init__(self, kind):
+        self.kind = kind
+
+    def check(self, value):
+        return self.kind.check(value)
+
+
+LAT = Number(-90, 90)
+LNG = Number(-180, 180)
+DIRECTION = Number(-360, 360)
+TIMESTAMP = Timestamp(min_length=1)
+LABEL = String(min_length=1, max_length=256)
+ROBOT_ID = Identifier()
+
+
+class Schema:
+    """Layout of one message type compiled to a JSON template
+
+    A layout is a list of (key, spec) pairs in output order, where spec is a
+    constant (str, int, float, bool or None), a field kind, or a nested layout.
+    The non-constant fields are the message values, in layout order.
+    """
+
+    def __init__(self, msg_type, layout):
+        self.msg_type = msg_type
+        self.layout = layout
+        self.names = []
+        self.kinds = []
+        self.template = self._compile(layout)
+        self.prepares = tuple(kind.prepare for kind in self.kinds)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        if len(self.positions) != len(self.names):
+            raise ValueError(f"schema '{msg_type}' repeats a field name")
+
+    def _compile(self, layout):
+        parts = []
+        for key, spec in layout:
+            if isinstance(spec, list):
+                value = self._compile(spec)
+            elif isinstance(spec, Optional):
+                raise ValueError(f"schema '{self.msg_type}': optional fields can only be validated, not encoded")
+            elif hasattr(spec, "prepare"):
+                self.names.append(key)
+                self.kinds.append(spec)
+                value = spec.slot
+            else:
+                value = json.dumps(spec).replace("%", "%%")
+            parts.append(json.dumps(key).replace("%", "%%") + ": " + value)
+        return "{" + ", ".join(parts) + "}"
+
+    def encode(self, values):
+        """JSON text of a message with these field values"""
+        try:
+            return self.template % tuple([prepare(value) for prepare, value in zip(self.prepares, values)])
+        except SchemaError:
+            for name, kind, value in zip(self.names, self.kinds, values):
+                try:
+                    kind.prepare(value)
+                except SchemaError as e:
+                    raise SchemaError(f"{self.msg_type}.{name}: {e}")
+            raise
+
+    def to_dict(self, values, layout=None):
+        values = iter(values) if layout is None else values
+        result = {}
+        for key, spec in self.layout if layout is None else layout:
+            if isinstance(spec, list):
+                result[key] = self.to_dict(values, spec)
+            elif hasattr(spec, "prepare"):
+                result[key] = next(values)
+            else:
+                result[key] = spec
+        return result
+
+    def validate(self, message, layout=None, path=""):
+        """Raise SchemaError unless the decoded message matches the layout (extra keys are allowed)"""
+        if not isinstance(message, dict):
+            raise SchemaError(f"{self.msg_type}{path}: expected an object, got {type(message).__name__}")
+        for key, spec in self.layout if layout is None else layout:
+            if key not in message:
+                if isinstance(spec, Optional):
+                    continue
+                raise SchemaError(f"{self.msg_type}{path}.{key}: missing")
+            value = message[key]
+            if isinstance(spec, list):
+                self.validate(value, spec, f"{path}.{key}")
+            elif isinstance(spec, Optional):
+                try:
+                    spec.kind.check(value)
+                except SchemaError as e:
+                    raise SchemaError(f"{self.msg_type}{path}.{key}: {e}")
+            elif hasattr(spec, "check"):
+                try:
+                    spec.check(value)
+                except SchemaError as e:
+                    raise SchemaError(f"{self.msg_type}{path}.{key}: {e}")
+            elif value != spec:
+                raise SchemaError(f"{self.msg_type}{path}.{key}: expected {spec!r}, got {value!r}")
+
+
+class InboundSchema(Schema):
+    """Schema of a message the client only receives: validated, never encoded"""
+
+    def __init__(self, msg_type, layout):
+        self.msg_type = msg_type
+        self.layout = layout
+
+
+class Message:
+    """Field values of a declared message type, with the JSON encoding cached"""
+
+    __slots__ = ("schema", "values", "created", "_text")
+
+    def __init__(self, schema, values, created=None):
+        self.schema = schema
+        self.values = values
+        self.created = created if created is not None else time.time()
+        self._text = None
+
+    @property
+    def msg_type(self):
+        return self.schema.msg_type
+
+    def __getitem__(self, name):
+        return self.values[self.schema.positions[name]]
+
+    def encode(self):
+        """JSON text of the message (validated and encoded once)"""
+        if self._text is None:
+            self._text = self.schema.encode(self.values)
+        return self._text
+
+    def to_dict(self):
+        return self.schema.to_dict(self.values)
+
+    def __repr__(self):
+        return f"Message({self.schema.msg_type}, {self.values!r})"
+
+
+def _location_layout(msg_type):
+    return [
+        ("type", msg_type),
+        ("data", [
+            ("lat", LAT),
+            ("lng", LNG),
+            ("direction", DIRECTION),
+            ("timestamp", TIMESTAMP)
+        ])
+    ]
+
+
+LOCATION = Schema("location", _location_layout("location"))
+LOCATION_TRACK = Schema("location_track", _location_layout("location_track"))
+STATUS = Schema("status", [
+    ("type", "status"),
+    ("data", [
+        ("battery", Number(0, 100)),
+        ("speed", Number(0)),
+        ("mode", LABEL),
+        ("timestamp", TIMESTAMP)
+    ])
+])
+PING = Schema("ping", [
+    ("type", "ping"),
+    ("timestamp", TIMESTAMP)
+])
+SEQUENCED_PING = Schema("ping", [
+    ("type", "ping"),
+    ("timestamp", TIMESTAMP),
+    ("seq", Number(minimum=0, integer=True))
+])
+ICON_PIN = Schema("icon_pin", [
+    ("type", "icon_pin"),
+    ("data", [
+        ("lat", LAT),
+        ("lng", LNG),
+        ("type", LABEL)
+    ])
+])
+ROUTE_WAYPOINTS = Schema("route_waypoints", [
+    ("type", "route_waypoints"),
+    ("action", "send_route"),
+    ("data", [
+        ("waypoints", Waypoints()),
+        ("routeName", LABEL),
+        ("routeType", LABEL),
+        ("totalStops", Number(minimum=1, integer=True)),
+        ("startLocation", LABEL),
+        ("endLocation", LABEL)
+    ]),
+    ("timestamp", TIMESTAMP),
+    ("source", "robot")
+])
+
+
+def _route_chunk_layout(waypoints_kind, encoding):
+    return [
+        ("type", "route_waypoints"),
+        ("action", "send_route"),
+        ("data", [
+            ("routeId", LABEL),
+            ("chunkIndex", Number(minimum=0, integer=True)),
+            ("totalChunks", Number(minimum=1, integer=True)),
+            ("firstStop", Number(minimum=0, integer=True)),
+            ("encoding", encoding),
+            ("waypoints", waypoints_kind),
+            ("routeName", LABEL),
+            ("routeType", LABEL),
+            ("totalStops", Number(minimum=1, integer=True))
+        ]),
+        ("timestamp", TIMESTAMP),
+        ("source", "robot")
+    ]
+
+
+# One slice of a long route; waypoints are JSON, or deflated JSON in base64
+ROUTE_WAYPOINTS_CHUNK = Schema("route_waypoints", _route_chunk_layout(Waypoints(), "json"))
+ROUTE_WAYPOINTS_CHUNK_DEFLATE = Schema("route_waypoints", _route_chunk_layout(String(min_length=1), "deflate+base64"))
+
+# Messages the client receives and dispatches on (validated, never encoded)
+ROBOT_LOCATION = InboundSchema("robot_location", [
+    ("type", "robot_location"),
+    ("robotId", Optional(ROBOT_ID)),
+    ("data", [
+        ("lat", LAT),
+        ("lng", LNG),
+        ("direction", Optional(DIRECTION))
+    ])
+])
+ROBOT_STATUS = InboundSchema("robot_status", [
+    ("type", "robot_status"),
+    ("robotId", Optional(ROBOT_ID)),
+    ("data", [])
+])
+LOCATION_BATCH = InboundSchema("location_batch", [
+    ("type", "location_batch"),
+    ("robotId", Optional(ROBOT_ID)),
+    ("data", [
+        ("locationType", Optional(LABEL)),
+        ("points", Points())
+    ])
+])
+PONG = InboundSchema("pong", [
+    ("type", "pong"),
+    ("seq", Optional(Number(minimum=0, integer=True)))
+])
+
+SCHEMAS = {schema.msg_type: schema for schema in (
+    LOCATION, LOCATION_TRACK, STATUS, PING, ICON_PIN, ROUTE_WAYPOINTS, ROBOT_LOCATION, ROBOT_STATUS, LOCATION_BATCH,
+    PONG
+)}
+
+
+def validate(message):
+    """Check a decoded message against the schema of its type; unknown types pass"""
+    if not isinstance(message, dict):
+        raise SchemaError(f"expected a message object, got {type(message).__name__}")
+    schema = SCHEMAS.get(message.get("type"))
+    if schema is not None:
+        schema.validate(message)
+    return message
+
+
+# Constructors, mirroring the robot_protocol dict builders
+
+def location(lat, lng, direction, msg_type="location", now=None):
+    now = time.time() if now is None else now
+    schema = LOCATION_TRACK if msg_type == "location_track" else LOCATION
+    if msg_type != schema.msg_type:
+        raise SchemaError(f"'{msg_type}' is not a location message type")
+    return Message(schema, (lat, lng, direction, protocol.timestamp(now)), now)
+
+
+def location_track(lat, lng, direction, now=None):
+    return location(lat, lng, direction, "location_track", now)
+
+
+def status(battery=85, speed=2.5, mode="autonomous", now=None):
+    now = time.time() if now is None else now
+    return Message(STATUS, (battery, speed, mode, protocol.timestamp(now)), now)
+
+
+def ping(seq=None, now=None):
+    now = time.time() if now is None else now
+    if seq is None:
+        return Message(PING, (protocol.timestamp(now),), now)
+    return Message(SEQUENCED_PING, (protocol.timestamp(now), seq), now)
+
+
+def icon_pin(lat, lng, icon_type):
+    return Message(ICON_PIN, (lat, lng, icon_type))
+
+
+def route_waypoints(waypoints=None, route_name="Robot Generated Route", route_type="delivery",
+                    start_location="Warehouse", end_location="Final Destination", now=None):
+    now = time.time() if now is None else now
+    if waypoints is None:
+        waypoints = protocol.DEFAULT_ROUTE_WAYPOINTS
+    return Message(ROUTE_WAYPOINTS, (waypoints, route_name, route_type, len(waypoints),
+                                     start_location, end_location, protocol.timestamp(now)), now)
+
+
+def route_waypoints_chunk(route_id, chunk_index, total_chunks, first_stop, waypoints, total_stops,
+                          route_name="Robot Generated Route", route_type="delivery", compress=False, now=None):
+    """Chunk chunk_index of total_chunks of a route; with compress the waypoints are validated, then deflated"""
+    now = time.time() if now is None else now
+    schema = ROUTE_WAYPOINTS_CHUNK
+    if compress:
+        schema = ROUTE_WAYPOINTS_CHUNK_DEFLATE
+        waypoints = binascii.b2a_base64(zlib.compress(Waypoints().prepare(waypoints).encode("ascii")), newline=False).decode("ascii")
+    return Message(schema, (route_id, chunk_index, total_chunks, first_stop, waypoints, route_name, route_type,
+                            total_stops, protocol.timestamp(now)), now)
+
+
+# Encoding helpers for senders that queue both Message objects and plain dicts
+
+def message_type(message):
+    if isinstance(message, Message):
+        return message.schema.msg_type
+    return message.get("type", "unknown") if isinstance(message, dict) else "raw"
+
+
+def field(message, name, default=None):
+    """A field of a Message or dict by name, or default if the message has no such field"""
+    if isinstance(message, Message):
+        return message[name] if name in message.schema.positions else default
+    return message.get(name, default) if isinstance(message, dict) else default
+
+
+def to_json(message):
+    return message.encode() if isinstance(message, Message) else json.dumps(message)
+
+
+def to_binary(message):
+    """Binary wire frame of a location message (Message or dict)"""
+    if isinstance(message, Message):
+        return wire_codec.encode_location(message["lat"], message["lng"], message["direction"],
+                                          int(message.created * 1000000), msg_type=message.msg_type)
+    return wire_codec.encode(message)
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""Client-side counters, gauges and latency histograms, exported locally
+
+    metrics = MetricsRegistry()
+    metrics.describe("messages_sent_total", COUNTER, "Messages sent, by type")
+    metrics.inc("messages_sent_total", type="location")
+    metrics.observe("send_seconds", 0.0004)
+    metrics.gauge("outbound_queue_depth", lambda: queue.depth)
+    MetricsServer(metrics, port=9464).start()    # Prometheus text on http://127.0.0.1:9464/metrics
+    SnapshotWriter(metrics, "metrics.jsonl", interval=10).start()    # A JSON line every 10 s
+
+Histograms are LatencyHistograms, exported as Prometheus summaries (quantiles
+plus _sum and _count). Gauges given a function are only read when a snapshot is
+taken, so nothing is polled between scrapes. The server binds to localhost only
+and, like http.server, is imported when it is started.
+"""
+import json
+import threading
+import time
+
+from latency import LatencyHistogram
+
+COUNTER = "counter"
+GAUGE = "gauge"
+SUMMARY = "summary"  # How histograms are exported
+
+DEFAULT_NAMESPACE = "robot_client"
+DEFAULT_PORT = 9464
+DEFAULT_SNAPSHOT_INTERVAL = 10.0
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _series(name, labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return name
+    return name + "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    """Named metrics, each with any number of label sets; safe to update from any thread"""
+
+    def __init__(self, namespace=DEFAULT_NAMESPACE):
+        self.namespace = namespace
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._help = {}  # name -> (kind, help text)
+        self._counters = {}  # (name, labels) -> number
+        self._gauges = {}  # (name, labels) -> number, or a function returning one
+        self._histograms = {}  # (name, labels) -> LatencyHistogram
+
+    def describe(self, name, kind, help_text):
+        self._help[name] = (kind, help_text)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def gauge(self, name, func, **labels):
+        """Gauge whose value is func(), read at snapshot time"""
+        self.set_gauge(name, func, **labels)
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram())
+        histogram.record(seconds)
+
+    def histogram(self, name, **labels):
+        return self._histograms.get((name, tuple(sorted(labels.items()))))
+
+    def value(self, name, **labels):
+        """Current value of a counter or gauge (0 if never set)"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            value = self._counters.get(key, self._gauges.get(key, 0))
+        return value() if callable(value) else value
+
+    def _collect(self):
+        """(counters, gauges, histograms) as sorted ((name, labels), value) lists; gauges read now"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted(self._gauges.items(), key=lambda item: item[0])
+            histograms = sorted(self._histograms.items(), key=lambda item: item[0])
+        readings = []
+        for key, value in gauges:
+            if callable(value):
+                try:
+                    value = value()
+                except Exception:
+                    continue  # A gauge that cannot be read right now is left out
+            if value is not None:
+                readings.append((key, value))
+        return counters, readings, histograms
+
+    def snapshot(self):
+        """Every metric as a JSON-friendly dict; histograms as LatencyHistogram summaries in ms"""
+        counters, gauges, histograms = self._collect()
+        result = {"timestamp": time.time(), "uptime_s": time.time() - self.started,
+                  "counters": {}, "gauges": {}, "histograms": {}}
+        for section, items in (("counters", counters), ("gauges", gauges)):
+            for (name, labels), value in items:
+                result[section].setdefault(name, []).append({"labels": dict(labels), "value": value})
+        for (name, labels), histogram in histograms:
+            result["histograms"].setdefault(name, []).append({"labels": dict(labels), **histogram.summary()})
+        return result
+
+    def prometheus(self):
+        """Every metric in the Prometheus text exposition format (0.0.4)"""
+        counters, gauges, histograms = self._collect()
+        lines = []
+        described = set()
+
+        def header(name, kind):
+            if name in described:
+                return
+            described.add(name)
+            full_name = f"{self.namespace}_{name}"
+            help_text = self._help.get(name, (kind, name))[1]
+            lines.append(f"# HELP {full_name} {help_text}")
+            lines.append(f"# TYPE {full_name} {kind}")
+
+        for kind, items in ((COUNTER, counters), (GAUGE, gauges)):
+            for (name, labels), value in items:
+                header(name, kind)
+                lines.append(f"{_series(f'{self.namespace}_{name}', labels)} {float(value)!r}")
+        for (name, labels), histogram in histograms:
+            header(name, SUMMARY)
+            full_name = f"{self.namespace}_{name}"
+            for quantile in QUANTILES:
+                seconds = histogram.percentile_us(quantile * 100) / 1000000
+                lines.append(f"{_series(full_name, labels, [('quantile', quantile)])} {seconds!r}")
+            lines.append(f"{_series(full_name + '_sum', labels)} {histogram.total_us / 1000000!r}")
+            lines.append(f"{_series(full_name + '_count', labels)} {histogram.count}")
+        lines.append(f"{self.namespace}_uptime_seconds {time.time() - self.started!r}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Serves /metrics (Prometheus text) and /metrics.json (a snapshot) on a localhost port"""
+
+    def __init__(self, registry, port=DEFAULT_PORT, host="127.0.0.1"):
+        self.registry = registry
+        self.host = host
+        self.requested_port = port
+        self.server = None
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.server.server_address[1] if self.server else self.requested_port
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def start(self):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?", 1)[0]
+                if path == "/metrics":
+                    body = registry.prometheus().encode("utf-8")
+                    content_type = "text/plain; version=0.0.4; charset=utf-8"
+                elif path == "/metrics.json":
+                    body = json.dumps(registry.snapshot()).encode("utf-8")
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes would otherwise be printed to stderr
+
+        self.server = ThreadingHTTPServer((self.host, self.requested_port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True, name="metrics-server")
+        self.thread.start()
+        return self
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+class SnapshotWriter(threading.Thread):
+    """Appends a JSON snapshot of the registry to a file every interval seconds (one per line)
+
+    A last snapshot is written on stop. A failed write stops the writer and is kept in error.
+    """
+
+    def __init__(self, registry, path, interval=DEFAULT_SNAPSHOT_INTERVAL):
+        super().__init__(daemon=True, name="metrics-snapshots")
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self.written = 0
+        self.error = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            if not self.write():
+                return
+        self.write()
+
+    def write(self):
+        if self.error is not None:
+            return False
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.registry.snapshot()) + "\n")
+        except OSError as e:
+            self.error = e
+            return False
+        self.written += 1
+        return True
+
+    def stop(self):
+        self._stop_event.set()
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout=2)
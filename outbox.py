@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Offline outbox: the outbound backlog saved to a local file
+
+While the client waits to reconnect, outbound messages stay in the OutboundQueue
+(bounded, and keeping only the latest location per stream). The outbox writes
+snapshots of that backlog to a JSON-lines file so it also survives a restart.
+Delivery is at-least-once: messages already flushed when the client was killed
+can be sent again on the next start.
+"""
+import json
+import os
+
+import message_schema
+
+DEFAULT_OUTBOX_PATH = "websocket_outbox.jsonl"
+DEFAULT_FLUSH_RATE = 50.0  # Messages per second while a backlog is flushed after reconnecting
+CONNECTION_TYPES = ("codec_hello", "ping")  # Only meaningful on the connection they were queued for
+
+
+class Outbox:
+    """Persists the backlog of an OutboundQueue to a file (or nowhere when path is None)"""
+
+    def __init__(self, queue, path=None):
+        self.queue = queue
+        self.path = path
+        self._saved = None  # Queue counters at the last save, to skip unchanged snapshots
+
+    def save(self):
+        """Write the current backlog (atomically); removes the file once the backlog is empty
+
+        Returns the number of messages saved.
+        """
+        if not self.path:
+            return 0
+        state = (self.queue.enqueued, self.queue.sent, self.queue.depth)
+        if state == self._saved:
+            return state[2]
+        messages = [message for message in self.queue.snapshot()
+                    if message_schema.message_type(message) not in CONNECTION_TYPES]
+        if not messages:
+            self.discard()
+        else:
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                for message in messages:
+                    f.write(message_schema.to_json(message) + "\n")
+            os.replace(temp_path, self.path)
+        self._saved = state
+        return len(messages)
+
+    def load(self):
+        """Queue the messages saved by an earlier run; returns how many were restored
+
+        Unreadable lines (e.g. from a crash mid-write) are skipped.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        restored = 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    continue
+                if isinstance(message, dict) and self.queue.put(message):
+                    restored += 1
+        return restored
+
+    def discard(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self._saved = None
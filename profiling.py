@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""Opt-in profiling of hot-path functions, switchable at runtime
+
+While profiling is on, every hooked function is replaced by a wrapper that
+records its wall time and the CPU time of the calling thread. With cprofile it
+also runs under that thread's cProfile.Profile, so the pstats dump shows where
+the hot paths spend their time. With tracemalloc, allocation snapshots are
+compared with the one taken when profiling started. Hooks are set as attributes
+on start and the originals put back on stop, so nothing is wrapped, and nothing
+costs extra, while profiling is off. A reference taken while hooked (e.g. a
+callback handed to a library) keeps calling the wrapper until it is taken again.
+
+    profiler = HotPathProfiler()
+    profiler.hook(json, "dumps", "json.dumps")
+    profiler.hook(app, "on_message")
+    profiler.start(cprofile=True, tracemalloc=True)
+    ...
+    print(profiler.summary())
+    profiler.dump_stats("websocket_client.pstats")
+    profiler.stop()
+
+ROBOT_CLIENT_PROFILE=1 turns everything on at startup; a comma separated list
+of cprofile and tracemalloc picks extras, and "timing" means the hook timings
+alone.
+"""
+import functools
+import os
+import threading
+import time
+
+from latency import LatencyHistogram
+
+ENV_VAR = "ROBOT_CLIENT_PROFILE"
+EXTRAS = ("cprofile", "tracemalloc")
+DEFAULT_STATS_PATH = "websocket_client.pstats"
+DEFAULT_TOP = 10
+
+
+def options_from_env(environ=None):
+    """Extras named by ROBOT_CLIENT_PROFILE, or None when profiling is not requested"""
+    value = (os.environ if environ is None else environ).get(ENV_VAR, "").strip().lower()
+    if value in ("", "0", "off", "no", "false"):
+        return None
+    if value in ("1", "on", "yes", "true", "all"):
+        return set(EXTRAS)
+    options = {option.strip() for option in value.split(",") if option.strip()} - {"timing"}
+    unknown = options - set(EXTRAS)
+    if unknown:
+        raise ValueError(f"{ENV_VAR}: unknown option {', '.join(sorted(unknown))} (use 1, timing, {', '.join(EXTRAS)})")
+    return options
+
+
+class HookStats:
+    __slots__ = ("calls", "wall", "cpu", "timings")
+
+    def __init__(self):
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.timings = LatencyHistogram()
+
+
+class _ProfileSnapshot:
+    """What pstats.Stats needs from a profile, without disabling it as create_stats would"""
+
+    def __init__(self, profile):
+        profile.snapshot_stats()
+        self.stats = profile.stats
+
+    def create_stats(self):
+        pass
+
+
+class HotPathProfiler:
+    """Times hooked functions while started; optionally runs them under cProfile and traces allocations"""
+
+    def __init__(self, clock=time.perf_counter, cpu_clock=time.thread_time):
+        self.clock = clock
+        self.cpu_clock = cpu_clock
+        self.hooks = []  # (owner, attribute, name)
+        self.stats = {}  # name -> HookStats
+        self.active = False
+        self.cprofile = False
+        self.tracemalloc = False
+        self.started = None
+        self.elapsed = 0.0  # Seconds profiled, up to stop
+        self._originals = []  # (owner, attribute, original, owned) for every installed hook
+        self._profiles = []  # One cProfile.Profile per thread that ran a hook
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._baseline = None  # tracemalloc snapshot from start
+        self._final = None  # ...and from stop
+        self._started_tracing = False
+
+    def hook(self, owner, attribute, name=None):
+        """Profile owner.attribute (a function of a module, or a method of an instance) while started"""
+        self.hooks.append((owner, attribute, name or attribute))
+        if self.active:
+            self._install(owner, attribute, name or attribute)
+
+    def _install(self, owner, attribute, name):
+        original = getattr(owner, attribute)
+        owned = attribute in getattr(owner, "__dict__", {})  # Else a method found on the class
+        self._originals.append((owner, attribute, original, owned))
+        setattr(owner, attribute, self._wrap(name, original))
+
+    def _wrap(self, name, func):
+        stats = self.stats.setdefault(name, HookStats())
+        clock = self.clock
+        cpu_clock = self.cpu_clock
+        local = self._local
+        lock = self._lock
+
+        @functools.wraps(func)
+        def profiled(*args, **kwargs):
+            # Only the outermost hooked call of a thread switches its cProfile on and off
+            profile = None
+            if self.cprofile and not getattr(local, "depth", 0):
+                profile = self._thread_profile()
+            local.depth = getattr(local, "depth", 0) + 1
+            wall_started = clock()
+            cpu_started = cpu_clock()
+            if profile is not None:
+                profile.enable()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                if profile is not None:
+                    profile.disable()
+                wall = clock() - wall_started
+                cpu = cpu_clock() - cpu_started
+                local.depth -= 1
+                with lock:
+                    stats.calls += 1
+                    stats.wall += wall
+                    stats.cpu += cpu
+                stats.timings.record(wall)
+
+        return profiled
+
+    def _thread_profile(self):
+        profile = getattr(self._local, "profile", None)
+        if profile is None:
+            import cProfile
+            profile = self._local.profile = cProfile.Profile()
+            with self._lock:
+                self._profiles.append(profile)
+        return profile
+
+    def start(self, cprofile=False, tracemalloc=False, tracemalloc_frames=1):
+        """Hook every registered function and start counting from zero"""
+        if self.active:
+            self.stop()
+        self.stats = {}
+        self._profiles = []
+        self._local = threading.local()
+        self._baseline = None
+        self._final = None
+        self.cprofile = cprofile
+        self.tracemalloc = tracemalloc
+        if tracemalloc:
+            import tracemalloc as tracer
+            self._started_tracing = not tracer.is_tracing()
+            if self._started_tracing:
+                tracer.start(tracemalloc_frames)
+            self._baseline = tracer.take_snapshot()
+        for owner, attribute, name in self.hooks:
+            self._install(owner, attribute, name)
+        self.started = self.clock()
+        self.active = True
+
+    def stop(self):
+        """Put the original functions back; the results stay available until the next start"""
+        if not self.active:
+            return
+        for owner, attribute, original, owned in reversed(self._originals):
+            if owned:
+                setattr(owner, attribute, original)
+            else:
+                delattr(owner, attribute)
+        self._originals = []
+        self.elapsed = self.clock() - self.started
+        self.active = False
+        if self.tracemalloc:
+            import tracemalloc as tracer
+            self._final = tracer.take_snapshot() if tracer.is_tracing() else None
+            if self._started_tracing:
+                tracer.stop()
+                self._started_tracing = False
+
+    def report(self, top=DEFAULT_TOP):
+        """Per hooked function: calls, wall and CPU totals and wall percentiles in ms, busiest first"""
+        elapsed = (self.clock() - self.started) if self.active else self.elapsed
+        rows = []
+        with self._lock:
+            items = [(name, stats.calls, stats.wall, stats.cpu, stats.timings) for name, stats in self.stats.items()]
+        for name, calls, wall, cpu, timings in items:
+            if not calls:
+                continue
+            summary = timings.summary()
+            rows.append({
+                "name": name,
+                "calls": calls,
+                "wall_ms": wall * 1000,
+                "cpu_ms": cpu * 1000,
+                "wall_share": wall / elapsed if elapsed else 0.0,
+                "mean_ms": wall * 1000 / calls,
+                "p95_ms": summary["p95_ms"],
+                "max_ms": summary["max_ms"]
+            })
+        rows.sort(key=lambda row: row["wall_ms"], reverse=True)
+        return rows[:top]
+
+    def summary(self, top=DEFAULT_TOP):
+        return "; ".join(
+            f"{row['name']}: {row['calls']} calls, wall {row['wall_ms']:.1f}ms ({row['wall_share']:.1%}), "
+            f"CPU {row['cpu_ms']:.1f}ms, p95 {row['p95_ms']:.2f}ms, max {row['max_ms']:.2f}ms"
+            for row in self.report(top)
+        ) or "no hooked calls"
+
+    def pstats(self):
+        """pstats.Stats of every thread's cProfile, or None without cprofile"""
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return None
+        import pstats
+        stats = pstats.Stats(_ProfileSnapshot(profiles[0]))
+        for profile in profiles[1:]:
+            stats.add(_ProfileSnapshot(profile))
+        return stats
+
+    def top_functions(self, top=DEFAULT_TOP):
+        """The functions with the most own time under the hooks, as short strings"""
+        stats = self.pstats()
+        if stats is None:
+            return []
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+        return [f"{os.path.basename(filename)}:{line}({function}) {calls} calls, own {own * 1000:.1f}ms, "
+                f"cumulative {cumulative * 1000:.1f}ms"
+                for (filename, line, function), (_, calls, own, cumulative, _) in rows]
+
+    def dump_stats(self, path=DEFAULT_STATS_PATH):
+        """Write the cProfile data for pstats/snakeviz; returns False without cprofile"""
+        stats = self.pstats()
+        if stats is None:
+            return False
+        stats.dump_stats(path)
+        return True
+
+    def top_allocations(self, top=DEFAULT_TOP):
+        """Source lines whose allocations grew the most since profiling started"""
+        if self._baseline is None:
+            return []
+        import tracemalloc as tracer
+        snapshot = self._final
+        if self.active:
+            snapshot = tracer.take_snapshot() if tracer.is_tracing() else None
+        if snapshot is None:
+            return []
+        return [str(stat) for stat in snapshot.compare_to(self._baseline, "lineno")[:top]]
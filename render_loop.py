@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Frame-capped UI refresh driven by dirty flags
+
+State changes (from any thread) only mark a widget dirty; the Tk thread redraws
+dirty widgets at most fps times a second, so UI cost follows the frame rate
+instead of the message rate.
+"""
+
+DEFAULT_FPS = 30
+FPS_CHOICES = (5, 10, 15, 30, 60)
+
+
+class RenderLoop:
+    """Redraws registered widgets on a fixed frame rate, and only when marked dirty
+
+    Rendering pauses while the window is iconified (or withdrawn) and catches up
+    with a single frame once it is shown again.
+    """
+
+    def __init__(self, root, fps=DEFAULT_FPS):
+        self.root = root
+        self.fps = fps
+        self._draws = {}  # name -> draw function, in registration order
+        self._dirty = {}  # name -> True while a redraw is pending
+        self._after_id = None
+        self.running = False
+        self.paused = False
+        self.frames = 0  # Frames that drew something
+        self.draws = 0
+        root.bind("<Unmap>", self._on_unmap, add="+")
+        root.bind("<Map>", self._on_map, add="+")
+
+    def register(self, name, draw):
+        """Add a widget draw function; it runs on the first frame"""
+        self._draws[name] = draw
+        self._dirty[name] = True
+
+    def mark_dirty(self, *names):
+        """Request a redraw of these widgets on the next frame (safe from any thread)"""
+        for name in names:
+            self._dirty[name] = True
+
+    def pending(self):
+        """Number of widgets waiting for the next frame"""
+        return sum(1 for dirty in self._dirty.values() if dirty)
+
+    def set_fps(self, fps):
+        if fps <= 0:
+            raise ValueError("fps must be positive")
+        self.fps = fps
+
+    def start(self):
+        self.running = True
+        self._schedule()
+
+    def stop(self):
+        self.running = False
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+
+    def _schedule(self):
+        if self._after_id is None and self.running and not self.paused:
+            self._after_id = self.root.after(max(1, int(1000 / self.fps)), self._frame)
+
+    def _frame(self):
+        self._after_id = None
+        drew = False
+        for name, draw in self._draws.items():
+            if self._dirty.get(name):
+                # Clear before drawing so a change made during the draw is picked up next frame
+                self._dirty[name] = False
+                draw()
+                self.draws += 1
+                drew = True
+        if drew:
+            self.frames += 1
+        self._schedule()
+
+    def _on_unmap(self, event):
+        if event.widget is self.root:
+            self.paused = True
+            if self._after_id is not None:
+                self.root.after_cancel(self._after_id)
+                self._after_id = None
+
+    def _on_map(self, event):
+        if event.widget is self.root and self.paused:
+            self.paused = False
+            self._schedule()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""Command-line entry point: the GUI window, or headless connect/send/stream/tail
+
+    python robot_cli.py                                  # the Tk window
+    python robot_cli.py gui --metrics-port 9464 --metrics-file metrics.jsonl
+    python robot_cli.py connect --url wss://localhost:8000 --repeat 3    # TLS sessions resumed
+    python robot_cli.py send-route --url ws://localhost:8000 [--file route.gpx --simplify 5]
+    python robot_cli.py stream --url ws://localhost:8000 --rate 10 --duration 30
+    python robot_cli.py tail --url ws://localhost:8000 --type robot_location --count 100
+
+Received messages go to stdout, one JSON object per line, and so does each
+command's result; progress and errors go to stderr. The exit status is 1 when
+the connection fails or drops.
+
+Only argparse and sys are imported up front; each command imports what it
+needs. Tkinter and the GUI load only for the window, websocket-client (and
+with it ssl) only for the commands that connect, asyncio never. Startup budget,
+checked by benchmarks/bench_startup.py --check (measured on a dev machine):
+
+                                              budget   measured
+    import robot_cli                           30 ms      12 ms
+    robot_cli.py --help                       100 ms      43 ms   wall clock, interpreter start included
+    robot_cli.py connect, to a local server   300 ms     120 ms   same, with a handshake and 3 pings
+    import websocket_react_client (for comparison)       105 ms
+"""
+import argparse
+import sys
+
+DEFAULT_URL = "wss://sibl.online/ws"
+DEFAULT_TIMEOUT = 10.0  # Seconds for the handshake
+RECV_TIMEOUT = 0.5  # Seconds a read blocks before stop conditions are checked again
+
+
+def ssl_options(args):
+    """sslopt for websocket-client, honouring --verify-ssl like the GUI's skip-verification setting"""
+    if not args.url.startswith("wss:"):
+        return {}
+    import tls_session
+    return {"context": tls_session.client_context(verify=args.verify_ssl, cafile=args.cafile)}
+
+
+def open_connection(args, sslopt=None):
+    """Blocking WebSocket connection, or None after reporting why it failed"""
+    import websocket
+    try:
+        ws = websocket.create_connection(args.url, timeout=args.timeout,
+                                         sslopt=ssl_options(args) if sslopt is None else sslopt)
+    except (OSError, websocket.WebSocketException) as e:
+        print(f"cannot connect to {args.url}: {e}", file=sys.stderr)
+        return None
+    ws.settimeout(RECV_TIMEOUT)
+    return ws
+
+
+def format_frame(opcode, data, types=None):
+    """One output line for a received frame, or None if it is filtered out"""
+    import json
+    import websocket
+    import wire_codec
+    if opcode == websocket.ABNF.OPCODE_BINARY:
+        try:
+            message = wire_codec.decode(data)
+        except wire_codec.WireCodecError as e:
+            message = {"type": "binary", "error": str(e), "bytes": len(data)}
+        line = None
+    else:
+        line = data.decode("utf-8", "replace")
+        try:
+            message = json.loads(line)
+        except ValueError:
+            message = {"type": "raw"}
+    if types and (not isinstance(message, dict) or message.get("type") not in types):
+        return None
+    return line if line is not None else json.dumps(message)
+
+
+def receive(ws, on_frame, stop_event, deadline=None):
+    """Read frames until the connection closes, stop_event is set or the deadline passes
+
+    Pings are answered while reading, so long streams are not dropped by the
+    server. Returns False if the connection was lost.
+    """
+    import time
+    import websocket
+    while not stop_event.is_set():
+        if deadline is not None and time.monotonic() >= deadline:
+            return True
+        try:
+            opcode, data = ws.recv_data()
+        except websocket.WebSocketTimeoutException:
+            continue
+        except (OSError, websocket.WebSocketException):
+            return stop_event.is_set()
+        if opcode == websocket.ABNF.OPCODE_CLOSE:
+            return stop_event.is_set()
+        if on_frame is not None:
+            on_frame(opcode, data)
+    return True
+
+
+def start_receiver(ws, on_frame, stop_event, lost_event):
+    """Read (and answer pings) on a daemon thread while the main thread sends"""
+    import threading
+
+    def run():
+        if not receive(ws, on_frame, stop_event):
+            lost_event.set()
+            stop_event.set()
+
+    thread = threading.Thread(target=run, daemon=True, name="cli-receiver")
+    thread.start()
+    return thread
+
+
+def print_frame(types=None):
+    def on_frame(opcode, data):
+        line = format_frame(opcode, data, types)
+        if line is not None:
+            print(line, flush=True)
+    return on_frame
+
+
+def cmd_gui(args):
+    import websocket_react_client
+    websocket_react_client.main(metrics_port=getattr(args, "metrics_port", None),
+                                metrics_file=getattr(args, "metrics_file", None),
+                                metrics_interval=getattr(args, "metrics_interval", 10.0))
+    return 0
+
+
+def cmd_connect(args):
+    """Handshake (split into TCP, TLS and upgrade) and ping/pong round trips, repeated on one SSL context"""
+    import json
+    import time
+    import endpoints
+    import tls_session
+
+    sslopt = ssl_options(args)
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        ws = open_connection(args, sslopt)
+        if ws is None:
+            return 1
+        try:
+            result = tls_session.handshake_timings(ws.sock, started, time.perf_counter())
+            ws.settimeout(args.timeout)
+            result["rtt_ms"] = endpoints.ping_rtt(ws, args.pings, args.timeout)
+        except Exception as e:
+            print(f"no pong from {args.url}: {e}", file=sys.stderr)
+            return 1
+        finally:
+            ws.close()
+        print(json.dumps(dict(url=args.url, **result)), flush=True)
+    return 0
+
+
+def cmd_send_route(args):
+    import json
+    import threading
+    import websocket
+    import message_schema
+
+    ws = open_connection(args)
+    if ws is None:
+        return 1
+    stop_event = threading.Event()
+    lost_event = threading.Event()
+    start_receiver(ws, None, stop_event, lost_event)
+    try:
+        if not args.file:
+            message = message_schema.route_waypoints()
+            ws.send(message.encode())
+            result = {"route": "default", "stops": len(message["waypoints"]), "chunks": 1}
+        else:
+            import route_upload
+            upload = route_upload.RouteUpload(args.file, chunk_size=args.chunk_size, rate=args.rate,
+                                              compress=args.compress, tolerance_m=args.simplify)
+            completed = upload.run(lambda message: ws.send(message.encode()), stop_event)
+            print(upload.summary(), file=sys.stderr)
+            if not completed:
+                print("route upload stopped: connection lost", file=sys.stderr)
+                return 1
+            result = {"route": upload.route_id, "stops": upload.total_stops, "source_stops": upload.source_stops,
+                      "chunks": upload.chunks_sent, "bytes": upload.bytes_sent}
+    except (OSError, ValueError, websocket.WebSocketException) as e:
+        # message_schema.SchemaError and bad route files are ValueErrors
+        print(f"route upload failed: {e}", file=sys.stderr)
+        return 1
+    finally:
+        stop_event.set()
+        ws.close()
+    print(json.dumps(result))
+    return 0
+
+
+def cmd_stream(args):
+    """Send a location north (or south, for a negative step) at a fixed rate, like the GUI's auto-increment"""
+    import json
+    import threading
+    import time
+    import websocket
+    import message_schema
+    import scheduler
+
+    ws = open_connection(args)
+    if ws is None:
+        return 1
+    stop_event = threading.Event()
+    lost_event = threading.Event()
+    start_receiver(ws, print_frame(args.type) if args.tail else None, stop_event, lost_event)
+
+    build = message_schema.location_track if args.track else message_schema.location
+    direction = args.direction if args.direction is not None else (0.0 if args.step >= 0 else 180.0)
+    deadline = time.monotonic() + args.duration if args.duration else None
+    state = {"lat": args.lat, "sent": 0, "error": None}
+
+    def tick():
+        if (args.count and state["sent"] >= args.count) or (deadline is not None and time.monotonic() >= deadline):
+            return False
+        try:
+            ws.send(build(state["lat"], args.lng, direction).encode())
+        except (OSError, ValueError, websocket.WebSocketException) as e:
+            state["error"] = e
+            return False
+        state["sent"] += 1
+        state["lat"] += args.step
+        return True
+
+    rate = scheduler.FixedRateScheduler(1.0 / args.rate, policy=scheduler.DROP)
+    try:
+        rate.run(tick, stop_event)
+    finally:
+        stop_event.set()
+        ws.close()
+    print(f"sent {state['sent']} locations: {rate.summary()}", file=sys.stderr)
+    print(json.dumps(dict(rate.stats(), sent=state["sent"], last_lat=state["lat"] - args.step)))
+    if state["error"] is not None or lost_event.is_set():
+        print(f"stream stopped: {state['error'] or 'connection lost'}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def cmd_tail(args):
+    import threading
+    import time
+
+    ws = open_connection(args)
+    if ws is None:
+        return 1
+    stop_event = threading.Event()
+    printed = [0]
+
+    def on_frame(opcode, data):
+        line = format_frame(opcode, data, args.type)
+        if line is None:
+            return
+        print(line, flush=True)
+        printed[0] += 1
+        if args.count and printed[0] >= args.count:
+            stop_event.set()
+
+    deadline = time.monotonic() + args.duration if args.duration else None
+    try:
+        completed = receive(ws, on_frame, stop_event, deadline)
+    finally:
+        ws.close()
+    if not completed:
+        print("connection lost", file=sys.stderr)
+        return 1
+    return 0
+
+
+def build_parser():
+    connection = argparse.ArgumentParser(add_help=False)
+    connection.add_argument("--url", default=DEFAULT_URL, help="WebSocket URL")
+    connection.add_argument("--verify-ssl", action="store_true", help="Verify SSL certificates")
+    connection.add_argument("--cafile", default=None, help="Trust this CA certificate (with --verify-ssl)")
+    connection.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="Handshake timeout (s)")
+
+    parser = argparse.ArgumentParser(description="WebSocket robot client: opens the GUI without a command")
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    gui = commands.add_parser("gui", help="Open the Tk window (the default)")
+    gui.add_argument("--metrics-port", type=int, default=None,
+                     help="Serve Prometheus metrics on this localhost port (e.g. 9464)")
+    gui.add_argument("--metrics-file", default=None, help="Append a JSON metrics snapshot to this file")
+    gui.add_argument("--metrics-interval", type=float, default=10.0, help="Seconds between metrics snapshots")
+
+    connect = commands.add_parser("connect", parents=[connection], help="Connect, time the handshake and pings, exit")
+    connect.add_argument("--pings", type=int, default=3, help="Ping/pong round trips to time")
+    connect.add_argument("--repeat", type=int, default=1, help="Connections to make in turn, resuming the TLS session")
+
+    send_route = commands.add_parser("send-route", parents=[connection],
+                                     help="Send the default route, or a GPX/CSV file in chunks")
+    send_route.add_argument("--file", default=None, help="GPX or CSV route file")
+    send_route.add_argument("--chunk-size", type=int, default=1000, help="Waypoints per chunk")
+    send_route.add_argument("--rate", type=float, default=20.0, help="Chunks per second (0 = unthrottled)")
+    send_route.add_argument("--compress", action="store_true", help="Deflate the waypoints of each chunk")
+    send_route.add_argument("--simplify", type=float, default=0, help="Simplification tolerance in meters (0 = off)")
+
+    stream = commands.add_parser("stream", parents=[connection], help="Stream a moving location at a fixed rate")
+    stream.add_argument("--rate", type=float, default=10.0, help="Locations per second")
+    stream.add_argument("--lat", type=float, default=37.7749, help="Starting latitude")
+    stream.add_argument("--lng", type=float, default=-122.4194, help="Longitude")
+    stream.add_argument("--step", type=float, default=0.0001, help="Latitude step per location")
+    stream.add_argument("--direction", type=float, default=None, help="Direction to send (default: from the step)")
+    stream.add_argument("--track", action="store_true", help="Send location_track instead of location")
+    stream.add_argument("--count", type=int, default=0, help="Stop after this many locations (0 = no limit)")
+    stream.add_argument("--duration", type=float, default=0, help="Stop after this many seconds (0 = no limit)")
+    stream.add_argument("--tail", action="store_true", help="Also print received messages")
+    stream.add_argument("--type", action="append", default=None, help="Only print messages of this type (repeatable)")
+
+    tail = commands.add_parser("tail", parents=[connection], help="Print received messages as JSON lines")
+    tail.add_argument("--type", action="append", default=None, help="Only print messages of this type (repeatable)")
+    tail.add_argument("--count", type=int, default=0, help="Exit after printing this many messages (0 = no limit)")
+    tail.add_argument("--duration", type=float, default=0, help="Exit after this many seconds (0 = no limit)")
+    return parser
+
+
+COMMANDS = {
+    None: cmd_gui,
+    "gui": cmd_gui,
+    "connect": cmd_connect,
+    "send-route": cmd_send_route,
+    "stream": cmd_stream,
+    "tail": cmd_tail
+}
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "stream" and args.rate <= 0:
+        parser.error("--rate must be greater than 0")
+    if args.command == "send-route" and (args.rate < 0 or args.chunk_size < 1 or args.simplify < 0):
+        parser.error("--rate and --simplify must not be negative, --chunk-size must be at least 1")
+    if args.command == "gui" and args.metrics_interval <= 0:
+        parser.error("--metrics-interval must be greater than 0")
+    try:
+        return COMMANDS[args.command](args)
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
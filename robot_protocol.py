@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Message shapes and connection policy shared by the GUI client and the headless engine"""
+import math
+import time
+from datetime import datetime
+
+# Reconnection settings (matching React hook)
+MAX_RECONNECT_ATTEMPTS = 5
+RECONNECT_BASE_DELAY_MS = 1000
+RECONNECT_MAX_DELAY_MS = 30000
+
+# Mean Earth radius used for distances along routes
+EARTH_RADIUS_M = 6371000.0
+
+# Route sent by the "Send Route" button
+DEFAULT_ROUTE_WAYPOINTS = [
+    { "lat": 37.7749, "lng": -122.4194 },
+    { "lat": 37.7755, "lng": -122.4200 },
+    { "lat": 37.7760, "lng": -122.4190 },
+    { "lat": 37.7750, "lng": -122.4180 },
+    { "lat": 37.7740, "lng": -122.4185 },
+    { "lat": 37.7735, "lng": -122.4195 },
+    { "lat": 37.7745, "lng": -122.4205 },
+    { "lat": 37.7755, "lng": -122.4210 },
+    { "lat": 37.7765, "lng": -122.4205 },
+    { "lat": 37.7770, "lng": -122.4195 }
+]
+
+
+class TimestampCache:
+    """Formats timestamps like datetime.now().isoformat() + "Z" but only builds the
+    date and time of day once per second; the microseconds are appended per call"""
+
+    def __init__(self):
+        self._cached = (None, "")  # (whole second, formatted date and time of day)
+
+    def format(self, now=None):
+        if now is None:
+            now = time.time()
+        second = int(now)
+        micro = round((now - second) * 1000000)
+        if micro == 1000000:
+            second += 1
+            micro = 0
+        cached_second, prefix = self._cached
+        if second != cached_second:
+            prefix = datetime.fromtimestamp(second).isoformat()
+            self._cached = (second, prefix)
+        return "%s.%06dZ" % (prefix, micro)
+
+
+_timestamps = TimestampCache()
+
+
+def timestamp(now=None):
+    """Timestamp in the format the server expects (now is a time.time() value)"""
+    return _timestamps.format(now)
+
+
+def reconnect_delay_ms(attempt):
+    """Exponential backoff delay for the given reconnect attempt (1-based)"""
+    return min(RECONNECT_BASE_DELAY_MS * (2 ** attempt), RECONNECT_MAX_DELAY_MS)
+
+
+def calculate_direction(lat1, lng1, lat2, lng2):
+    """Calculate direction between two points in degrees (0 = North, 90 = East)"""
+    # Convert to radians
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lng = math.radians(lng2 - lng1)
+
+    # Calculate bearing
+    y = math.sin(delta_lng) * math.cos(lat2_rad)
+    x = math.cos(lat1_rad) * math.sin(lat2_rad) - math.sin(lat1_rad) * math.cos(lat2_rad) * math.cos(delta_lng)
+
+    bearing_degrees = math.degrees(math.atan2(y, x))
+
+    # Normalize to 0-360 degrees
+    return (bearing_degrees + 360) % 360
+
+
+def distance_m(lat1, lng1, lat2, lng2):
+    """Great-circle (haversine) distance between two points in meters"""
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lat = lat2_rad - lat1_rad
+    delta_lng = math.radians(lng2 - lng1)
+
+    a = math.sin(delta_lat / 2) ** 2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lng / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def location_message(lat, lng, direction, msg_type="location"):
+    """Build a location (or location_track) message"""
+    return {
+        "type": msg_type,
+        "data": {
+            "lat": lat,
+            "lng": lng,
+            "direction": direction,
+            "timestamp": timestamp()
+        }
+    }
+
+
+def location_track_message(lat, lng, direction):
+    """Build a location_track message"""
+    return location_message(lat, lng, direction, msg_type="location_track")
+
+
+def status_message(battery=85, speed=2.5, mode="autonomous"):
+    """Build a status message"""
+    return {
+        "type": "status",
+        "data": {
+            "battery": battery,
+            "speed": speed,
+            "mode": mode,
+            "timestamp": timestamp()
+        }
+    }
+
+
+def ping_message(seq=None):
+    """Build a ping message; seq lets the pong be matched to it"""
+    message = {
+        "type": "ping",
+        "timestamp": timestamp()
+    }
+    if seq is not None:
+        message["seq"] = seq
+    return message
+
+
+def icon_pin_message(lat, lng, icon_type):
+    """Build an icon pin message"""
+    return {
+        "type": "icon_pin",
+        "data": {
+            "lat": lat,
+            "lng": lng,
+            "type": icon_type
+        }
+    }
+
+
+def route_waypoints_message(waypoints=None, route_name="Robot Generated Route", route_type="delivery",
+                            start_location="Warehouse", end_location="Final Destination"):
+    """Build a route_waypoints message"""
+    if waypoints is None:
+        waypoints = DEFAULT_ROUTE_WAYPOINTS
+    return {
+        "type": "route_waypoints",
+        "action": "send_route",
+        "data": {
+            "waypoints": waypoints,
+            "routeName": route_name,
+            "routeType": route_type,
+            "totalStops": len(waypoints),
+            "startLocation": start_location,
+            "endLocation": end_location
+        },
+        "timestamp": timestamp(),
+        "source": "robot"
+    }
+
+
+def location_batch_message(points, location_type="location"):
+    """Build a location_batch message carrying several timestamped location samples"""
+    return {
+        "type": "location_batch",
+        "data": {
+            "locationType": location_type,
+            "count": len(points),
+            "points": points
+        }
+    }
+
+
+def unpack_location_batch(message):
+    """Yield the individual location messages carried by a location_batch message"""
+    data = message.get("data", {})
+    robot_id = message.get("robotId")
+    location_type = data.get("locationType", "robot_location" if robot_id is not None else "location")
+    for point in data.get("points", []):
+        location = {"type": location_type, "data": point}
+        if robot_id is not None:
+            location["robotId"] = robot_id
+        yield location
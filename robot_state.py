@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Latest known state of every robot seen on the broadcast channel
+
+Records are slotted objects kept in an OrderedDict in last-seen order: an update
+is a dict lookup plus move_to_end, and stale robots are evicted from the front
+without scanning the live ones. Positions can also be kept in a spatial index
+for nearest-robot and in-area queries.
+"""
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import robot_protocol as protocol
+
+DEFAULT_STALE_AFTER = 60.0  # Seconds without an update before a robot is evicted
+
+
+class RobotState:
+    """Latest position, direction and status of one robot"""
+
+    __slots__ = ("robot_id", "lat", "lng", "direction", "battery", "speed", "mode",
+                 "last_seen", "location_seen", "status_seen", "updates")
+
+    def __init__(self, robot_id):
+        self.robot_id = robot_id
+        self.lat = None
+        self.lng = None
+        self.direction = None
+        self.battery = None
+        self.speed = None
+        self.mode = None
+        self.last_seen = None  # Clock time of the last update of any kind
+        self.location_seen = None
+        self.status_seen = None
+        self.updates = 0
+
+    def snapshot(self, now):
+        """Plain dict copy; ages are seconds before now"""
+        return {
+            "robotId": self.robot_id,
+            "lat": self.lat,
+            "lng": self.lng,
+            "direction": self.direction,
+            "battery": self.battery,
+            "speed": self.speed,
+            "mode": self.mode,
+            "age_s": now - self.last_seen,
+            "location_age_s": (now - self.location_seen) if self.location_seen is not None else None,
+            "status_age_s": (now - self.status_seen) if self.status_seen is not None else None,
+            "updates": self.updates
+        }
+
+
+class RobotStateStore:
+    """Thread-safe map of robotId to RobotState, evicting robots that went quiet"""
+
+    def __init__(self, stale_after=DEFAULT_STALE_AFTER, max_robots=None, clock=time.monotonic, index=None):
+        self.stale_after = stale_after
+        self.max_robots = max_robots
+        self.clock = clock
+        self.index = index  # Optional spatial_index.SpatialGrid, kept in step with the states
+        self._states = OrderedDict()  # robotId -> RobotState, least recently seen first
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def _drop_oldest(self):
+        robot_id, _ = self._states.popitem(last=False)
+        if self.index is not None:
+            self.index.remove(robot_id)
+
+    def _touch(self, robot_id, now):
+        state = self._states.get(robot_id)
+        if state is None:
+            if isinstance(robot_id, str):
+                robot_id = sys.intern(robot_id)
+            state = self._states[robot_id] = RobotState(robot_id)
+            if self.max_robots is not None and len(self._states) > self.max_robots:
+                self._drop_oldest()
+                self.evicted += 1
+        else:
+            self._states.move_to_end(robot_id)
+        state.last_seen = now
+        state.updates += 1
+        return state
+
+    def update_location(self, robot_id, lat, lng, direction=None, now=None):
+        now = self.clock() if now is None else now
+        with self._lock:
+            state = self._touch(robot_id, now)
+            state.lat = lat
+            state.lng = lng
+            if direction is not None:
+                state.direction = direction
+            state.location_seen = now
+            if self.index is not None and lat is not None and lng is not None:
+                self.index.update(state.robot_id, lat, lng)
+
+    def update_status(self, robot_id, data, now=None):
+        """Take battery, speed and mode from a robot_status data object"""
+        now = self.clock() if now is None else now
+        with self._lock:
+            state = self._touch(robot_id, now)
+            state.battery = data.get("battery", state.battery)
+            state.speed = data.get("speed", state.speed)
+            state.mode = data.get("mode", state.mode)
+            state.status_seen = now
+
+    def get(self, robot_id):
+        """Snapshot of one robot, or None if it is unknown or was evicted"""
+        now = self.clock()
+        with self._lock:
+            state = self._states.get(robot_id)
+            return state.snapshot(now) if state is not None else None
+
+    def snapshot(self, max_age=None):
+        """Snapshots of every robot (seen within max_age seconds), most recently seen first"""
+        now = self.clock()
+        result = []
+        with self._lock:
+            for state in reversed(self._states.values()):
+                if max_age is not None and now - state.last_seen > max_age:
+                    break
+                result.append(state.snapshot(now))
+        return result
+
+    def evict_stale(self, now=None):
+        """Drop robots not seen for stale_after seconds; returns how many were dropped"""
+        now = self.clock() if now is None else now
+        cutoff = now - self.stale_after
+        dropped = 0
+        with self._lock:
+            while self._states:
+                state = next(iter(self._states.values()))
+                if state.last_seen >= cutoff:
+                    break
+                self._drop_oldest()
+                dropped += 1
+            self.evicted += dropped
+        return dropped
+
+    def _located(self, lat, lng, hits):
+        """Snapshots for index hits, with distance and bearing from the query point"""
+        now = self.clock()
+        result = []
+        for distance, robot_id, robot_lat, robot_lng in hits:
+            snapshot = self._states[robot_id].snapshot(now)
+            snapshot["distance_m"] = distance
+            snapshot["bearing"] = protocol.calculate_direction(lat, lng, robot_lat, robot_lng)
+            result.append(snapshot)
+        return result
+
+    def nearest(self, lat, lng, k=1, max_distance_m=None):
+        """Snapshots of the k robots nearest a point, nearest first (needs an index)"""
+        with self._lock:
+            return self._located(lat, lng, self.index.nearest(lat, lng, k, max_distance_m))
+
+    def within(self, lat, lng, radius_m):
+        """Snapshots of the robots within radius_m of a point, nearest first (needs an index)"""
+        with self._lock:
+            return self._located(lat, lng, self.index.within(lat, lng, radius_m))
+
+    def in_box(self, south, west, north, east):
+        """Snapshots of the robots inside a lat/lng box (needs an index)"""
+        now = self.clock()
+        with self._lock:
+            return [self._states[robot_id].snapshot(now) for robot_id in self.index.in_box(south, west, north, east)]
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
+            if self.index is not None:
+                self.index.clear()
+
+    def __len__(self):
+        return len(self._states)
+
+    def __contains__(self, robot_id):
+        return robot_id in self._states
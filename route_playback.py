@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""Route playback at a fixed speed
+
+Segment lengths and bearings are computed once per route (RouteGeometry); each
+playback tick then only advances a segment cursor and interpolates linearly
+inside the current segment, with no trigonometry.
+"""
+import bisect
+
+import route_simplify
+
+
+class RouteGeometry:
+    """Precomputed per-segment geometry of a route"""
+
+    def __init__(self, waypoints):
+        lats, lngs = route_simplify.split_points(waypoints)
+        points = list(zip(lats, lngs))
+        if len(points) < 2:
+            raise ValueError("a route needs at least two waypoints")
+
+        self.lats = []
+        self.lngs = []
+        self.dlats = []  # Change in lat per meter along the segment
+        self.dlngs = []  # Change in lng per meter along the segment
+        self.bearings = []
+        self.starts = []  # Distance from the route start to each segment start
+        lengths, bearings = route_simplify.segment_geometry(lats, lngs)  # One pass over the whole route
+        total = 0.0
+        for (lat1, lng1), (lat2, lng2), length, bearing in zip(points, points[1:], lengths, bearings):
+            if length == 0:
+                continue  # Repeated waypoint
+            self.lats.append(lat1)
+            self.lngs.append(lng1)
+            self.dlats.append((lat2 - lat1) / length)
+            self.dlngs.append((lng2 - lng1) / length)
+            self.bearings.append(bearing)
+            self.starts.append(total)
+            total += length
+        if not self.starts:
+            raise ValueError("a route needs at least two distinct waypoints")
+        self.end = points[-1]
+        self.total_length = total
+
+    def __len__(self):
+        return len(self.starts)
+
+    def segment_at(self, distance, hint=0):
+        """Index of the segment containing distance, scanning forward from hint"""
+        starts = self.starts
+        last = len(starts) - 1
+        if hint > last or starts[hint] > distance:
+            return max(0, bisect.bisect_right(starts, distance) - 1)
+        # Playback moves forward a little per tick, so this is O(1) amortized
+        while hint < last and starts[hint + 1] <= distance:
+            hint += 1
+        return hint
+
+    def point_at(self, index, distance):
+        """Interpolated (lat, lng, bearing) at distance inside segment index"""
+        offset = distance - self.starts[index]
+        return (self.lats[index] + self.dlats[index] * offset,
+                self.lngs[index] + self.dlngs[index] * offset,
+                self.bearings[index])
+
+
+class RoutePlayback:
+    """Position along a RouteGeometry as a function of elapsed time"""
+
+    def __init__(self, geometry, speed_mps, loop=False, start_distance=0.0):
+        if speed_mps <= 0:
+            raise ValueError("speed must be positive")
+        self.geometry = geometry
+        self.speed_mps = speed_mps
+        self.loop = loop
+        self.start_distance = start_distance
+        self.distance = start_distance
+        self.finished = False
+        self._segment = 0
+
+    @property
+    def duration(self):
+        """Seconds to play the route once"""
+        return self.geometry.total_length / self.speed_mps
+
+    @property
+    def progress(self):
+        return min(1.0, self.distance / self.geometry.total_length)
+
+    def position(self, elapsed):
+        """(lat, lng, bearing) after elapsed seconds of playback"""
+        geometry = self.geometry
+        distance = self.start_distance + self.speed_mps * elapsed
+        if distance >= geometry.total_length:
+            if not self.loop:
+                self.distance = geometry.total_length
+                self.finished = True
+                lat, lng = geometry.end
+                return lat, lng, geometry.bearings[-1]
+            distance %= geometry.total_length
+            if distance < self.distance:
+                self._segment = 0  # Wrapped around to the start
+        self.distance = distance
+        self._segment = geometry.segment_at(distance, self._segment)
+        return geometry.point_at(self._segment, distance)
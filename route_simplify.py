@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""Polyline simplification and per-segment geodesics for routes
+
+simplify() keeps the points a Douglas-Peucker pass needs so that every dropped
+point lies within tolerance_m of the simplified line. Offsets are measured in an
+equirectangular projection around the route's mean latitude, which is accurate
+to well under a percent for routes spanning a few hundred kilometers. Long
+tracks are simplified in windows of `window` points whose edges are always
+kept: a few more points than one pass over the whole track (about 1% at the
+default), but the top levels of the recursion, which each visit every point,
+are skipped.
+segment_geometry() computes the length and initial bearing of every segment in
+one pass, with the formulas of robot_protocol.distance_m and calculate_direction.
+
+Both run on NumPy arrays when NumPy is installed and fall back to plain Python
+(much slower on long tracks) when it isn't. NumPy is imported on first use, and
+only for polylines of at least NUMPY_MIN_POINTS: it takes longer to import than
+the rest of the client, and short routes are quicker in plain Python anyway.
+"""
+import importlib.util
+import math
+
+import robot_protocol as protocol
+
+USE_NUMPY = importlib.util.find_spec("numpy") is not None  # Optional: everything works without it, only slower
+NUMPY_MIN_POINTS = 256
+DEFAULT_WINDOW = 4096  # Points per independently simplified window; 0 for the whole track at once
+
+
+def _numpy(points):
+    """The numpy module if it should handle a polyline of this many points, else None"""
+    if not USE_NUMPY or points < NUMPY_MIN_POINTS:
+        return None
+    import numpy
+    return numpy
+
+
+def split_points(waypoints):
+    """(lats, lngs) lists from {"lat", "lng"} objects or (lat, lng) pairs"""
+    lats = []
+    lngs = []
+    for point in waypoints:
+        if isinstance(point, dict):
+            lats.append(float(point["lat"]))
+            lngs.append(float(point["lng"]))
+        else:
+            lats.append(float(point[0]))
+            lngs.append(float(point[1]))
+    return lats, lngs
+
+
+def segment_geometry(lats, lngs):
+    """(lengths in meters, bearings in degrees) lists, one entry per segment of a polyline"""
+    numpy = _numpy(len(lats))
+    if numpy is None:
+        pairs = list(zip(lats, lngs))
+        lengths = [protocol.distance_m(lat1, lng1, lat2, lng2) for (lat1, lng1), (lat2, lng2) in zip(pairs, pairs[1:])]
+        bearings = [protocol.calculate_direction(lat1, lng1, lat2, lng2) for (lat1, lng1), (lat2, lng2) in zip(pairs, pairs[1:])]
+        return lengths, bearings
+
+    lat = numpy.radians(numpy.asarray(lats, dtype=float))
+    lng = numpy.asarray(lngs, dtype=float)
+    lat1 = lat[:-1]
+    lat2 = lat[1:]
+    delta_lng = numpy.radians(lng[1:] - lng[:-1])
+    cos_lat1 = numpy.cos(lat1)
+    cos_lat2 = numpy.cos(lat2)
+
+    a = numpy.sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * cos_lat2 * numpy.sin(delta_lng / 2) ** 2
+    lengths = 2 * protocol.EARTH_RADIUS_M * numpy.arcsin(numpy.minimum(1.0, numpy.sqrt(a)))
+
+    y = numpy.sin(delta_lng) * cos_lat2
+    x = cos_lat1 * numpy.sin(lat2) - numpy.sin(lat1) * cos_lat2 * numpy.cos(delta_lng)
+    bearings = (numpy.degrees(numpy.arctan2(y, x)) + 360) % 360
+    return lengths.tolist(), bearings.tolist()
+
+
+def simplify(lats, lngs, tolerance_m, window=DEFAULT_WINDOW):
+    """Indices of the points to keep (always the first and last), in order"""
+    if tolerance_m < 0:
+        raise ValueError("tolerance must not be negative")
+    if window < 0:
+        raise ValueError("window must not be negative")
+    if len(lats) != len(lngs):
+        raise ValueError("lats and lngs differ in length")
+    if len(lats) < 3:
+        return list(range(len(lats)))
+    numpy = _numpy(len(lats))
+    if numpy is None:
+        return _simplify_python(lats, lngs, tolerance_m, window)
+    return _simplify_numpy(numpy, lats, lngs, tolerance_m, window).tolist()
+
+
+def simplify_route(waypoints, tolerance_m, window=DEFAULT_WINDOW):
+    """Simplified copy of a route as waypoint objects, ready for message_schema.route_waypoints"""
+    lats, lngs = split_points(waypoints)
+    return [{"lat": lats[i], "lng": lngs[i]} for i in simplify(lats, lngs, tolerance_m, window)]
+
+
+def _simplify_numpy(numpy, lats, lngs, tolerance_m, window):
+    """Douglas-Peucker one level at a time: each pass splits every open interval at once"""
+    lat = numpy.radians(numpy.asarray(lats, dtype=float))
+    lng = numpy.unwrap(numpy.radians(numpy.asarray(lngs, dtype=float)))  # Across the antimeridian
+    x = protocol.EARTH_RADIUS_M * math.cos(float(lat.mean())) * lng
+    y = protocol.EARTH_RADIUS_M * lat
+    n = len(x)
+    tolerance2 = tolerance_m * tolerance_m
+
+    keep = numpy.zeros(n, dtype=bool)
+    bounds = numpy.append(numpy.arange(0, n - 1, window or n), n - 1)
+    keep[bounds] = True
+    # Open intervals (kept point lo to kept point hi) and their interior points, contiguous and in order
+    lo = bounds[:-1]
+    hi = bounds[1:]
+    counts = hi - lo - 1
+    occupied = counts > 0
+    lo, hi, counts = lo[occupied], hi[occupied], counts[occupied]
+    index = numpy.flatnonzero(~keep)
+    point_x = x[index]
+    point_y = y[index]
+    while index.size:
+        ax = x[lo]
+        ay = y[lo]
+        dx = x[hi] - ax
+        dy = y[hi] - ay
+        length2 = dx * dx + dy * dy
+        inverse = numpy.divide(1.0, length2, out=numpy.zeros_like(length2), where=length2 > 0)
+
+        # Squared distance from each point to its interval's chord (as a segment)
+        interval = numpy.repeat(numpy.arange(lo.size), counts)
+        px = point_x - ax[interval]
+        py = point_y - ay[interval]
+        dxi = dx[interval]
+        dyi = dy[interval]
+        t = (px * dxi + py * dyi) * inverse[interval]
+        numpy.clip(t, 0.0, 1.0, out=t)
+        px -= t * dxi
+        py -= t * dyi
+        px *= px
+        py *= py
+        distance2 = px
+        distance2 += py
+
+        starts = numpy.cumsum(counts) - counts
+        worst = numpy.maximum.reduceat(distance2, starts)
+        split = worst > tolerance2
+        if not split.any():
+            break
+
+        # Split each interval that is off by more than the tolerance at its first farthest point
+        farthest = numpy.flatnonzero(distance2 == worst[interval])
+        owner = interval[farthest]
+        farthest = farthest[split[owner]]
+        owner = owner[split[owner]]
+        first = numpy.concatenate(([True], owner[1:] != owner[:-1]))
+        chosen = farthest[first]
+        owner = owner[first]
+        split_index = index[chosen]
+        keep[split_index] = True
+
+        lo = numpy.column_stack((lo[owner], split_index)).ravel()
+        hi = numpy.column_stack((split_index, hi[owner])).ravel()
+        counts = numpy.column_stack((chosen - starts[owner], starts[owner] + counts[owner] - chosen - 1)).ravel()
+        remaining = split[interval]
+        remaining[chosen] = False
+        index = index[remaining]
+        point_x = point_x[remaining]
+        point_y = point_y[remaining]
+        occupied = counts > 0
+        lo, hi, counts = lo[occupied], hi[occupied], counts[occupied]
+
+    return numpy.flatnonzero(keep)
+
+
+def _simplify_python(lats, lngs, tolerance_m, window):
+    lat0 = math.radians(sum(lats) / len(lats))
+    scale = protocol.EARTH_RADIUS_M * math.cos(lat0)
+    x = []
+    offset = 0.0
+    previous = None
+    for lng in lngs:
+        lng = math.radians(lng) + offset
+        if previous is not None and abs(lng - previous) > math.pi:
+            # Across the antimeridian: keep the longitudes continuous
+            step = 2 * math.pi if lng < previous else -2 * math.pi
+            offset += step
+            lng += step
+        previous = lng
+        x.append(scale * lng)
+    y = [protocol.EARTH_RADIUS_M * math.radians(lat) for lat in lats]
+    tolerance2 = tolerance_m * tolerance_m
+
+    n = len(x)
+    bounds = list(range(0, n - 1, window or n)) + [n - 1]
+    keep = [False] * n
+    for i in bounds:
+        keep[i] = True
+    stack = list(zip(bounds, bounds[1:]))
+    while stack:
+        first, last = stack.pop()
+        ax, ay = x[first], y[first]
+        dx = x[last] - ax
+        dy = y[last] - ay
+        length2 = dx * dx + dy * dy
+        worst = tolerance2
+        index = None
+        for i in range(first + 1, last):
+            px = x[i] - ax
+            py = y[i] - ay
+            t = min(1.0, max(0.0, (px * dx + py * dy) / length2)) if length2 > 0 else 0.0
+            ex = px - t * dx
+            ey = py - t * dy
+            distance2 = ex * ex + ey * ey
+            if distance2 > worst:
+                worst = distance2
+                index = i
+        if index is not None:
+            keep[index] = True
+            stack.append((index, last))
+            stack.append((first, index))
+    return [i for i, kept in enumerate(keep) if kept]
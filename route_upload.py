@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""Streaming upload of large routes from GPX or CSV files
+
+Waypoints are read from the file by a generator and sent as sequenced
+route_waypoints chunks (chunkIndex of totalChunks), so only one chunk is ever
+held in memory whatever the route length. The file is read twice: once to count
+the waypoints (for totalStops and totalChunks), once to send them. Chunks are
+sent at a fixed rate and only while the outbound queue has room. With a
+simplification tolerance the file is read once instead, into two float arrays,
+and only the points route_simplify keeps are sent.
+
+    upload = RouteUpload("route.gpx", chunk_size=1000, rate=20, compress=True)
+    upload.run(outbound_queue.put, stop_event)
+"""
+import array
+import csv
+import itertools
+import math
+import os
+import time
+import uuid
+from xml.parsers import expat
+
+import message_schema
+import route_simplify
+import scheduler
+
+DEFAULT_CHUNK_SIZE = 1000  # Waypoints per chunk
+DEFAULT_CHUNK_RATE = 20.0  # Chunks per second
+NOT_READY_BACKOFF = 0.01  # Seconds an unthrottled async upload waits for the queue to drain
+FILE_TYPES = (("Route files", "*.gpx *.csv"), ("GPX", "*.gpx"), ("CSV", "*.csv"))
+
+GPX_POINT_TAGS = ("trkpt", "rtept")
+CSV_LAT_COLUMNS = ("lat", "latitude")
+CSV_LNG_COLUMNS = ("lng", "lon", "long", "longitude")
+
+
+def iter_gpx(path, block_size=65536):
+    """(lat, lng) of every track and route point in a GPX file, streamed
+
+    Points are taken from the start tags by expat without building a tree, and
+    handed out after each block of the file, so memory stays flat.
+    """
+    points = []
+
+    def start_element(name, attributes):
+        if name.rpartition(":")[2] in GPX_POINT_TAGS:
+            try:
+                points.append((float(attributes["lat"]), float(attributes["lon"])))
+            except (KeyError, ValueError):
+                raise ValueError(f"{path}:{parser.CurrentLineNumber}: point without a valid lat/lon")
+
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = start_element
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(block_size)
+            try:
+                parser.Parse(block, not block)
+            except expat.ExpatError as e:
+                raise ValueError(f"{path}: not valid GPX ({e})")
+            yield from points
+            points.clear()
+            if not block:
+                return
+
+
+def iter_csv(path):
+    """(lat, lng) of every row of a CSV file, streamed
+
+    Columns are found by a header row (lat/latitude, lng/lon/longitude); without
+    one the first two columns are latitude and longitude.
+    """
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        lat_column, lng_column = 0, 1
+        first_row = True
+        for row in reader:
+            if not row or not "".join(row).strip():
+                continue
+            try:
+                point = float(row[lat_column]), float(row[lng_column])
+            except (ValueError, IndexError):
+                if not first_row:
+                    raise ValueError(f"{path}:{reader.line_num}: expected numeric lat/lng, got {row!r}")
+                names = [name.strip().lower() for name in row]
+                lat_column = _column(names, CSV_LAT_COLUMNS, path)
+                lng_column = _column(names, CSV_LNG_COLUMNS, path)
+            else:
+                yield point
+            first_row = False
+
+
+def _column(names, candidates, path):
+    for name in candidates:
+        if name in names:
+            return names.index(name)
+    raise ValueError(f"{path}: header has no {candidates[0]} column ({', '.join(candidates)})")
+
+
+def iter_waypoints(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".gpx":
+        return iter_gpx(path)
+    if extension == ".csv":
+        return iter_csv(path)
+    raise ValueError(f"unsupported route file '{path}' (expected .gpx or .csv)")
+
+
+def count_waypoints(path):
+    count = 0
+    for _ in iter_waypoints(path):
+        count += 1
+    return count
+
+
+def iter_chunks(points, chunk_size):
+    """Lists of waypoint objects, chunk_size at a time"""
+    points = iter(points)
+    while True:
+        chunk = [{"lat": lat, "lng": lng} for lat, lng in itertools.islice(points, chunk_size)]
+        if not chunk:
+            return
+        yield chunk
+
+
+class RouteUpload:
+    """One route file sent as a sequence of route_waypoints chunks"""
+
+    def __init__(self, path, chunk_size=DEFAULT_CHUNK_SIZE, rate=DEFAULT_CHUNK_RATE, compress=False,
+                 route_name=None, route_type="delivery", route_id=None, tolerance_m=0):
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+        self.path = path
+        self.chunk_size = chunk_size
+        self.rate = rate
+        self.compress = compress
+        self.route_name = route_name or os.path.splitext(os.path.basename(path))[0] or "Route"
+        self.route_type = route_type
+        self.route_id = route_id or uuid.uuid4().hex[:12]
+        self.tolerance_m = tolerance_m
+
+        self.source_stops = None  # Waypoints in the file
+        self.total_stops = None  # Waypoints sent (fewer than in the file once simplified)
+        self.total_chunks = None
+        self.chunks_sent = 0
+        self.stops_sent = 0
+        self.bytes_sent = 0
+        self.started = None
+        self.finished = None
+        self._points = None  # Simplified (lat, lng) list when tolerance_m is set
+
+    def prepare(self):
+        """Count the waypoints (first pass over the file), or load and simplify them"""
+        if self.tolerance_m:
+            lats = array.array("d")
+            lngs = array.array("d")
+            for lat, lng in iter_waypoints(self.path):
+                lats.append(lat)
+                lngs.append(lng)
+            self.source_stops = len(lats)
+            self._points = [(lats[i], lngs[i]) for i in route_simplify.simplify(lats, lngs, self.tolerance_m)]
+            self.total_stops = len(self._points)
+        else:
+            self.source_stops = self.total_stops = count_waypoints(self.path)
+        if not self.total_stops:
+            raise ValueError(f"{self.path}: no waypoints")
+        self.total_chunks = math.ceil(self.total_stops / self.chunk_size)
+        return self.total_stops
+
+    def messages(self):
+        """Encoded chunk messages in order (second pass over the file unless simplified)"""
+        if self.total_stops is None:
+            self.prepare()
+        points = self._points if self.tolerance_m else iter_waypoints(self.path)
+        first_stop = 0
+        for index, chunk in enumerate(iter_chunks(points, self.chunk_size)):
+            if index >= self.total_chunks:
+                raise ValueError(f"{self.path} changed while it was being uploaded")
+            message = message_schema.route_waypoints_chunk(
+                self.route_id, index, self.total_chunks, first_stop, chunk, self.total_stops,
+                self.route_name, self.route_type, compress=self.compress
+            )
+            message.encode()  # Validate here rather than in the send writer on the event loop
+            first_stop += len(chunk)
+            yield message, len(chunk)
+
+    def run(self, send, stop_event=None, ready=None, progress=None):
+        """Send every chunk with send(message), at most rate chunks a second
+
+        A tick where ready() is false sends nothing, so the upload waits for the
+        outbound queue to drain. progress(upload) is called after each chunk.
+        Returns True if the whole route was sent.
+        """
+        tick = self._sender(send, ready, progress)
+        if self.rate:
+            scheduler.FixedRateScheduler(1.0 / self.rate, policy=scheduler.DROP).run(tick, stop_event)
+        else:
+            while (stop_event is None or not stop_event.is_set()) and tick():
+                pass
+        self.finished = time.monotonic()
+        return self.chunks_sent == self.total_chunks
+
+    async def run_async(self, send, is_running=lambda: True, ready=None, progress=None):
+        """run on an asyncio loop, until done or is_running() is false; prepare() first, it blocks"""
+        tick = self._sender(send, ready, progress)
+
+        async def tick_async():
+            return tick()
+
+        if self.rate:
+            await scheduler.FixedRateScheduler(1.0 / self.rate, policy=scheduler.DROP).run_async(tick_async, is_running)
+        else:
+            import asyncio  # Here so that threaded callers don't pay for importing it
+            # Yield after every chunk so the writer can drain what was queued
+            while is_running():
+                if ready is not None and not ready():
+                    await asyncio.sleep(NOT_READY_BACKOFF)
+                    continue
+                if not tick():
+                    break
+                await asyncio.sleep(0)
+        self.finished = time.monotonic()
+        return self.chunks_sent == self.total_chunks
+
+    def _sender(self, send, ready, progress):
+        """A tick function that sends the next chunk; returns False when none are left"""
+        messages = self.messages()
+        self.started = time.monotonic()
+
+        def tick():
+            if ready is not None and not ready():
+                return True
+            try:
+                message, stops = next(messages)
+            except StopIteration:
+                return False
+            send(message)
+            self.chunks_sent += 1
+            self.stops_sent += stops
+            self.bytes_sent += len(message.encode())
+            if progress is not None:
+                progress(self)
+            return True
+
+        return tick
+
+    def summary(self):
+        elapsed = (self.finished or time.monotonic()) - (self.started or time.monotonic())
+        return (f"{self.stops_sent}/{self.total_stops} waypoints in {self.chunks_sent}/{self.total_chunks} chunks, "
+                f"{self.bytes_sent / 1024:.0f} KiB in {elapsed:.1f}s")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""Fixed-rate scheduler on the monotonic clock
+
+Deadlines are computed from the start time (start + n * interval) rather than by
+sleeping for the interval after each tick, so the cost of the work does not
+accumulate into drift.
+"""
+import sys
+import threading
+import time
+from collections import deque
+
+# What to do when ticks fall behind their deadlines
+CATCH_UP = "catch_up"  # Run the missed ticks back to back (up to max_burst)
+DROP = "drop"  # Skip the missed ticks and resume on the next deadline
+POLICIES = (CATCH_UP, DROP)
+
+# Sleep wakes up late by up to a timer slice (~15ms on Windows); the last stretch
+# before a deadline is busy-waited instead
+DEFAULT_SPIN = 0.002 if sys.platform == "win32" else 0.0002
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = int(round(p / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[min(max(rank, 0), len(sorted_values) - 1)]
+
+
+class FixedRateScheduler:
+    """Calls a function at a fixed cadence and records how well it kept it"""
+
+    def __init__(self, interval, policy=CATCH_UP, max_burst=10, spin=DEFAULT_SPIN,
+                 window=1000, clock=time.monotonic):
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        if policy not in POLICIES:
+            raise ValueError(f"unknown policy '{policy}' (expected one of {', '.join(POLICIES)})")
+        self.interval = interval
+        self.policy = policy
+        self.max_burst = max_burst
+        self.spin = spin
+        self.clock = clock
+
+        self.started = None
+        self.next_deadline = None
+        self.ticks = 0
+        self.dropped = 0
+        self.lateness = deque(maxlen=window)  # Seconds each tick ran after its deadline
+        self.last_tick = None
+        self.last_deadline = None  # Deadline of the most recent tick
+
+    def start(self):
+        self.started = self.clock()
+        self.next_deadline = self.started
+        self.ticks = 0
+        self.dropped = 0
+        self.lateness.clear()
+        self.last_tick = None
+        self.last_deadline = None
+
+    def time_until_due(self):
+        return self.next_deadline - self.clock()
+
+    def mark_tick(self):
+        """Record a tick that is due now and advance to the next deadline"""
+        now = self.clock()
+        self.lateness.append(max(0.0, now - self.next_deadline))
+        self.ticks += 1
+        self.last_tick = now
+        self.last_deadline = self.next_deadline
+        self.next_deadline += self.interval
+
+        behind = now - self.next_deadline
+        if behind >= 0:
+            missed = int(behind // self.interval) + 1
+            if self.policy == DROP:
+                self.dropped += missed
+                self.next_deadline += missed * self.interval
+            elif missed > self.max_burst:
+                # Too far behind to catch up without a burst; resync and count the rest as dropped
+                skipped = missed - self.max_burst
+                self.dropped += skipped
+                self.next_deadline += skipped * self.interval
+
+    def run(self, callback, stop_event=None):
+        """Call callback every interval until it returns False or stop_event is set"""
+        if stop_event is None:
+            stop_event = threading.Event()
+        self.start()
+        while not stop_event.is_set():
+            delay = self.time_until_due()
+            if delay > self.spin:
+                if stop_event.wait(delay - self.spin):
+                    break
+            while self.clock() < self.next_deadline:
+                pass
+            self.mark_tick()
+            if callback() is False:
+                break
+
+    async def run_async(self, callback, is_running=lambda: True):
+        """Await callback every interval until it returns False or is_running() is false"""
+        import asyncio  # Here so that threaded callers don't pay for importing it
+        self.start()
+        while is_running():
+            delay = self.time_until_due()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.mark_tick()
+            if await callback() is False:
+                break
+
+    def scheduled_elapsed(self):
+        """Seconds from start to the current tick's deadline, free of wake-up jitter"""
+        return self.last_deadline - self.started
+
+    def stats(self):
+        """Achieved rate and lateness (jitter) percentiles in milliseconds"""
+        elapsed = (self.last_tick - self.started) if self.last_tick is not None else 0.0
+        lateness = sorted(self.lateness)
+        return {
+            "ticks": self.ticks,
+            "dropped": self.dropped,
+            "elapsed_s": elapsed,
+            "target_hz": 1.0 / self.interval,
+            "rate_hz": (self.ticks - 1) / elapsed if elapsed > 0 else 0.0,
+            "jitter_p50_ms": percentile(lateness, 50) * 1000,
+            "jitter_p95_ms": percentile(lateness, 95) * 1000,
+            "jitter_p99_ms": percentile(lateness, 99) * 1000,
+            "jitter_max_ms": (lateness[-1] * 1000) if lateness else 0.0
+        }
+
+    def summary(self):
+        stats = self.stats()
+        return (f"{stats['rate_hz']:.1f}/{stats['target_hz']:.1f} Hz, "
+                f"jitter p50={stats['jitter_p50_ms']:.2f}ms p95={stats['jitter_p95_ms']:.2f}ms "
+                f"p99={stats['jitter_p99_ms']:.2f}ms, dropped={stats['dropped']}")
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""Outbound message queue drained by a single writer
+
+Every sender (the Tk thread, tasks on the event loop) puts messages on the
+queue instead of calling ws.send itself, so sends are serialized and a slow link
+only ever blocks the writer (AsyncSendWriter, a task on an asyncio loop).
+"""
+import asyncio
+import threading
+import time
+from collections import deque
+
+# Per message type policies
+LATEST = "latest"  # Latest wins: a queued message of the same type is replaced in place
+NEVER_DROP = "never_drop"  # Always accepted, even above max_depth
+DROP_OLDEST = "drop_oldest"  # When full, the oldest droppable message is evicted
+
+DEFAULT_POLICIES = {
+    "location": LATEST,
+    "location_track": LATEST,
+    "route_waypoints": NEVER_DROP,
+    "icon_pin": NEVER_DROP,
+    "codec_hello": NEVER_DROP
+}
+
+
+class _Item:
+    __slots__ = ("msg_type", "message", "policy", "queued_at", "sent")
+
+    def __init__(self, msg_type, message, policy):
+        self.msg_type = msg_type
+        self.message = message
+        self.policy = policy
+        self.queued_at = time.monotonic()
+        self.sent = False
+
+
+class OutboundQueue:
+    """Bounded FIFO of outbound messages with a drop policy per message type"""
+
+    def __init__(self, max_depth=1000, policies=None, default_policy=DROP_OLDEST):
+        self.max_depth = max_depth
+        self.policies = dict(DEFAULT_POLICIES if policies is None else policies)
+        self.default_policy = default_policy
+
+        self._items = deque()
+        self._latest = {}  # msg_type -> queued item for LATEST types
+        self._lock = threading.Lock()
+        self._closed = False
+        self._held = False
+        self._waker = None  # Called whenever get_nowait may have something new to say
+
+        self.enqueued = 0
+        self.sent = 0
+        self.peak_depth = 0
+        self.dropped = {}  # msg_type -> count
+        self.coalesced = {}  # msg_type -> count
+
+    def policy_for(self, msg_type):
+        return self.policies.get(msg_type, self.default_policy)
+
+    def put(self, message):
+        """Queue a message; returns False if the queue is closed"""
+        if isinstance(message, dict):
+            msg_type = message.get("type", "unknown")
+        else:
+            msg_type = getattr(message, "msg_type", "raw")
+        policy = self.policy_for(msg_type)
+        with self._lock:
+            if self._closed:
+                return False
+            self.enqueued += 1
+
+            if policy == LATEST:
+                pending = self._latest.get(msg_type)
+                if pending is not None and not pending.sent:
+                    # Replace the stale position but keep its place in line
+                    pending.message = message
+                    pending.queued_at = time.monotonic()
+                    self.coalesced[msg_type] = self.coalesced.get(msg_type, 0) + 1
+                    return True
+
+            if policy != NEVER_DROP and len(self._items) >= self.max_depth:
+                if not self._evict_one():
+                    self.dropped[msg_type] = self.dropped.get(msg_type, 0) + 1
+                    return True
+
+            item = _Item(msg_type, message, policy)
+            self._items.append(item)
+            if policy == LATEST:
+                self._latest[msg_type] = item
+            self.peak_depth = max(self.peak_depth, len(self._items))
+            self._wake()
+            return True
+
+    def _evict_one(self):
+        for item in self._items:
+            if item.policy != NEVER_DROP:
+                self._items.remove(item)
+                self._forget(item)
+                self.dropped[item.msg_type] = self.dropped.get(item.msg_type, 0) + 1
+                return True
+        return False
+
+    def _forget(self, item):
+        if self._latest.get(item.msg_type) is item:
+            del self._latest[item.msg_type]
+
+    def set_waker(self, waker):
+        """waker() is called (with the queue locked, so it must not block) on put, requeue, close and hold"""
+        with self._lock:
+            self._waker = waker
+
+    def clear_waker(self, expected):
+        """Remove the waker, unless another writer has set its own since"""
+        with self._lock:
+            if self._waker is expected:
+                self._waker = None
+
+    def _wake(self):
+        if self._waker is not None:
+            self._waker()
+
+    def get_nowait(self):
+        """The next message, or None if there is none or the queue is held (see stopped)"""
+        with self._lock:
+            if not self._items or self._held:
+                return None
+            item = self._items.popleft()
+            item.sent = True
+            self._forget(item)
+            self.sent += 1
+            return item.message
+
+    @property
+    def stopped(self):
+        """True once a writer should exit: held, or closed with nothing left"""
+        return self._held or (self._closed and not self._items)
+
+    def close(self):
+        """Stop accepting messages and wake the writer"""
+        with self._lock:
+            self._closed = True
+            self._wake()
+
+    def hold(self):
+        """Stop the writer but keep what is queued (and keep queueing) until reopen, e.g. across a failover"""
+        with self._lock:
+            self._held = True
+            self._wake()
+
+    def requeue(self, message):
+        """Put back a message the writer took but could not send, ahead of everything else"""
+        if isinstance(message, dict):
+            msg_type = message.get("type", "unknown")
+        else:
+            msg_type = getattr(message, "msg_type", "raw")
+        policy = self.policy_for(msg_type)
+        with self._lock:
+            self.sent -= 1
+            if policy == LATEST and msg_type in self._latest:
+                # A newer one is already queued, so this one is stale
+                self.coalesced[msg_type] = self.coalesced.get(msg_type, 0) + 1
+                return
+            item = _Item(msg_type, message, policy)
+            self._items.appendleft(item)
+            if policy == LATEST:
+                # Later puts replace it in place, as if it had never left the queue
+                self._latest[msg_type] = item
+            self._wake()
+
+    def reopen(self):
+        with self._lock:
+            self._closed = False
+            self._held = False
+
+    def clear(self):
+        """Discard everything queued; returns the number of messages discarded"""
+        with self._lock:
+            count = len(self._items)
+            for item in self._items:
+                self.dropped[item.msg_type] = self.dropped.get(item.msg_type, 0) + 1
+            self._items.clear()
+            self._latest.clear()
+            return count
+
+    @property
+    def depth(self):
+        return len(self._items)
+
+    def snapshot(self):
+        """Queued messages, oldest first"""
+        with self._lock:
+            return [item.message for item in self._items]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "depth": len(self._items),
+                "peak_depth": self.peak_depth,
+                "enqueued": self.enqueued,
+                "sent": self.sent,
+                "dropped": dict(self.dropped),
+                "coalesced": dict(self.coalesced),
+                "dropped_total": sum(self.dropped.values()),
+                "coalesced_total": sum(self.coalesced.values())
+            }
+
+
+class AsyncSendWriter:
+    """Single writer task that drains an OutboundQueue into an async send function
+
+    Threads keep putting messages on the queue as usual; the queue wakes the
+    writer through call_soon_threadsafe. Run it as a task: await writer.run().
+    The first backlog messages (e.g. those queued while disconnected) are paced
+    at backlog_rate per second so a reconnect doesn't flood the server.
+    """
+
+    def __init__(self, queue, send, on_error=None, backlog=0, backlog_rate=None):
+        self.queue = queue
+        self.send = send
+        self.on_error = on_error
+        self.backlog = backlog
+        self.backlog_rate = backlog_rate
+        self.stopping = False
+        self._wake = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+        self._wake = lambda: loop.call_soon_threadsafe(wake.set)
+        self.queue.set_waker(self._wake)
+        interval = 1.0 / self.backlog_rate if self.backlog_rate else 0.0
+        next_send = time.monotonic()
+        try:
+            while not self.stopping:
+                # Cleared before looking, so a put in between still wakes the wait below
+                wake.clear()
+                message = self.queue.get_nowait()
+                if message is None:
+                    if self.queue.stopped:
+                        break
+                    await wake.wait()
+                    continue
+                if self.backlog > 0 and interval:
+                    delay = next_send - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    next_send = max(next_send, time.monotonic()) + interval
+                    self.backlog -= 1
+                try:
+                    await self.send(message)
+                except Exception as e:
+                    if self.on_error:
+                        self.on_error(e, message)
+        finally:
+            self.queue.clear_waker(self._wake)
+
+    def stop(self):
+        """Exit after the message being sent, leaving the rest queued (e.g. for the next writer)"""
+        self.stopping = True
+        if self._wake is not None:
+            self._wake()
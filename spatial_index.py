@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""Lat/lng grid over robot positions for radius, box and nearest queries
+
+Positions are bucketed into cells of cell_deg degrees, and occupied cells are
+also tracked at a few coarser levels so a search through empty areas (sparse
+fleets, big radii) steps over many cells at once. Updates are O(1): a robot only
+changes cell when it crosses a cell edge. Distances are great-circle distances on
+the same spherical Earth as robot_protocol.distance_m and calculate_direction.
+"""
+import heapq
+import math
+
+import robot_protocol as protocol
+
+DEFAULT_CELL_DEG = 0.01  # About 1.1 km north-south
+LEVEL_FACTORS = (1, 16, 256)  # Cell size of each level, in fine cells
+LEVEL_RINGS = 3  # Rings searched at a level before moving to the next coarser one
+WINDOW_CELLS = 64  # Most cells looked up for a radius or box query before going coarser
+
+_M_PER_DEG = math.pi / 180.0 * protocol.EARTH_RADIUS_M
+
+
+def _meridian_gap_m(lat, lng_gap):
+    """Great-circle distance from a point to the meridian lng_gap degrees away"""
+    return math.asin(math.cos(math.radians(lat)) * math.sin(math.radians(min(lng_gap, 90.0)))) * protocol.EARTH_RADIUS_M
+
+
+class SpatialGrid:
+    """Grid index of robotId -> (lat, lng)"""
+
+    def __init__(self, cell_deg=DEFAULT_CELL_DEG):
+        if cell_deg <= 0 or cell_deg > 180:
+            raise ValueError("cell_deg must be in (0, 180]")
+        self.cell_deg = cell_deg
+        self.lng_cells = int(math.ceil(360.0 / cell_deg))
+        self.cells = {}  # (lat index, lng index) -> {robotId: (lat, lng)}
+        self.keys = {}  # robotId -> cell key
+        # (factor, {coarse key: set of occupied fine keys}) per level; level 0 is self.cells
+        self.levels = [(1, self.cells)] + [(factor, {}) for factor in LEVEL_FACTORS[1:]]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, robot_id):
+        return robot_id in self.keys
+
+    def _lat_index(self, lat):
+        return int(math.floor(lat / self.cell_deg))
+
+    def _lng_index(self, lng):
+        return int(math.floor((lng + 180.0) / self.cell_deg)) % self.lng_cells
+
+    def update(self, robot_id, lat, lng):
+        key = (self._lat_index(lat), self._lng_index(lng))
+        old_key = self.keys.get(robot_id)
+        if old_key is not None and old_key != key:
+            self._discard(robot_id, old_key)
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = self.cells[key] = {}
+            for factor, coarse in self.levels[1:]:
+                coarse_key = (key[0] // factor, key[1] // factor)
+                members = coarse.get(coarse_key)
+                if members is None:
+                    members = coarse[coarse_key] = set()
+                members.add(key)
+        cell[robot_id] = (lat, lng)
+        self.keys[robot_id] = key
+
+    def remove(self, robot_id):
+        key = self.keys.pop(robot_id, None)
+        if key is not None:
+            self._discard(robot_id, key)
+
+    def _discard(self, robot_id, key):
+        cell = self.cells[key]
+        del cell[robot_id]
+        if not cell:
+            del self.cells[key]
+            for factor, coarse in self.levels[1:]:
+                coarse_key = (key[0] // factor, key[1] // factor)
+                members = coarse[coarse_key]
+                members.discard(key)
+                if not members:
+                    del coarse[coarse_key]
+
+    def clear(self):
+        for _, cells in self.levels:
+            cells.clear()
+        self.keys.clear()
+
+    def _fine_keys(self, factor, cells, key):
+        if factor == 1:
+            return (key,) if key in cells else ()
+        return cells.get(key, ())
+
+    # Radius and box queries
+
+    def _lng_ranges(self, west, east):
+        """Fine lng index ranges from west to east, split at the antimeridian"""
+        if east - west >= 360.0 - self.cell_deg:
+            return [(0, self.lng_cells - 1)]
+        lo = self._lng_index(west)
+        hi = self._lng_index(east)
+        if lo <= hi:
+            return [(lo, hi)]
+        return [(lo, self.lng_cells - 1), (0, hi)]
+
+    def _cells_in(self, lat_lo, lat_hi, lng_ranges):
+        """Occupied fine cells in an index window, looked up at the finest level that keeps it small"""
+        for factor, cells in self.levels:
+            level_lat = (lat_lo // factor, lat_hi // factor)
+            level_lng = [(lo // factor, hi // factor) for lo, hi in lng_ranges]
+            count = (level_lat[1] - level_lat[0] + 1) * sum(hi - lo + 1 for lo, hi in level_lng)
+            if count <= WINDOW_CELLS:
+                break
+
+        if count > len(cells):
+            level_keys = [key for key in cells
+                          if level_lat[0] <= key[0] <= level_lat[1] and
+                          any(lo <= key[1] <= hi for lo, hi in level_lng)]
+        else:
+            level_keys = [(lat_i, lng_i) for lat_i in range(level_lat[0], level_lat[1] + 1)
+                          for lo, hi in level_lng for lng_i in range(lo, hi + 1)]
+
+        fine = self.cells
+        for level_key in level_keys:
+            for key in self._fine_keys(factor, cells, level_key):
+                if factor == 1 or (lat_lo <= key[0] <= lat_hi and
+                                   any(lo <= key[1] <= hi for lo, hi in lng_ranges)):
+                    yield fine[key]
+
+    def in_box(self, south, west, north, east):
+        """robotIds inside a lat/lng box; west > east means the box crosses the antimeridian"""
+        if east < west:
+            east += 360.0
+        lng_ranges = self._lng_ranges(west, east)
+        result = []
+        for cell in self._cells_in(self._lat_index(south), self._lat_index(north), lng_ranges):
+            for robot_id, (lat, lng) in cell.items():
+                if south <= lat <= north and (west <= lng <= east or west <= lng + 360.0 <= east):
+                    result.append(robot_id)
+        return result
+
+    def within(self, lat, lng, radius_m):
+        """[(distance_m, robotId, lat, lng)] within radius_m of a point, nearest first"""
+        angular = radius_m / protocol.EARTH_RADIUS_M
+        dlat = math.degrees(angular)
+        south = max(-90.0, lat - dlat)
+        north = min(90.0, lat + dlat)
+        cos_lat = math.cos(math.radians(lat))
+        if north >= 90.0 or south <= -90.0 or math.sin(angular) >= cos_lat:
+            lng_ranges = [(0, self.lng_cells - 1)]  # The circle reaches a pole
+        else:
+            dlng = math.degrees(math.asin(math.sin(angular) / cos_lat))
+            lng_ranges = self._lng_ranges(lng - dlng, lng + dlng)
+
+        distance_m = protocol.distance_m
+        result = []
+        for cell in self._cells_in(self._lat_index(south), self._lat_index(north), lng_ranges):
+            for robot_id, (robot_lat, robot_lng) in cell.items():
+                if south <= robot_lat <= north:
+                    distance = distance_m(lat, lng, robot_lat, robot_lng)
+                    if distance <= radius_m:
+                        result.append((distance, robot_id, robot_lat, robot_lng))
+        result.sort()
+        return result
+
+    # Nearest neighbours
+
+    def nearest(self, lat, lng, k=1, max_distance_m=None):
+        """[(distance_m, robotId, lat, lng)] of the k robots nearest a point, nearest first
+
+        Searches rings of cells outwards from the point, a few rings per level from
+        fine to coarse, and stops once no unvisited cell can hold anything closer
+        than the k-th match so far.
+        """
+        if k <= 0 or not self.keys:
+            return []
+        distance_m = protocol.distance_m
+        limit = math.inf if max_distance_m is None else max_distance_m
+        best = []  # Max-heap of the k nearest as (-distance, robotId, lat, lng)
+        visited = set()
+
+        def consider(key):
+            visited.add(key)
+            reach = -best[0][0] if len(best) == k else limit
+            if self._cell_gap_m(lat, lng, key) > reach:
+                return
+            for robot_id, (robot_lat, robot_lng) in self.cells[key].items():
+                distance = distance_m(lat, lng, robot_lat, robot_lng)
+                if distance > limit:
+                    continue
+                if len(best) < k:
+                    heapq.heappush(best, (-distance, robot_id, robot_lat, robot_lng))
+                elif distance < -best[0][0]:
+                    heapq.heapreplace(best, (-distance, robot_id, robot_lat, robot_lng))
+
+        fine_lat = self._lat_index(lat)
+        fine_lng = self._lng_index(lng)
+        last_level = len(self.levels) - 1
+        for depth, (factor, cells) in enumerate(self.levels):
+            lat_i = fine_lat // factor
+            lng_i = fine_lng // factor
+            columns = -(-self.lng_cells // factor)
+            size = factor * self.cell_deg
+            ring = 0
+            done = False
+            while depth == last_level or ring <= LEVEL_RINGS:
+                if 8 * ring > len(cells):
+                    # The ring has more cells than are occupied: check the rest directly
+                    for key in list(self.cells):
+                        if key not in visited:
+                            consider(key)
+                    done = True
+                    break
+                for level_key in self._ring(lat_i, lng_i, ring, columns):
+                    for key in self._fine_keys(factor, cells, level_key):
+                        if key not in visited:
+                            consider(key)
+                clearance = self._ring_clearance_m(lat, lng, lat_i, lng_i, ring, size, columns)
+                if (len(visited) == len(self.cells) or clearance > limit or
+                        (len(best) == k and -best[0][0] <= clearance)):
+                    done = True
+                    break
+                ring += 1
+            if done:
+                break
+
+        return sorted((-negative, robot_id, robot_lat, robot_lng) for negative, robot_id, robot_lat, robot_lng in best)
+
+    def _ring(self, lat_i, lng_i, ring, columns):
+        """Cell keys at Chebyshev distance ring from (lat_i, lng_i), wrapping in lng"""
+        if ring == 0:
+            yield (lat_i, lng_i)
+            return
+        start = lng_i - ring
+        for d in range(min(2 * ring + 1, columns)):
+            yield (lat_i - ring, (start + d) % columns)
+            yield (lat_i + ring, (start + d) % columns)
+        if 2 * ring > columns:
+            return  # Every column is already closer than ring
+        for d in range(-ring + 1, ring):
+            yield (lat_i + d, (lng_i - ring) % columns)
+            if 2 * ring < columns:
+                yield (lat_i + d, (lng_i + ring) % columns)
+
+    def _ring_clearance_m(self, lat, lng, lat_i, lng_i, ring, size, columns):
+        """Lower bound on the distance from the point to any cell outside the ring"""
+        lat_gap = min(lat - (lat_i - ring) * size, (lat_i + ring + 1) * size - lat) * _M_PER_DEG
+        if 2 * ring + 1 >= columns:
+            return lat_gap  # Every column is inside the ring
+        east_edge = ((lng_i + ring + 1) % columns) * size - 180.0
+        west_edge = min(180.0, ((lng_i - ring - 1) % columns + 1) * size - 180.0)
+        lng_gap = min((east_edge - lng) % 360.0, (lng - west_edge) % 360.0)
+        return min(lat_gap, _meridian_gap_m(lat, lng_gap))
+
+    def _cell_gap_m(self, lat, lng, key):
+        """Lower bound on the distance from the point to anything in a fine cell"""
+        size = self.cell_deg
+        south = key[0] * size
+        lat_gap = max(0.0, south - lat, lat - south - size)
+        west = key[1] * size - 180.0
+        if west <= lng <= west + size:
+            lng_gap = 0.0
+        else:
+            lng_gap = min((west - lng) % 360.0, (lng - min(180.0, west + size)) % 360.0)
+        return max(lat_gap * _M_PER_DEG, _meridian_gap_m(lat, lng_gap))
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+
+import capture
+import wire_codec
+
+ROBOT_IDS = ["plain", 'quo"te', "line\nbreak", "café", "back\\slash"]
+
+
+def location_frame(robot_id, n):
+    return json.dumps({"type": "robot_location", "robotId": robot_id, "data": {"lat": 1.0, "lng": 2.0, "n": n}})
+
+
+def write_capture(path, count=50):
+    writer = capture.CaptureWriter(str(path))
+    for n in range(count):
+        writer.record(capture.INBOUND, location_frame(ROBOT_IDS[n % len(ROBOT_IDS)], n), timestamp=1000.0 + n)
+    writer.record(capture.OUTBOUND, '{"type": "ping"}', timestamp=1000.0 + count)
+    writer.record(capture.INBOUND, wire_codec.encode_location(1.0, 2.0, 3.0, 0, "robot_location", "bin"),
+                  timestamp=1001.0 + count)
+    writer.close()
+    return str(path)
+
+
+def test_records_round_trip_in_order(tmp_path):
+    path = write_capture(tmp_path / "traffic.rbcap")
+    reader = capture.CaptureReader(path)
+    records = list(reader.records())
+    assert len(reader) == len(records) == 52
+    assert records[0] == (1000.0, capture.INBOUND, location_frame("plain", 0))
+    assert records[50] == (1050.0, capture.OUTBOUND, '{"type": "ping"}')
+    assert isinstance(records[51][2], bytes)
+    reader.close()
+
+
+def test_seek_by_time_and_direction(tmp_path):
+    reader = capture.CaptureReader(write_capture(tmp_path / "traffic.rbcap"))
+    assert reader.find_time(1010.5) == 11
+    assert [r[0] for r in reader.records(start_time=1010.5, end_time=1013.0)] == [1011.0, 1012.0, 1013.0]
+    assert [r[2] for r in reader.records(direction=capture.OUTBOUND)] == ['{"type": "ping"}']
+    reader.close()
+
+
+def test_robot_ids_with_escapes_are_found(tmp_path):
+    reader = capture.CaptureReader(write_capture(tmp_path / "traffic.rbcap"))
+    assert reader.robot_ids[1:] == ROBOT_IDS + ["bin"]
+    for robot_id in ROBOT_IDS:
+        frames = [json.loads(r[2]) for r in reader.records(robot_id=robot_id)]
+        assert len(frames) == 10
+        assert {frame["robotId"] for frame in frames} == {robot_id}
+    assert [r[0] for r in reader.records(robot_id="line\nbreak", start_time=1020.0, end_time=1030.0)] == [1022.0, 1027.0]
+    assert len(list(reader.records(robot_id="bin"))) == 1
+    assert list(reader.records(robot_id="nobody")) == []
+    reader.close()
+
+
+def test_appending_continues_robot_numbering(tmp_path):
+    path = write_capture(tmp_path / "traffic.rbcap", count=5)
+    writer = capture.CaptureWriter(path)
+    writer.record(capture.INBOUND, location_frame("line\nbreak", 99), timestamp=2000.0)
+    writer.record(capture.INBOUND, location_frame("new", 100), timestamp=2001.0)
+    writer.close()
+    reader = capture.CaptureReader(path)
+    assert reader.robot_ids[1:] == ROBOT_IDS + ["bin", "new"]
+    assert [json.loads(r[2])["data"]["n"] for r in reader.records(robot_id="line\nbreak")] == [2, 99]
+    reader.close()
+
+
+def test_missing_or_torn_index_is_rebuilt(tmp_path):
+    path = write_capture(tmp_path / "traffic.rbcap")
+    os.remove(path + ".idx")
+    os.remove(path + ".robots")
+    reader = capture.CaptureReader(path)
+    assert len(reader) == 52
+    assert len(list(reader.records(robot_id='quo"te'))) == 10
+    reader.close()
+
+    with open(path + ".idx", "r+b") as f:
+        f.truncate(os.path.getsize(path + ".idx") - 3)
+    reader = capture.CaptureReader(path)
+    assert len(reader) == 52
+    reader.close()
+
+
+def test_torn_final_record_is_left_out(tmp_path):
+    path = write_capture(tmp_path / "traffic.rbcap")
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 5)
+    os.remove(path + ".idx")
+    reader = capture.CaptureReader(path)
+    assert len(reader) == 51
+    reader.close()
+
+
+def test_not_a_capture_file(tmp_path):
+    path = tmp_path / "other.bin"
+    path.write_bytes(b"something else")
+    for open_capture in (capture.CaptureReader, capture.CaptureWriter):
+        try:
+            open_capture(str(path))
+        except ValueError:
+            pass
+        else:
+            raise AssertionError(f"{open_capture.__name__} accepted a non-capture file")
+
+
+def test_replay_as_fast_as_possible_and_stopping(tmp_path):
+    reader = capture.CaptureReader(write_capture(tmp_path / "traffic.rbcap"))
+    frames = []
+    count = asyncio.run(capture.replay(reader.records(direction=capture.INBOUND), frames.append, speed=None))
+    assert count == len(frames) == 51
+
+    frames = []
+    count = asyncio.run(capture.replay(reader.records(), frames.append, speed=None,
+                                       is_running=lambda: len(frames) < 3))
+    assert count == 3
+    reader.close()
+
+
+def test_replay_keeps_the_original_spacing():
+    records = [(10.0, capture.INBOUND, "a"), (10.5, capture.INBOUND, "b"), (11.0, capture.INBOUND, "c")]
+    arrivals = []
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        return await capture.replay(records, lambda frame: arrivals.append(loop.time()), speed=10.0)
+
+    assert asyncio.run(main()) == 3
+    assert arrivals[2] - arrivals[0] >= 0.09
+
+
+def test_robot_id_of_text_and_binary_frames():
+    assert capture.robot_id_of(location_frame('quo"te', 0)) == 'quo"te'
+    assert capture.robot_id_of('{"type": "pong"}') is None
+    assert capture.robot_id_of(wire_codec.encode_location(1.0, 2.0, 3.0, 0, "robot_location", "b1")) == "b1"
+    assert capture.robot_id_of(wire_codec.encode_location(1.0, 2.0, 3.0, 0)) is None
@@ -0,0 +1,125 @@
+"""Receive, replay and send error paths of the GUI client, run against a stand-in for the app (no Tk window)"""
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("tkinter")
+
+import capture
+import message_schema
+import metrics
+import websockets
+import wire_codec
+from dispatch import MessageDispatcher
+from latency import PingTracker
+from message_log import MessageLog
+from robot_state import RobotStateStore
+from send_queue import OutboundQueue
+from websocket_react_client import WebSocketReactClient
+
+
+class Bridge:
+    """Collects what the client posts to the Tk thread"""
+
+    def __init__(self):
+        self.calls = []
+
+    def post(self, func, *args):
+        self.calls.append((getattr(func, "__name__", func), args))
+
+    def logged(self):
+        return [args for name, args in self.calls if name == "log_message"]
+
+
+def client(**fields):
+    app = SimpleNamespace(ui=Bridge(), capture_writer=None, last_message=None, received=[],
+                          dispatcher=MessageDispatcher(), connected=True, outbound_queue=OutboundQueue())
+    app.record_received = lambda frame, message, received_at: app.received.append(message)
+    app.dispatch_frame = lambda dispatcher, frame: WebSocketReactClient.dispatch_frame(app, dispatcher, frame)
+
+    def log_message(*args):
+        raise AssertionError("log_message must go through the Tk bridge")
+
+    app.log_message = log_message
+    app.__dict__.update(fields)
+    return app
+
+
+def receive(app, message):
+    WebSocketReactClient.on_message(app, object(), json.dumps(message))
+
+
+def test_a_failing_handler_is_logged_and_the_frame_skipped():
+    app = client()
+
+    def handler(message):
+        raise KeyError("points")
+
+    app.dispatcher.register("location_batch", handler)
+    receive(app, {"type": "location_batch", "data": {"points": []}})
+    assert app.received == [None]
+    assert app.ui.logged()[0][0] == "ERROR"
+    assert "location_batch" in app.ui.logged()[0][1]
+    assert app.dispatcher.stats()["location_batch"]["errors"] == 1
+
+
+def test_malformed_frames_are_logged_not_raised():
+    app = client()
+    app.dispatcher.register("location_batch", lambda message: None)
+    receive(app, {"type": "location_batch", "robotId": "r1", "data": []})
+    receive(app, {"type": "robot_location", "robotId": [1], "data": {"lat": 1, "lng": 2}})
+    WebSocketReactClient.on_message(app, object(), "{not json")
+    assert [args[0] for args in app.ui.logged()] == ["WARNING", "WARNING", "ERROR", "ERROR"]
+
+
+def test_send_error_names_the_type_of_a_queued_message():
+    app = client()
+    message = message_schema.status()
+    WebSocketReactClient.on_send_error(app, OSError("broken pipe"), message)
+    assert app.ui.logged() == [("ERROR", "❌ Failed to send status: broken pipe")]
+    assert app.outbound_queue.depth == 0
+
+
+def test_send_error_on_a_closed_connection_requeues_the_message():
+    app = client()
+    app.outbound_queue.put(message_schema.ping(seq=2))
+    taken = app.outbound_queue.get_nowait()
+    WebSocketReactClient.on_send_error(app, websockets.ConnectionClosedError(None, None), taken)
+    assert app.outbound_queue.snapshot() == [taken]
+    assert app.ui.logged() == []
+
+
+def test_replay_only_updates_robot_states_and_the_log(tmp_path):
+    app = WebSocketReactClient.__new__(WebSocketReactClient)
+    app.__dict__.update(ui=Bridge(), outbound_queue=OutboundQueue(), message_log=MessageLog(),
+                        robot_states=RobotStateStore(), metrics=metrics.MetricsRegistry(), ping_tracker=PingTracker(),
+                        wire_codec=wire_codec.CODEC_JSON, binary_requested=True, replay_stop=threading.Event())
+    app.setup_dispatcher()
+    app.ping_tracker.mark_sent(app.ping_tracker.next_ping())
+    tracker_before = app.ping_tracker.stats()
+
+    path = str(tmp_path / "replay.rbcap")
+    writer = capture.CaptureWriter(path)
+    for n, message in enumerate([
+        {"type": "command", "command": "sendlocation"},
+        {"type": "codec_ack", "codec": wire_codec.CODEC_BINARY},
+        {"type": "pong", "seq": 1},
+        {"type": "robot_location", "robotId": "r1", "data": {"lat": 1.0, "lng": 2.0, "direction": 90.0}},
+    ]):
+        writer.record(capture.INBOUND, json.dumps(message), timestamp=1000.0 + n)
+    writer.close()
+
+    reader = capture.CaptureReader(path)
+    asyncio.run(WebSocketReactClient.replay_loop(app, reader, None))
+    assert app.outbound_queue.depth == 0
+    assert "send_location" not in [name for name, args in app.ui.calls]
+    assert app.wire_codec == wire_codec.CODEC_JSON
+    assert app.ping_tracker.stats() == tracker_before
+    assert app.metrics.value("messages_received_total", type="robot_location") in (None, 0)
+    assert app.dispatcher.stats() == {}
+    assert app.robot_states.get("r1")["lat"] == 1.0
+    assert [name for name, args in app.ui.calls][-1] == "finish_replay"
+    assert app.ui.calls[-1][1][0] == 4
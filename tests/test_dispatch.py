@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+import message_schema
+import wire_codec
+from dispatch import OTHER, MessageDispatcher, decode_frame, peek
+
+
+def location_frame(robot_id="r1"):
+    return json.dumps({"type": "robot_location", "robotId": robot_id, "data": {"lat": 1.0, "lng": 2.0}})
+
+
+class CountingDecode:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, frame):
+        self.calls += 1
+        return decode_frame(frame)
+
+
+def test_peek_reads_type_and_robot_id_of_text_frames():
+    assert peek(location_frame("r9")) == ("robot_location", "r9")
+    assert peek('  {"type": "pong", "seq": 1}') == ("pong", None)
+
+
+def test_peek_only_trusts_a_leading_type():
+    assert peek('{"data": {"type": "pong"}, "type": "robot_status"}') == (None, None)
+    assert peek("not json") == (None, None)
+
+
+def test_peek_reads_binary_frames():
+    frame = wire_codec.encode_location(1.0, 2.0, 3.0, 0, msg_type="robot_location", robot_id="bot")
+    assert peek(frame) == ("robot_location", "bot")
+    assert peek(wire_codec.encode_location(1.0, 2.0, 3.0, 0)) == ("location", None)
+    assert peek(b"\x09\x01") == (None, None)
+
+
+def test_dispatch_routes_by_type_with_other_fallback():
+    seen = []
+    dispatcher = MessageDispatcher()
+    dispatcher.register("robot_location", lambda m: seen.append(("location", m["robotId"])))
+    dispatcher.register(OTHER, lambda m: seen.append(("other", m["type"])))
+    dispatcher.dispatch(location_frame())
+    dispatcher.dispatch('{"type": "hello"}')
+    assert seen == [("location", "r1"), ("other", "hello")]
+    assert dispatcher.stats()["robot_location"]["handled"] == 1
+
+
+def test_disabled_types_are_skipped_without_decoding():
+    decode = CountingDecode()
+    dispatcher = MessageDispatcher(decode=decode)
+    dispatcher.register("robot_location", lambda m: None)
+    dispatcher.set_enabled("robot_location", False)
+    assert dispatcher.dispatch(location_frame()) is None
+    assert decode.calls == 0
+    assert dispatcher.stats()["robot_location"]["skipped"] == 1
+    dispatcher.set_enabled("robot_location", True)
+    assert dispatcher.dispatch(location_frame()) is not None
+
+
+def test_disabling_other_skips_types_without_a_handler():
+    dispatcher = MessageDispatcher()
+    dispatcher.register("pong", lambda m: None)
+    dispatcher.set_enabled(OTHER, False)
+    assert dispatcher.dispatch('{"type": "hello"}') is None
+    assert dispatcher.dispatch('{"type": "pong"}') is not None
+
+
+def test_robot_filter_skips_other_robots_before_decoding():
+    decode = CountingDecode()
+    dispatcher = MessageDispatcher(decode=decode)
+    dispatcher.register("robot_location", lambda m: None)
+    dispatcher.set_robot_filter(["r1"])
+    assert dispatcher.dispatch(location_frame("r2")) is None
+    assert decode.calls == 0
+    assert dispatcher.dispatch(location_frame("r1")) is not None
+    dispatcher.set_robot_filter([])
+    assert dispatcher.dispatch(location_frame("r2")) is not None
+
+
+def test_unpeekable_frames_are_filtered_after_decoding():
+    dispatcher = MessageDispatcher()
+    dispatcher.register("robot_location", lambda m: None)
+    dispatcher.set_robot_filter(["r1"])
+    frame = json.dumps({"robotId": "r2", "type": "robot_location", "data": {"lat": 1.0, "lng": 2.0}})
+    assert dispatcher.dispatch(frame) is None
+    assert dispatcher.stats()["robot_location"]["skipped"] == 1
+
+
+def test_decode_errors_propagate_and_are_counted():
+    dispatcher = MessageDispatcher()
+    with pytest.raises(message_schema.SchemaError):
+        dispatcher.dispatch('{"type": "robot_location", "data": {"lat": 1.0}}')
+    with pytest.raises(json.JSONDecodeError):
+        dispatcher.dispatch('{"type": "pong", ')
+    assert dispatcher.stats()["robot_location"]["errors"] == 1
+    assert dispatcher.stats()["pong"]["errors"] == 1
+
+
+def test_handler_errors_are_counted_and_reraised():
+    def handler(message):
+        raise RuntimeError("bug")
+
+    dispatcher = MessageDispatcher()
+    dispatcher.register("robot_location", handler)
+    with pytest.raises(RuntimeError):
+        dispatcher.dispatch(location_frame())
+    stats = dispatcher.stats()["robot_location"]
+    assert (stats["errors"], stats["handled"]) == (1, 0)
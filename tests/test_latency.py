@@ -0,0 +1,84 @@
+from latency import LatencyHistogram, PingTracker
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def send_ping(tracker, manual=False):
+    seq = tracker.next_ping(manual)
+    tracker.mark_sent(seq)
+    return seq
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for ms in range(1, 101):
+        histogram.record(ms / 1000)
+    summary = histogram.summary()
+    assert summary["count"] == 100
+    assert 45 <= summary["p50_ms"] <= 55
+    assert 90 <= summary["p95_ms"] <= 100
+    assert summary["max_ms"] >= 99
+
+
+def test_pongs_match_pings_by_seq_or_oldest():
+    clock = Clock()
+    tracker = PingTracker(clock=clock)
+    first = send_ping(tracker)
+    second = send_ping(tracker, manual=True)
+    clock.now = 0.25
+    assert tracker.on_pong(second) == (0.25, True)
+    assert tracker.on_pong() == (0.25, False)
+    assert tracker.on_pong(first) is None
+    assert tracker.on_pong(99) is None
+
+
+def test_lost_pongs_degrade_only_a_server_that_answers_pings():
+    clock = Clock()
+    tracker = PingTracker(timeout=1.0, degraded_losses=3, clock=clock)
+    for _ in range(5):
+        send_ping(tracker)
+        clock.now += 2.0
+        tracker.expire()
+    assert tracker.lost == 5
+    assert not tracker.is_degraded()
+
+    send_ping(tracker)
+    tracker.on_pong()
+    for _ in range(3):
+        send_ping(tracker)
+        clock.now += 2.0
+        tracker.expire()
+    assert tracker.is_degraded()
+
+    tracker.reset_connection()
+    assert not tracker.is_degraded()
+
+
+def test_slow_round_trips_degrade_the_link():
+    clock = Clock()
+    tracker = PingTracker(window=4, degraded_rtt_ms=100.0, clock=clock)
+    for _ in range(4):
+        send_ping(tracker)
+        clock.now += 0.5
+        tracker.on_pong()
+    assert tracker.is_degraded()
+
+
+def test_round_trip_starts_when_the_ping_is_written():
+    clock = Clock()
+    tracker = PingTracker(timeout=1.0, clock=clock)
+    seq = tracker.next_ping()
+    clock.now = 3.0  # Waiting in the send queue: neither lost nor part of the RTT
+    assert tracker.expire() == 0
+    assert tracker.on_pong() is None
+    assert tracker.sent == 0
+    tracker.mark_sent(seq)
+    clock.now = 3.25
+    assert tracker.on_pong(seq) == (0.25, False)
+    assert tracker.sent == 1
@@ -0,0 +1,113 @@
+import json
+import math
+
+import pytest
+
+import message_schema
+import wire_codec
+from message_schema import SchemaError
+
+NOW = 1700000000.0
+
+
+def roundtrip(message):
+    return json.loads(message.encode())
+
+
+@pytest.mark.parametrize("message", [
+    message_schema.location(37.7749, -122.4194, 90.0, now=NOW),
+    message_schema.location_track(-33.5, 151, -45, now=NOW),
+    message_schema.status(now=NOW),
+    message_schema.ping(now=NOW),
+    message_schema.ping(seq=7, now=NOW),
+    message_schema.icon_pin(1.5, 2.5, 'café "pin"'),
+    message_schema.route_waypoints(now=NOW),
+    message_schema.route_waypoints_chunk("r1", 0, 2, 0, [{"lat": 1.0, "lng": 2.0}], 4, now=NOW),
+])
+def test_encode_matches_json_dumps_of_to_dict(message):
+    assert message.encode() == json.dumps(message.to_dict())
+    if message_schema.SCHEMAS.get(message.msg_type) is message.schema:
+        message_schema.validate(roundtrip(message))
+
+
+def test_compressed_chunk_round_trips():
+    import base64
+    import zlib
+    waypoints = [{"lat": 1.0 + i, "lng": 2.0} for i in range(10)]
+    message = roundtrip(message_schema.route_waypoints_chunk("r1", 1, 2, 10, waypoints, 20, compress=True, now=NOW))
+    assert message["data"]["encoding"] == "deflate+base64"
+    assert json.loads(zlib.decompress(base64.b64decode(message["data"]["waypoints"]))) == waypoints
+
+
+def test_numpy_like_number_subclasses_encode_as_plain_numbers():
+    class Float(float):
+        def __repr__(self):
+            return "Float(1.5)"
+
+    assert roundtrip(message_schema.location(Float(1.5), 2.0, 3.0, now=NOW))["data"]["lat"] == 1.5
+
+
+@pytest.mark.parametrize("lat", [91.0, -90.5, math.nan, math.inf, True, "1.0", None])
+def test_encode_rejects_bad_numbers(lat):
+    with pytest.raises(SchemaError):
+        message_schema.location(lat, 0.0, 0.0, now=NOW).encode()
+
+
+def test_encode_rejects_bad_labels_and_waypoints():
+    with pytest.raises(SchemaError):
+        message_schema.icon_pin(1.0, 2.0, "").encode()
+    with pytest.raises(SchemaError):
+        message_schema.route_waypoints([], now=NOW).encode()
+    with pytest.raises(SchemaError):
+        message_schema.route_waypoints([{"lat": 100, "lng": 0}], now=NOW).encode()
+    with pytest.raises(SchemaError):
+        message_schema.ping(seq=-1, now=NOW).encode()
+    with pytest.raises(SchemaError):
+        message_schema.location(1.0, 2.0, 3.0, msg_type="status")
+
+
+def test_validate_accepts_inbound_messages():
+    message_schema.validate({"type": "robot_location", "robotId": "r1", "data": {"lat": 1, "lng": 2, "direction": 3}})
+    message_schema.validate({"type": "robot_location", "robotId": 7, "data": {"lat": 1, "lng": 2}})
+    message_schema.validate({"type": "robot_status", "data": {"battery": 50}})
+    message_schema.validate({"type": "pong"})
+    message_schema.validate({"type": "location_batch", "robotId": "r1",
+                             "data": {"points": [{"lat": 1, "lng": 2, "direction": 3}], "count": 1}})
+    message_schema.validate({"type": "something_new", "data": []})
+
+
+@pytest.mark.parametrize("message", [
+    [],
+    {"type": "robot_location", "data": {"lat": 1}},
+    {"type": "robot_location", "data": {"lat": 100, "lng": 2}},
+    {"type": "robot_location", "robotId": [1], "data": {"lat": 1, "lng": 2}},
+    {"type": "robot_location", "robotId": True, "data": {"lat": 1, "lng": 2}},
+    {"type": "robot_status", "data": []},
+    {"type": "pong", "seq": "1"},
+    {"type": "location_batch", "data": []},
+    {"type": "location_batch", "data": {"points": {}}},
+    {"type": "location_batch", "data": {"points": ["p"]}},
+    {"type": "location_batch", "data": {"points": [{"lat": "1", "lng": 2}]}},
+    {"type": "location_batch", "data": {"points": [{"lat": 1, "lng": 2, "direction": 720}]}},
+    {"type": "location_batch", "robotId": {}, "data": {"points": []}},
+])
+def test_validate_rejects_malformed_messages(message):
+    with pytest.raises(SchemaError):
+        message_schema.validate(message)
+
+
+def test_message_type_of_messages_dicts_and_raw_frames():
+    assert message_schema.message_type(message_schema.status(now=NOW)) == "status"
+    assert message_schema.message_type({"type": "icon_pin"}) == "icon_pin"
+    assert message_schema.message_type({}) == "unknown"
+    assert message_schema.message_type(b"\x01") == "raw"
+
+
+def test_to_binary_round_trips_through_the_wire_codec():
+    message = message_schema.location(37.7749, -122.4194, 90.0, now=NOW)
+    decoded = wire_codec.decode(message_schema.to_binary(message))
+    assert decoded["type"] == "location"
+    assert decoded["data"]["lat"] == pytest.approx(37.7749)
+    assert decoded["data"]["lng"] == pytest.approx(-122.4194)
+    assert decoded["data"]["direction"] == pytest.approx(90.0)
+    assert message_schema.to_json(message) == message.encode()
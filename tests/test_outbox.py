@@ -0,0 +1,69 @@
+import json
+
+import message_schema
+import wire_codec
+from outbox import Outbox
+from send_queue import OutboundQueue
+
+
+def test_backlog_survives_a_restart(tmp_path):
+    path = str(tmp_path / "outbox.jsonl")
+    queue = OutboundQueue()
+    queue.put(message_schema.location(1.0, 2.0, 3.0, now=1700000000.0))
+    queue.put({"type": "icon_pin", "data": {"lat": 1.0, "lng": 2.0, "type": "flag"}})
+    assert Outbox(queue, path).save() == 2
+
+    restored = OutboundQueue()
+    assert Outbox(restored, path).load() == 2
+    messages = restored.snapshot()
+    assert messages[0] == json.loads(queue.snapshot()[0].encode())
+    assert messages[1]["type"] == "icon_pin"
+
+
+def test_connection_messages_are_not_saved(tmp_path):
+    path = tmp_path / "outbox.jsonl"
+    queue = OutboundQueue()
+    queue.put(wire_codec.hello_message())
+    queue.put(message_schema.ping(seq=1))
+    queue.put({"type": "status", "data": {}})
+    assert Outbox(queue, str(path)).save() == 1
+    assert [json.loads(line)["type"] for line in path.read_text().splitlines()] == ["status"]
+
+
+def test_empty_backlog_removes_the_file(tmp_path):
+    path = tmp_path / "outbox.jsonl"
+    queue = OutboundQueue()
+    outbox = Outbox(queue, str(path))
+    queue.put({"type": "status", "data": {}})
+    outbox.save()
+    assert path.exists()
+    queue.get_nowait()
+    assert outbox.save() == 0
+    assert not path.exists()
+
+
+def test_unchanged_backlog_is_not_rewritten(tmp_path):
+    path = tmp_path / "outbox.jsonl"
+    queue = OutboundQueue()
+    outbox = Outbox(queue, str(path))
+    queue.put({"type": "status", "data": {}})
+    outbox.save()
+    path.write_text("")
+    assert outbox.save() == 1
+    assert path.read_text() == ""
+
+
+def test_unreadable_lines_are_skipped(tmp_path):
+    path = tmp_path / "outbox.jsonl"
+    path.write_text('{"type": "status", "data": {}}\n{"type": "sta\n[1, 2]\n{"type": "icon_pin"}\n')
+    queue = OutboundQueue()
+    assert Outbox(queue, str(path)).load() == 2
+    assert [m["type"] for m in queue.snapshot()] == ["status", "icon_pin"]
+
+
+def test_without_a_path_nothing_is_written(tmp_path):
+    queue = OutboundQueue()
+    queue.put({"type": "status", "data": {}})
+    outbox = Outbox(queue)
+    assert outbox.save() == 0
+    assert outbox.load() == 0
@@ -0,0 +1,100 @@
+import math
+import random
+
+import pytest
+
+import robot_protocol as protocol
+import route_simplify
+
+
+def random_walk(seed, count, lat=37.7749, lng=-122.4194, step=0.0002, heading=0.0, turn=0.6):
+    rng = random.Random(seed)
+    lats = []
+    lngs = []
+    for _ in range(count):
+        heading += rng.uniform(-turn, turn)
+        lat += step * math.cos(heading)
+        lng += step * math.sin(heading)
+        lats.append(lat)
+        lngs.append((lng + 180.0) % 360.0 - 180.0)
+    return lats, lngs
+
+
+def python_only(monkeypatch):
+    monkeypatch.setattr(route_simplify, "USE_NUMPY", False)
+
+
+def offset_m(lats, lngs, i, a, b):
+    """Distance of point i from segment a-b in the module's local projection"""
+    lat0 = math.radians(sum(lats) / len(lats))
+    scale = protocol.EARTH_RADIUS_M * math.cos(lat0)
+
+    def xy(j):
+        return scale * math.radians(lngs[j]), protocol.EARTH_RADIUS_M * math.radians(lats[j])
+
+    (ax, ay), (bx, by), (px, py) = xy(a), xy(b), xy(i)
+    dx, dy = bx - ax, by - ay
+    length2 = dx * dx + dy * dy
+    t = 0.0 if not length2 else max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length2))
+    return math.hypot(px - ax - t * dx, py - ay - t * dy)
+
+
+@pytest.mark.parametrize("tolerance", [0.0, 1.0, 10.0, 50.0])
+def test_dropped_points_stay_within_tolerance(monkeypatch, tolerance):
+    python_only(monkeypatch)
+    lats, lngs = random_walk(1, 600)
+    kept = route_simplify.simplify(lats, lngs, tolerance)
+    assert kept[0] == 0 and kept[-1] == len(lats) - 1
+    assert kept == sorted(set(kept))
+    for a, b in zip(kept, kept[1:]):
+        for i in range(a + 1, b):
+            assert offset_m(lats, lngs, i, a, b) <= tolerance + 1e-6
+    if tolerance >= 10.0:
+        assert len(kept) < len(lats) // 2
+
+
+@pytest.mark.parametrize("window", [0, 100, route_simplify.DEFAULT_WINDOW])
+@pytest.mark.parametrize("seed", range(3))
+def test_numpy_and_python_keep_the_same_points(monkeypatch, seed, window):
+    pytest.importorskip("numpy")
+    lats, lngs = random_walk(seed, 2000)
+    with_numpy = route_simplify.simplify(lats, lngs, 5.0, window)
+    python_only(monkeypatch)
+    assert route_simplify.simplify(lats, lngs, 5.0, window) == with_numpy
+
+
+def test_numpy_and_python_agree_across_the_antimeridian(monkeypatch):
+    pytest.importorskip("numpy")
+    lats, lngs = random_walk(4, 1000, lat=10.0, lng=179.8, step=0.001, heading=math.pi / 2, turn=0.2)
+    assert any(lng < 0 for lng in lngs) and any(lng > 0 for lng in lngs)
+    with_numpy = route_simplify.simplify(lats, lngs, 20.0)
+    python_only(monkeypatch)
+    assert route_simplify.simplify(lats, lngs, 20.0) == with_numpy
+
+
+def test_segment_geometry_matches_the_protocol_formulas():
+    pytest.importorskip("numpy")
+    lats, lngs = random_walk(5, route_simplify.NUMPY_MIN_POINTS * 2)
+    lengths, bearings = route_simplify.segment_geometry(lats, lngs)
+    for i in range(0, len(lengths), 37):
+        assert lengths[i] == pytest.approx(protocol.distance_m(lats[i], lngs[i], lats[i + 1], lngs[i + 1]), rel=1e-9)
+        assert bearings[i] == pytest.approx(protocol.calculate_direction(lats[i], lngs[i], lats[i + 1], lngs[i + 1]),
+                                            abs=1e-6)
+
+
+def test_short_routes_and_argument_checks():
+    assert route_simplify.simplify([1.0, 2.0], [3.0, 4.0], 100.0) == [0, 1]
+    assert route_simplify.simplify([], [], 1.0) == []
+    with pytest.raises(ValueError):
+        route_simplify.simplify([1.0, 2.0, 3.0], [1.0, 2.0, 3.0], -1.0)
+    with pytest.raises(ValueError):
+        route_simplify.simplify([1.0, 2.0, 3.0], [1.0, 2.0], 1.0)
+    with pytest.raises(ValueError):
+        route_simplify.simplify([1.0, 2.0, 3.0], [1.0, 2.0, 3.0], 1.0, window=-1)
+
+
+def test_simplify_route_accepts_objects_and_pairs():
+    straight = [{"lat": 0.0, "lng": i * 0.001} for i in range(10)]
+    assert route_simplify.simplify_route(straight, 1.0) == [straight[0], straight[-1]]
+    pairs = [(0.0, i * 0.001) for i in range(10)]
+    assert route_simplify.simplify_route(pairs, 1.0) == [{"lat": 0.0, "lng": pairs[0][1]}, {"lat": 0.0, "lng": pairs[-1][1]}]
@@ -0,0 +1,29 @@
+import asyncio
+
+from route_upload import RouteUpload
+
+
+def test_unthrottled_async_upload_waits_for_the_queue_without_blocking_the_loop(tmp_path):
+    path = tmp_path / "route.csv"
+    path.write_text("lat,lng\n" + "".join(f"{37 + n / 1000},{-122 - n / 1000}\n" for n in range(5)))
+    upload = RouteUpload(str(path), chunk_size=2, rate=0)
+    upload.prepare()
+    queue = []
+    drained = []
+
+    async def writer():
+        # Sends one queued chunk per turn, so the upload has to give the loop back to make progress
+        while len(drained) < upload.total_chunks:
+            if queue:
+                drained.append(queue.pop(0))
+            await asyncio.sleep(0)
+
+    async def main():
+        task = asyncio.ensure_future(writer())
+        done = await asyncio.wait_for(upload.run_async(queue.append, ready=lambda: not queue), 5)
+        await asyncio.wait_for(task, 5)
+        return done
+
+    assert asyncio.run(main())
+    assert [message["chunkIndex"] for message in drained] == [0, 1, 2]
+    assert upload.stops_sent == 5
@@ -0,0 +1,209 @@
+import asyncio
+
+import message_schema
+from send_queue import AsyncSendWriter, DROP_OLDEST, LATEST, NEVER_DROP, OutboundQueue
+
+
+def drain(queue):
+    messages = []
+    while True:
+        message = queue.get_nowait()
+        if message is None:
+            return messages
+        messages.append(message)
+
+
+def test_latest_replaces_queued_message_in_place():
+    queue = OutboundQueue()
+    queue.put({"type": "status", "n": 1})
+    queue.put({"type": "location", "n": 1})
+    queue.put({"type": "status", "n": 2})
+    queue.put({"type": "location", "n": 2})
+    assert [(m["type"], m["n"]) for m in drain(queue)] == [("status", 1), ("location", 2), ("status", 2)]
+    assert queue.coalesced == {"location": 1}
+
+
+def test_latest_after_send_queues_again():
+    queue = OutboundQueue()
+    queue.put({"type": "location", "n": 1})
+    assert queue.get_nowait()["n"] == 1
+    queue.put({"type": "location", "n": 2})
+    assert queue.get_nowait()["n"] == 2
+
+
+def test_drop_oldest_evicts_droppable_messages_when_full():
+    queue = OutboundQueue(max_depth=2)
+    queue.put({"type": "icon_pin", "n": 0})
+    queue.put({"type": "status", "n": 1})
+    queue.put({"type": "status", "n": 2})
+    assert [m["n"] for m in drain(queue)] == [0, 2]
+    assert queue.dropped == {"status": 1}
+
+
+def test_never_drop_goes_above_max_depth():
+    queue = OutboundQueue(max_depth=1)
+    for n in range(3):
+        queue.put({"type": "route_waypoints", "n": n})
+    assert queue.depth == 3
+    assert queue.peak_depth == 3
+
+
+def test_full_of_never_drop_drops_the_new_droppable_message():
+    queue = OutboundQueue(max_depth=1)
+    queue.put({"type": "icon_pin"})
+    assert queue.put({"type": "status"}) is True
+    assert [m["type"] for m in drain(queue)] == ["icon_pin"]
+    assert queue.dropped == {"status": 1}
+
+
+def test_policies_for_message_objects_and_unknown_types():
+    queue = OutboundQueue()
+    assert queue.policy_for(message_schema.location(1.0, 2.0, 3.0).msg_type) == LATEST
+    assert queue.policy_for("route_waypoints") == NEVER_DROP
+    assert queue.policy_for("anything_else") == DROP_OLDEST
+
+
+def test_hold_keeps_messages_until_reopen():
+    queue = OutboundQueue()
+    queue.put({"type": "status"})
+    queue.hold()
+    assert queue.stopped
+    assert queue.get_nowait() is None
+    queue.put({"type": "icon_pin"})
+    queue.reopen()
+    assert not queue.stopped
+    assert [m["type"] for m in drain(queue)] == ["status", "icon_pin"]
+
+
+def test_requeue_puts_message_first():
+    queue = OutboundQueue()
+    queue.put({"type": "status", "n": 1})
+    queue.put({"type": "status", "n": 2})
+    first = queue.get_nowait()
+    queue.requeue(first)
+    assert [m["n"] for m in drain(queue)] == [1, 2]
+    assert queue.sent == 2
+
+    # A LATEST type: dropped if a newer one is queued, otherwise replaced in place by the next put
+    queue.put({"type": "location", "n": 3})
+    stale = queue.get_nowait()
+    queue.put({"type": "location", "n": 4})
+    queue.requeue(stale)
+    assert [m["n"] for m in drain(queue)] == [4]
+    queue.put({"type": "status", "n": 5})
+    queue.requeue(stale)
+    queue.put({"type": "location", "n": 6})
+    assert [m["n"] for m in drain(queue)] == [6, 5]
+    assert queue.coalesced == {"location": 2}
+
+
+def test_closed_queue_refuses_and_stops_once_empty():
+    queue = OutboundQueue()
+    queue.put({"type": "status"})
+    queue.close()
+    assert queue.put({"type": "status"}) is False
+    assert not queue.stopped
+    queue.get_nowait()
+    assert queue.stopped
+
+
+def test_clear_counts_discarded_as_dropped():
+    queue = OutboundQueue()
+    queue.put({"type": "status"})
+    queue.put({"type": "location"})
+    assert queue.clear() == 2
+    assert queue.depth == 0
+    assert queue.stats()["dropped_total"] == 2
+
+
+def test_waker_called_on_put_and_cleared_only_by_its_owner():
+    queue = OutboundQueue()
+    calls = []
+    mine = lambda: calls.append("mine")
+    other = lambda: calls.append("other")
+    queue.set_waker(mine)
+    queue.put({"type": "status"})
+    queue.set_waker(other)
+    queue.clear_waker(mine)
+    queue.hold()
+    queue.clear_waker(other)
+    queue.reopen()
+    queue.put({"type": "status"})
+    assert calls == ["mine", "other"]
+
+
+def test_async_writer_sends_in_order_and_exits_when_closed():
+    queue = OutboundQueue()
+    sent = []
+
+    async def send(message):
+        sent.append(message["n"])
+
+    async def main():
+        writer = AsyncSendWriter(queue, send)
+        task = asyncio.ensure_future(writer.run())
+        for n in range(5):
+            queue.put({"type": "status", "n": n})
+            await asyncio.sleep(0)
+        queue.close()
+        await asyncio.wait_for(task, 1.0)
+
+    asyncio.run(main())
+    assert sent == [0, 1, 2, 3, 4]
+
+
+def test_async_writer_reports_errors_and_keeps_going():
+    queue = OutboundQueue()
+    errors = []
+
+    async def send(message):
+        if message["n"] == 1:
+            raise ConnectionError("gone")
+
+    async def main():
+        for n in range(3):
+            queue.put({"type": "status", "n": n})
+        queue.close()
+        await AsyncSendWriter(queue, send, on_error=lambda e, m: errors.append((str(e), m["n"]))).run()
+
+    asyncio.run(main())
+    assert errors == [("gone", 1)]
+    assert queue.depth == 0
+
+
+def test_async_writer_stop_leaves_the_rest_queued():
+    queue = OutboundQueue()
+    sent = []
+
+    async def main():
+        writer = AsyncSendWriter(queue, None)
+
+        async def send(message):
+            sent.append(message["n"])
+            writer.stop()
+
+        writer.send = send
+        for n in range(3):
+            queue.put({"type": "status", "n": n})
+        await asyncio.wait_for(writer.run(), 1.0)
+
+    asyncio.run(main())
+    assert sent == [0]
+    assert queue.depth == 2
+
+
+def test_async_writer_paces_the_backlog():
+    queue = OutboundQueue()
+    times = []
+
+    async def send(message):
+        times.append(asyncio.get_running_loop().time())
+
+    async def main():
+        for n in range(4):
+            queue.put({"type": "status", "n": n})
+        queue.close()
+        await AsyncSendWriter(queue, send, backlog=4, backlog_rate=50).run()
+
+    asyncio.run(main())
+    assert times[-1] - times[0] >= 3 / 50 * 0.9
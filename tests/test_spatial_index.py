@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+import robot_protocol as protocol
+from spatial_index import SpatialGrid
+
+
+def fleet(seed, count, lat_range=(-60.0, 60.0), lng_range=(-180.0, 180.0)):
+    rng = random.Random(seed)
+    return {f"r{i}": (rng.uniform(*lat_range), rng.uniform(*lng_range)) for i in range(count)}
+
+
+def grid_of(robots, cell_deg=0.01):
+    grid = SpatialGrid(cell_deg)
+    for robot_id, (lat, lng) in robots.items():
+        grid.update(robot_id, lat, lng)
+    return grid
+
+
+def brute_within(robots, lat, lng, radius_m):
+    return sorted((protocol.distance_m(lat, lng, rlat, rlng), robot_id, rlat, rlng)
+                  for robot_id, (rlat, rlng) in robots.items()
+                  if protocol.distance_m(lat, lng, rlat, rlng) <= radius_m)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_within_matches_brute_force(seed):
+    robots = fleet(seed, 500, (37.0, 38.0), (-123.0, -122.0))
+    grid = grid_of(robots)
+    rng = random.Random(seed + 100)
+    for _ in range(20):
+        lat, lng = rng.uniform(37.0, 38.0), rng.uniform(-123.0, -122.0)
+        radius = rng.choice([50.0, 2000.0, 20000.0, 200000.0])
+        assert grid.within(lat, lng, radius) == brute_within(robots, lat, lng, radius)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_nearest_matches_brute_force(seed):
+    robots = fleet(seed, 300)
+    grid = grid_of(robots, cell_deg=0.5)
+    rng = random.Random(seed + 200)
+    for _ in range(20):
+        lat, lng = rng.uniform(-80.0, 80.0), rng.uniform(-180.0, 180.0)
+        k = rng.choice([1, 5, 20])
+        expected = brute_within(robots, lat, lng, float("inf"))[:k]
+        assert [row[1] for row in grid.nearest(lat, lng, k)] == [row[1] for row in expected]
+
+
+def test_nearest_respects_max_distance_and_empty_grid():
+    assert SpatialGrid().nearest(0.0, 0.0, 3) == []
+    grid = grid_of({"near": (0.0, 0.001), "far": (0.0, 1.0)})
+    assert [row[1] for row in grid.nearest(0.0, 0.0, 5, max_distance_m=1000.0)] == ["near"]
+
+
+def test_queries_across_the_antimeridian():
+    grid = grid_of({"east": (0.0, 179.999), "west": (0.0, -179.999), "middle": (0.0, 0.0)})
+    assert sorted(row[1] for row in grid.within(0.0, 180.0, 1000.0)) == ["east", "west"]
+    assert sorted(grid.in_box(-1.0, 179.0, 1.0, -179.0)) == ["east", "west"]
+    assert grid.nearest(0.0, -179.9999, 1)[0][1] == "west"
+
+
+def test_in_box_matches_brute_force():
+    robots = fleet(7, 400, (10.0, 12.0), (20.0, 22.0))
+    grid = grid_of(robots)
+    south, west, north, east = 10.5, 20.2, 11.3, 21.7
+    expected = sorted(robot_id for robot_id, (lat, lng) in robots.items()
+                      if south <= lat <= north and west <= lng <= east)
+    assert sorted(grid.in_box(south, west, north, east)) == expected
+
+
+def test_update_moves_and_remove_forgets():
+    grid = SpatialGrid()
+    grid.update("r1", 0.0, 0.0)
+    grid.update("r1", 10.0, 10.0)
+    assert len(grid) == 1
+    assert grid.within(0.0, 0.0, 1000.0) == []
+    assert grid.nearest(10.0, 10.0)[0][1] == "r1"
+    grid.remove("r1")
+    assert "r1" not in grid
+    assert grid.nearest(10.0, 10.0) == []
+
+
+def test_cell_size_is_validated():
+    with pytest.raises(ValueError):
+        SpatialGrid(0)
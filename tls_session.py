@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""Client SSL context that resumes TLS sessions and times its handshakes
+
+Building an SSL context loads the system CA store, so the client builds one per
+settings change (client_context) rather than per connection. The context also
+keeps the last TLS session of each server and offers it on the next connection
+to that server, so a reconnect after a drop does an abbreviated handshake
+instead of a full one (no certificate exchange, one round trip less before TLS
+1.3). A server that refuses the session just gets a full handshake.
+
+Sockets wrapped by the context (and the SSLObjects asyncio uses) record when
+their handshake started and ended, which handshake_timings splits into TCP
+connect, TLS and WebSocket upgrade:
+
+    context = client_context(verify=False)
+    started = time.perf_counter()
+    ws = websocket.create_connection(url, sslopt={"context": context})
+    print(handshake_timings(ws.sock, started, time.perf_counter()))
+    # asyncio / websockets: handshake_timings(ws.transport.get_extra_info("ssl_object"), ...)
+"""
+import ssl
+import threading
+import time
+
+
+class TimedSSLSocket(ssl.SSLSocket):
+    """SSLSocket that records its handshake and hands its session back to the context on close"""
+
+    tls_started = None
+    tls_finished = None
+
+    def do_handshake(self, block=False):
+        self.tls_started = time.perf_counter()
+        super().do_handshake(block)
+        self.tls_finished = time.perf_counter()
+        self.context.save_session(self.server_hostname, self.session)
+
+    # TLS 1.3 tickets arrive after the handshake, so the session is saved again on
+    # the way out (shutdown() and close() both drop the TLS state). Not every close
+    # path gets here, so callers also use save_session_from once the upgrade is done.
+    def shutdown(self, how):
+        self.context.save_session(self.server_hostname, self.session)
+        super().shutdown(how)
+
+    def _real_close(self):
+        self.context.save_session(self.server_hostname, self.session)
+        super()._real_close()
+
+
+class TimedSSLObject(ssl.SSLObject):
+    """SSLObject (asyncio's TLS) that records its handshake; asyncio calls do_handshake until it completes"""
+
+    tls_started = None
+    tls_finished = None
+
+    def do_handshake(self):
+        if self.tls_started is None:
+            self.tls_started = time.perf_counter()
+        super().do_handshake()
+        self.tls_finished = time.perf_counter()
+        self.context.resumed += self.session_reused
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    """Client SSLContext that offers each server the last session it issued"""
+
+    sslsocket_class = TimedSSLSocket
+    sslobject_class = TimedSSLObject
+
+    def __init__(self, protocol=ssl.PROTOCOL_TLS_CLIENT):
+        self._sessions = {}  # server_hostname -> ssl.SSLSession
+        self._sessions_lock = threading.Lock()
+        self.offered = 0  # Handshakes that offered a saved session
+        self.resumed = 0  # ...and that the server accepted
+
+    def session_for(self, server_hostname):
+        """The saved session for a server, unless it has expired"""
+        with self._sessions_lock:
+            session = self._sessions.get(server_hostname)
+            if session is not None and session.time + session.timeout < time.time():
+                del self._sessions[server_hostname]
+                session = None
+            return session
+
+    def save_session(self, server_hostname, session):
+        if server_hostname is None or session is None or not (session.has_ticket or session.id):
+            return  # Nothing to resume with (e.g. TLS 1.3 before its ticket arrived)
+        with self._sessions_lock:
+            self._sessions[server_hostname] = session
+
+    def save_session_from(self, ssl_object):
+        """Keep the session of an SSLSocket or SSLObject (e.g. an asyncio transport's "ssl_object")
+
+        Best called once the WebSocket upgrade is done: the server's TLS 1.3
+        ticket has been read by then. Other sockets are ignored.
+        """
+        if getattr(ssl_object, "context", None) is self:
+            self.save_session(ssl_object.server_hostname, ssl_object.session)
+
+    def clear_sessions(self):
+        with self._sessions_lock:
+            self._sessions.clear()
+
+    def wrap_socket(self, sock, server_side=False, do_handshake_on_connect=True, suppress_ragged_eofs=True,
+                    server_hostname=None, session=None):
+        if session is None and not server_side:
+            session = self.session_for(server_hostname)
+        self.offered += session is not None
+        ssl_sock = super().wrap_socket(sock, server_side, do_handshake_on_connect, suppress_ragged_eofs,
+                                       server_hostname, session)
+        self.resumed += bool(ssl_sock.tls_finished is not None and ssl_sock.session_reused)
+        return ssl_sock
+
+    def wrap_bio(self, incoming, outgoing, server_side=False, server_hostname=None, session=None):
+        # Used by asyncio; its sessions are saved with save_session_from once the upgrade is done
+        if session is None and not server_side:
+            session = self.session_for(server_hostname)
+        self.offered += session is not None
+        return super().wrap_bio(incoming, outgoing, server_side, server_hostname, session)
+
+
+def client_context(verify=True, cafile=None):
+    """A ResumingSSLContext set up like ssl.create_default_context, or not verifying at all"""
+    context = ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    if cafile:
+        context.load_verify_locations(cafile=cafile)
+    else:
+        context.load_default_certs(ssl.Purpose.SERVER_AUTH)
+    if not verify:
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def handshake_timings(sock, started, opened):
+    """Milliseconds spent on TCP connect, TLS and the WebSocket upgrade of one connection
+
+    sock is the websocket-client socket (WebSocket.sock) or an asyncio
+    transport's "ssl_object"; started is when the connection attempt began and
+    opened when the upgrade completed, both on the perf_counter clock. Without TLS, tcp_ms holds TCP connect and upgrade together
+    and tls_ms and upgrade_ms are None.
+    """
+    timings = {"total_ms": (opened - started) * 1000, "tcp_ms": None, "tls_ms": None, "upgrade_ms": None,
+               "resumed": False}
+    if isinstance(sock, (TimedSSLSocket, TimedSSLObject)) and sock.tls_finished is not None:
+        timings["tcp_ms"] = (sock.tls_started - started) * 1000
+        timings["tls_ms"] = (sock.tls_finished - sock.tls_started) * 1000
+        timings["upgrade_ms"] = (opened - sock.tls_finished) * 1000
+        timings["resumed"] = sock.session_reused
+    else:
+        timings["tcp_ms"] = timings["total_ms"]
+    return timings
+
+
+def describe_timings(timings):
+    if timings["tls_ms"] is None:
+        return f"{timings['total_ms']:.1f}ms (TCP + upgrade, no TLS)"
+    return (f"{timings['total_ms']:.1f}ms: TCP {timings['tcp_ms']:.1f}ms, "
+            f"TLS {timings['tls_ms']:.1f}ms ({'resumed' if timings['resumed'] else 'full'}), "
+            f"upgrade {timings['upgrade_ms']:.1f}ms")
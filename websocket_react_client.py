@@ -1,24 +1,51 @@
 #!/usr/bin/env python3
 import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
-import websocket
-import ssl
+from tkinter import ttk, messagebox, filedialog
+import asyncio
+import websockets
 import threading
 import json
+import os
 import time
 import math
 from datetime import datetime
 
+import robot_protocol as protocol
+import scheduler
+import wire_codec
+import message_schema
+from batching import LocationBatcher
+from send_queue import OutboundQueue, AsyncSendWriter
+from latency import PingTracker
+from route_playback import RouteGeometry, RoutePlayback
+import capture
+from message_log import MessageLog, LogEntry, LogView, LOG_COLORS
+from render_loop import RenderLoop, DEFAULT_FPS, FPS_CHOICES
+from dispatch import MessageDispatcher, OTHER, peek
+from robot_state import RobotStateStore
+from spatial_index import SpatialGrid
+from endpoints import DEFAULT_ENDPOINTS, EndpointManager
+from outbox import Outbox, DEFAULT_OUTBOX_PATH, DEFAULT_FLUSH_RATE
+import route_upload
+import tls_session
+import metrics
+import profiling
+from event_loop import LoopThread, TkBridge
+
 class WebSocketReactClient:
     def __init__(self, root):
         self.root = root
         self.root.title("WebSocket React Client - sibl.online")
         self.root.geometry("900x900")
         
+        # Network and timing work runs on one asyncio loop thread; it reaches Tk only through the bridge
+        self.loop = LoopThread().start()
+        self.ui = TkBridge(self.root).start()
+        
         # WebSocket connection
         self.ws = None
         self.connected = False
-        self.connection_thread = None
+        self.connection_task = None  # Future of run_connection on the loop
         self.server_url = "wss://sibl.online/ws"
         self.connection_verified = False
         self.last_message = None
@@ -33,18 +60,111 @@ class WebSocketReactClient:
         # SSL settings
         self.skip_ssl_verification = tk.BooleanVar(value=True)  # Default to True for development
         
+        # Wire codec (binary location frames are only used once the server acknowledges them)
+        self.prefer_binary = tk.BooleanVar(value=False)
+        self.binary_requested = False
+        self.wire_codec = wire_codec.CODEC_JSON
+        
+        # Outbound queue: every send goes through one AsyncSendWriter task on the event loop
+        self.outbound_queue = OutboundQueue()
+        self.send_writer = None
+        
+        # Offline outbox: messages queued while waiting to reconnect, optionally kept on disk
+        self.outbox = Outbox(self.outbound_queue)
+        self.outbox_flush_rate = DEFAULT_FLUSH_RATE
+        self.reconnect_pending = False
+        
+        # Round-trip latency sampling (sequenced ping/pong)
+        self.ping_tracker = PingTracker()
+        self.ping_interval = 2.0
+        self.auto_ping_enabled = True
+        self.ping_task = None
+        
+        # Route playback
+        self.route_waypoints = protocol.DEFAULT_ROUTE_WAYPOINTS
+        self.route_geometry = None  # Computed once per route
+        self.route_geometry_source = None
+        self.route_playback = None
+        self.playback_active = False
+        self.playback_scheduler = None
+        self.playback_task = None
+        
+        # Chunked upload of route files
+        self.route_upload = None
+        self.route_upload_stop = threading.Event()
+        self.route_upload_queued = 8  # Most messages waiting in the outbound queue before the next chunk
+        
+        # Latest state of every robot seen on the broadcast channel
+        self.robot_states = RobotStateStore(index=SpatialGrid())
+        self.nearby_count = 5
+        
+        # Traffic capture and replay
+        self.capture_writer = None
+        self.replay_active = False
+        self.replay_stop = threading.Event()
+        
         # Reconnection settings (matching React hook)
         self.reconnect_attempts = 0
-        self.max_reconnect_attempts = 5
+        self.max_reconnect_attempts = protocol.MAX_RECONNECT_ATTEMPTS
         self.reconnect_timeout = None
+        self.disconnect_requested = False
+        
+        # SSL context, kept across reconnects so its cached TLS sessions are resumed
+        self.ssl_context = None
+        self.ssl_context_verify = None  # Verification setting the context was built for
+        self.connect_started = None
+        self.last_handshake = None  # handshake_timings of the current connection
+        
+        # Client-side metrics, exported when a metrics port or file is set up (start_metrics)
+        self.metrics = metrics.MetricsRegistry()
+        self.metrics_server = None
+        self.metrics_writer = None
+        self.disconnected_at = None  # When the connection dropped, for the reconnect duration
+        self.ui_heartbeat_due = None  # When update_queue_label should run next, for the UI event lag
+        
+        # Hot-path profiling (opt-in, from the UI or ROBOT_CLIENT_PROFILE); nothing is wrapped while off
+        self.profiler = profiling.HotPathProfiler()
+        
+        # Endpoint selection and failover (opt-in)
+        self.endpoint_manager = EndpointManager(DEFAULT_ENDPOINTS)
+        self.endpoint_probe_active = False
+        self.failover_enabled = False
+        self.failover_attempts = 0
         
         # Auto-increment settings
         self.auto_increment_active = False
-        self.auto_increment_thread = None
+        self.auto_increment_task = None
         self.increment_step = 0.0001  # Small step for smooth movement
         self.send_interval = 0.1  # Send every 100ms
+        self.auto_increment_scheduler = None
+        
+        # Micro-batching of auto-increment locations (opt-in)
+        self.location_batcher = None
+        self.batch_timer = None
+        
+        # UI refresh: state changes mark widgets dirty, the render loop redraws them at a capped FPS
+        self.render_loop = RenderLoop(self.root, DEFAULT_FPS)
+        self.display_position = None  # (lat, lng or None) last produced by auto-increment or playback
+        self.rendered_lat_text = None
+        self.auto_increment_lat = None  # Position the loop moves on from; set from the fields on the Tk thread
+        self.auto_increment_lng = None
+        self.label_texts = {}
         
+        self.setup_dispatcher()
         self.setup_ui()
+        self.setup_metrics()
+        self.setup_profiling()
+        
+        self.render_loop.register("direction", self.draw_direction)
+        self.render_loop.register("position", self.draw_position)
+        self.render_loop.register("playback", self.draw_playback_status)
+        self.render_loop.register("rate", self.update_rate_label)
+        self.render_loop.register("message_count", self.draw_message_count)
+        self.render_loop.start()
+        
+        if os.path.exists(DEFAULT_OUTBOX_PATH):
+            self.persist_outbox_var.set(True)
+            self.toggle_outbox_persistence()
         
     def setup_ui(self):
         # Main frame
@@ -69,6 +189,9 @@ class WebSocketReactClient:
         # Auto-increment frame
         self.setup_auto_increment_frame(main_frame)
         
+        # Route playback frame
+        self.setup_route_playback_frame(main_frame)
+        
         # Messages log frame
         self.setup_messages_log_frame(main_frame)
         
@@ -97,6 +220,29 @@ class WebSocketReactClient:
         )
         self.ssl_checkbox.pack(side=tk.LEFT)
         
+        self.binary_checkbox = ttk.Checkbutton(
+            ssl_frame,
+            text="Binary location frames (if server supports)",
+            variable=self.prefer_binary
+        )
+        self.binary_checkbox.pack(side=tk.LEFT, padx=(20, 0))
+        
+        self.auto_ping_var = tk.BooleanVar(value=True)
+        self.auto_ping_checkbox = ttk.Checkbutton(
+            ssl_frame,
+            text="Sample RTT",
+            variable=self.auto_ping_var
+        )
+        self.auto_ping_checkbox.pack(side=tk.LEFT, padx=(20, 0))
+        
+        self.persist_outbox_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            ssl_frame,
+            text="Keep offline messages on disk",
+            variable=self.persist_outbox_var,
+            command=self.toggle_outbox_persistence
+        ).pack(side=tk.LEFT, padx=(20, 0))
+        
         # Connection status
         status_frame = ttk.Frame(conn_frame)
         status_frame.grid(row=2, column=0, columnspan=2, pady=(10, 0))
@@ -124,6 +270,50 @@ class WebSocketReactClient:
         ttk.Button(quick_url_frame, text="Localhost (WS)", command=lambda: self.set_url("ws://localhost:8000")).pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(quick_url_frame, text="Localhost 3000", command=lambda: self.set_url("ws://localhost:3000")).pack(side=tk.LEFT, padx=(0, 5))
         
+        # Endpoints to pick the fastest of, and to fail over between
+        endpoints_frame = ttk.Frame(conn_frame)
+        endpoints_frame.grid(row=4, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
+        endpoints_frame.columnconfigure(1, weight=1)
+        
+        ttk.Label(endpoints_frame, text="Endpoints:").grid(row=0, column=0, sticky=tk.W, padx=(0, 10))
+        self.endpoints_var = tk.StringVar(value=", ".join(DEFAULT_ENDPOINTS))
+        ttk.Entry(endpoints_frame, textvariable=self.endpoints_var, width=50).grid(row=0, column=1, sticky=(tk.W, tk.E))
+        
+        self.auto_endpoint_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            endpoints_frame,
+            text="Connect to fastest, fail over",
+            variable=self.auto_endpoint_var
+        ).grid(row=0, column=2, padx=(10, 0))
+        
+        self.probe_btn = ttk.Button(endpoints_frame, text="Probe", command=self.probe_endpoints)
+        self.probe_btn.grid(row=0, column=3, padx=(10, 0))
+        
+        # Round-trip latency
+        self.latency_label = ttk.Label(conn_frame, text="RTT: no samples")
+        self.latency_label.grid(row=5, column=0, columnspan=2, pady=(10, 0))
+        
+    def toggle_outbox_persistence(self):
+        """Save messages queued while disconnected to a file, restoring any left by an earlier run"""
+        if self.persist_outbox_var.get():
+            self.outbox.path = DEFAULT_OUTBOX_PATH
+            try:
+                restored = self.outbox.load()
+            except OSError as e:
+                self.log_message("ERROR", f"❌ Could not read outbox {DEFAULT_OUTBOX_PATH}: {e}")
+                return
+            if restored:
+                self.log_message("INFO", f"📦 Restored {restored} unsent messages from {DEFAULT_OUTBOX_PATH}")
+            self.log_message("INFO", f"📦 Offline messages are kept in {DEFAULT_OUTBOX_PATH}")
+        else:
+            self.outbox.discard()
+            self.outbox.path = None
+            self.log_message("INFO", "📦 Offline messages are only kept in memory")
+            
+    def outbound_ready(self):
+        """True when outbound messages can be queued: connected, or waiting to reconnect"""
+        return bool(self.ws and self.connected) or self.reconnect_pending
+        
     def update_server_url(self, *args):
         """Update the server URL when URL field changes"""
         self.server_url = self.url_var.get().strip()
@@ -148,7 +338,9 @@ class WebSocketReactClient:
         self.lng_var = tk.StringVar(value="-122.4194")
         self.lng_entry = ttk.Entry(send_frame, textvariable=self.lng_var, width=15)
         self.lng_entry.grid(row=1, column=1, sticky=tk.W, pady=(0, 5))
-        
+        self.lat_var.trace_add("write", self.on_location_field_edited)
+        self.lng_var.trace_add("write", self.on_location_field_edited)
+
         # Icon Type input
         ttk.Label(send_frame, text="Icon Type:").grid(row=2, column=0, sticky=tk.W, padx=(0, 10), pady=(0, 5))
         self.icon_type_var = tk.StringVar(value="A")
@@ -226,9 +418,15 @@ class WebSocketReactClient:
         ttk.Button(controls_frame, text="Set Direction", command=self.set_manual_direction).pack(side=tk.LEFT, padx=(0, 10))
         ttk.Button(controls_frame, text="Reset", command=self.reset_direction).pack(side=tk.LEFT, padx=(0, 10))
         
-        # Initialize direction indicator
-        self.update_direction_indicator()
-        self.update_direction_label()
+        # UI refresh rate
+        ttk.Label(controls_frame, text="UI FPS:").pack(side=tk.LEFT, padx=(10, 5))
+        self.render_fps_var = tk.StringVar(value=str(DEFAULT_FPS))
+        fps_combo = ttk.Combobox(controls_frame, textvariable=self.render_fps_var, values=FPS_CHOICES, width=4, state="readonly")
+        fps_combo.pack(side=tk.LEFT)
+        fps_combo.bind("<<ComboboxSelected>>", self.set_render_fps)
+        
+        # Create the indicator's canvas items; the render loop only moves them afterwards
+        self.create_direction_items()
         
     def setup_auto_increment_frame(self, parent):
         auto_frame = ttk.LabelFrame(parent, text="Auto-Increment Latitude (Hold to Move North)", padding="10")
@@ -251,6 +449,27 @@ class WebSocketReactClient:
         interval_entry = ttk.Entry(settings_frame, textvariable=self.interval_var, width=10)
         interval_entry.pack(side=tk.LEFT, padx=(0, 20))
         
+        # Late tick policy setting
+        ttk.Label(settings_frame, text="Late Ticks:").pack(side=tk.LEFT, padx=(0, 5))
+        self.policy_var = tk.StringVar(value=scheduler.CATCH_UP)
+        policy_combo = ttk.Combobox(settings_frame, textvariable=self.policy_var, values=scheduler.POLICIES, width=10, state="readonly")
+        policy_combo.pack(side=tk.LEFT, padx=(0, 20))
+        
+        # Batching settings
+        batch_frame = ttk.Frame(auto_frame)
+        batch_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(10, 0))
+        
+        self.batch_enabled_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(batch_frame, text="Batch locations", variable=self.batch_enabled_var).pack(side=tk.LEFT, padx=(0, 20))
+        
+        ttk.Label(batch_frame, text="Flush Window (ms):").pack(side=tk.LEFT, padx=(0, 5))
+        self.batch_window_var = tk.StringVar(value="50")
+        ttk.Entry(batch_frame, textvariable=self.batch_window_var, width=10).pack(side=tk.LEFT, padx=(0, 20))
+        
+        ttk.Label(batch_frame, text="Max Points:").pack(side=tk.LEFT, padx=(0, 5))
+        self.batch_size_var = tk.StringVar(value="10")
+        ttk.Entry(batch_frame, textvariable=self.batch_size_var, width=10).pack(side=tk.LEFT, padx=(0, 20))
+        
         # Control buttons frame
         control_frame = ttk.Frame(auto_frame)
         control_frame.grid(row=1, column=0, columnspan=2, pady=(10, 0))
@@ -267,19 +486,83 @@ class WebSocketReactClient:
         self.auto_status_label = ttk.Label(control_frame, text="Stopped", foreground="red")
         self.auto_status_label.pack(side=tk.LEFT, padx=(20, 0))
         
+        # Achieved rate and jitter
+        self.rate_label = ttk.Label(control_frame, text="")
+        self.rate_label.pack(side=tk.LEFT, padx=(20, 0))
+        
         # Bind mouse events for hold functionality
         self.hold_btn.bind("<Button-1>", self.on_hold_start)
         self.hold_btn.bind("<ButtonRelease-1>", self.on_hold_stop)
         
+    def setup_route_playback_frame(self, parent):
+        """Setup route playback frame"""
+        playback_frame = ttk.LabelFrame(parent, text="Route Playback", padding="10")
+        playback_frame.grid(row=4, column=0, sticky=(tk.W, tk.E), pady=(0, 10))
+        playback_frame.columnconfigure(1, weight=1)
+        
+        # Settings frame
+        settings_frame = ttk.Frame(playback_frame)
+        settings_frame.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E))
+        
+        ttk.Label(settings_frame, text="Speed (m/s):").pack(side=tk.LEFT, padx=(0, 5))
+        self.playback_speed_var = tk.StringVar(value="5")
+        ttk.Entry(settings_frame, textvariable=self.playback_speed_var, width=10).pack(side=tk.LEFT, padx=(0, 20))
+        
+        ttk.Label(settings_frame, text="Send Rate (Hz):").pack(side=tk.LEFT, padx=(0, 5))
+        self.playback_rate_var = tk.StringVar(value="10")
+        ttk.Entry(settings_frame, textvariable=self.playback_rate_var, width=10).pack(side=tk.LEFT, padx=(0, 20))
+        
+        self.playback_loop_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(settings_frame, text="Loop", variable=self.playback_loop_var).pack(side=tk.LEFT)
+        
+        # Control buttons frame
+        control_frame = ttk.Frame(playback_frame)
+        control_frame.grid(row=1, column=0, columnspan=2, pady=(10, 0))
+        
+        self.playback_btn = ttk.Button(control_frame, text="Play Route", command=self.start_route_playback, state=tk.DISABLED)
+        self.playback_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.playback_stop_btn = ttk.Button(control_frame, text="Stop", command=self.stop_route_playback, state=tk.DISABLED)
+        self.playback_stop_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.playback_status_label = ttk.Label(control_frame, text="Stopped", foreground="red")
+        self.playback_status_label.pack(side=tk.LEFT, padx=(20, 0))
+        
+        # Route file upload (sent in chunks)
+        upload_frame = ttk.Frame(playback_frame)
+        upload_frame.grid(row=2, column=0, columnspan=2, pady=(10, 0))
+        
+        self.upload_route_btn = ttk.Button(upload_frame, text="Upload Route File...", command=self.toggle_route_upload)
+        self.upload_route_btn.pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Label(upload_frame, text="Chunk size:").pack(side=tk.LEFT, padx=(0, 5))
+        self.upload_chunk_var = tk.StringVar(value=str(route_upload.DEFAULT_CHUNK_SIZE))
+        ttk.Entry(upload_frame, textvariable=self.upload_chunk_var, width=8).pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Label(upload_frame, text="Chunks/s:").pack(side=tk.LEFT, padx=(0, 5))
+        self.upload_rate_var = tk.StringVar(value=f"{route_upload.DEFAULT_CHUNK_RATE:g}")
+        ttk.Entry(upload_frame, textvariable=self.upload_rate_var, width=6).pack(side=tk.LEFT, padx=(0, 10))
+        
+        ttk.Label(upload_frame, text="Simplify (m):").pack(side=tk.LEFT, padx=(0, 5))
+        self.upload_tolerance_var = tk.StringVar(value="0")
+        ttk.Entry(upload_frame, textvariable=self.upload_tolerance_var, width=6).pack(side=tk.LEFT, padx=(0, 10))
+        
+        self.upload_compress_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(upload_frame, text="Compress chunks", variable=self.upload_compress_var).pack(side=tk.LEFT)
+        
+        self.upload_status_label = ttk.Label(upload_frame, text="")
+        self.upload_status_label.pack(side=tk.LEFT, padx=(20, 0))
+        
     def setup_messages_log_frame(self, parent):
         log_frame = ttk.LabelFrame(parent, text="WebSocket Messages (React Hook Behavior)", padding="10")
-        log_frame.grid(row=4, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        log_frame.grid(row=5, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         log_frame.columnconfigure(0, weight=1)
         log_frame.rowconfigure(0, weight=1)
         
-        # Messages text area
-        self.messages_text = scrolledtext.ScrolledText(log_frame, height=20, state=tk.DISABLED)
-        self.messages_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        # Messages view (bounded log, only the visible entries are rendered)
+        self.message_log = MessageLog()
+        self.messages_view = LogView(log_frame, self.message_log, height=20)
+        self.messages_view.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
         
         # Control buttons
         control_frame = ttk.Frame(log_frame)
@@ -288,10 +571,88 @@ class WebSocketReactClient:
         self.clear_btn = ttk.Button(control_frame, text="Clear Log", command=self.clear_messages)
         self.clear_btn.pack(side=tk.LEFT)
         
+        self.export_btn = ttk.Button(control_frame, text="Export Log", command=self.export_messages)
+        self.export_btn.pack(side=tk.LEFT, padx=(10, 0))
+        
+        # Per-category switches; muted categories are dropped before any formatting
+        self.categories_btn = ttk.Menubutton(control_frame, text="Categories")
+        self.categories_btn.pack(side=tk.LEFT, padx=(10, 0))
+        categories_menu = tk.Menu(self.categories_btn, tearoff=False)
+        self.categories_btn["menu"] = categories_menu
+        self.category_vars = {}
+        for message_type in LOG_COLORS:
+            var = tk.BooleanVar(value=True)
+            self.category_vars[message_type] = var
+            categories_menu.add_checkbutton(
+                label=message_type,
+                variable=var,
+                command=lambda message_type=message_type: self.toggle_log_category(message_type)
+            )
+        
+        # Capture and replay
+        self.capture_btn = ttk.Button(control_frame, text="Start Capture", command=self.toggle_capture)
+        self.capture_btn.pack(side=tk.LEFT, padx=(10, 0))
+        
+        self.replay_btn = ttk.Button(control_frame, text="Replay Capture", command=self.toggle_replay)
+        self.replay_btn.pack(side=tk.LEFT, padx=(10, 0))
+        
+        self.replay_speed_var = tk.StringVar(value="1x")
+        replay_speed_combo = ttk.Combobox(control_frame, textvariable=self.replay_speed_var, values=("1x", "10x", "100x", "max"), width=6, state="readonly")
+        replay_speed_combo.pack(side=tk.LEFT, padx=(5, 0))
+        
+        # Received message dispatch: per type switches, robot filter and stats
+        dispatch_frame = ttk.Frame(log_frame)
+        dispatch_frame.grid(row=2, column=0, sticky=(tk.W, tk.E), pady=(5, 0))
+        
+        self.types_btn = ttk.Menubutton(dispatch_frame, text="Message Types")
+        self.types_btn.pack(side=tk.LEFT)
+        types_menu = tk.Menu(self.types_btn, tearoff=False)
+        self.types_btn["menu"] = types_menu
+        self.message_type_vars = {}
+        for msg_type, label in (("robot_location", "robot_location"), ("location_batch", "location_batch"),
+                                ("robot_status", "robot_status"), ("pong", "pong"), (OTHER, "other types")):
+            var = tk.BooleanVar(value=True)
+            self.message_type_vars[msg_type] = var
+            types_menu.add_checkbutton(
+                label=label,
+                variable=var,
+                command=lambda msg_type=msg_type: self.toggle_message_type(msg_type)
+            )
+            
+        ttk.Label(dispatch_frame, text="Only robots:").pack(side=tk.LEFT, padx=(10, 5))
+        self.robot_filter_var = tk.StringVar()
+        robot_filter_entry = ttk.Entry(dispatch_frame, textvariable=self.robot_filter_var, width=25)
+        robot_filter_entry.pack(side=tk.LEFT)
+        robot_filter_entry.bind("<Return>", self.apply_robot_filter)
+        robot_filter_entry.bind("<FocusOut>", self.apply_robot_filter)
+        
+        ttk.Button(dispatch_frame, text="Dispatch Stats", command=self.show_dispatch_stats).pack(side=tk.LEFT, padx=(10, 0))
+        
+        self.profile_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(dispatch_frame, text="Profile", variable=self.profile_var,
+                        command=self.toggle_profiling).pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Button(dispatch_frame, text="Profile Report", command=self.show_profile_report).pack(side=tk.LEFT, padx=(5, 0))
+        
+        ttk.Label(dispatch_frame, text="Locate robot:").pack(side=tk.LEFT, padx=(10, 5))
+        self.locate_robot_var = tk.StringVar()
+        locate_entry = ttk.Entry(dispatch_frame, textvariable=self.locate_robot_var, width=15)
+        locate_entry.pack(side=tk.LEFT)
+        locate_entry.bind("<Return>", self.locate_robot)
+        ttk.Button(dispatch_frame, text="Locate", command=self.locate_robot).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Button(dispatch_frame, text="Nearby", command=self.show_nearby_robots).pack(side=tk.LEFT, padx=(5, 0))
+        
+        self.robots_label = ttk.Label(dispatch_frame, text="Robots: 0")
+        self.robots_label.pack(side=tk.RIGHT)
+        
         # Message counter
         self.message_count_label = ttk.Label(control_frame, text="Messages: 0")
         self.message_count_label.pack(side=tk.RIGHT)
         
+        # Outbound queue depth and drop counts
+        self.queue_label = ttk.Label(control_frame, text="Queue: 0")
+        self.queue_label.pack(side=tk.RIGHT, padx=(0, 20))
+        self.update_queue_label()
+        
         self.message_count = 0
         
     def calculate_direction(self, lat1, lng1, lat2, lng2):
@@ -299,26 +660,33 @@ class WebSocketReactClient:
         if lat1 is None or lng1 is None or lat2 is None or lng2 is None:
             return self.current_direction
             
-        # Convert to radians
-        lat1_rad = math.radians(lat1)
-        lat2_rad = math.radians(lat2)
-        delta_lng = math.radians(lng2 - lng1)
+        return protocol.calculate_direction(lat1, lng1, lat2, lng2)
         
-        # Calculate bearing
-        y = math.sin(delta_lng) * math.cos(lat2_rad)
-        x = math.cos(lat1_rad) * math.sin(lat2_rad) - math.sin(lat1_rad) * math.cos(lat2_rad) * math.cos(delta_lng)
+    def create_direction_items(self):
+        """Create the direction indicator's canvas items once"""
+        # Canvas center
+        center_x, center_y = 50, 50
         
-        bearing = math.atan2(y, x)
-        bearing_degrees = math.degrees(bearing)
+        # Draw center pin first (larger and more prominent)
+        pin_size = 6
+        self.direction_canvas.create_oval(center_x-pin_size, center_y-pin_size, center_x+pin_size, center_y+pin_size, fill="black", outline="darkgray", width=2)
         
-        # Normalize to 0-360 degrees
-        bearing_degrees = (bearing_degrees + 360) % 360
+        # Triangle starting from the center pin; update_direction_indicator moves its points
+        self.direction_triangle = self.direction_canvas.create_polygon(center_x, center_y, center_x, center_y, center_x, center_y, center_x, center_y, fill="red", outline="darkred", width=2)
+        self.drawn_direction = None
         
-        return bearing_degrees
+        # Draw compass directions
+        self.direction_canvas.create_text(50, 10, text="N", font=("Arial", 10, "bold"))
+        self.direction_canvas.create_text(90, 50, text="E", font=("Arial", 10, "bold"))
+        self.direction_canvas.create_text(50, 90, text="S", font=("Arial", 10, "bold"))
+        self.direction_canvas.create_text(10, 50, text="W", font=("Arial", 10, "bold"))
         
     def update_direction_indicator(self):
-        """Update the triangular direction indicator on canvas"""
-        self.direction_canvas.delete("all")
+        """Point the triangular direction indicator at the current direction"""
+        direction = self.current_direction
+        if direction == self.drawn_direction:
+            return
+        self.drawn_direction = direction
         
         # Canvas center
         center_x, center_y = 50, 50
@@ -328,11 +696,7 @@ class WebSocketReactClient:
         
         # Convert direction to radians (0 degrees = North, but canvas 0 degrees = East)
         # So we need to adjust: canvas_angle = (direction - 90) % 360
-        canvas_angle = math.radians((self.current_direction - 90) % 360)
-        
-        # Draw center pin first (larger and more prominent)
-        pin_size = 6
-        self.direction_canvas.create_oval(center_x-pin_size, center_y-pin_size, center_x+pin_size, center_y+pin_size, fill="black", outline="darkgray", width=2)
+        canvas_angle = math.radians((direction - 90) % 360)
         
         # Calculate triangle points starting from the center pin
         # Point 1: front of triangle (pointing in direction) - starts from center
@@ -347,14 +711,7 @@ class WebSocketReactClient:
         x3 = center_x + (triangle_size * 0.7) * math.cos(canvas_angle - math.radians(120))
         y3 = center_y + (triangle_size * 0.7) * math.sin(canvas_angle - math.radians(120))
         
-        # Draw triangle starting from center pin
-        self.direction_canvas.create_polygon(center_x, center_y, x1, y1, x2, y2, x3, y3, fill="red", outline="darkred", width=2)
-        
-        # Draw compass directions
-        self.direction_canvas.create_text(50, 10, text="N", font=("Arial", 10, "bold"))
-        self.direction_canvas.create_text(90, 50, text="E", font=("Arial", 10, "bold"))
-        self.direction_canvas.create_text(50, 90, text="S", font=("Arial", 10, "bold"))
-        self.direction_canvas.create_text(10, 50, text="W", font=("Arial", 10, "bold"))
+        self.direction_canvas.coords(self.direction_triangle, center_x, center_y, x1, y1, x2, y2, x3, y3)
         
     def set_manual_direction(self):
         """Set direction manually from input field"""
@@ -362,8 +719,7 @@ class WebSocketReactClient:
             direction = float(self.manual_direction_var.get())
             self.current_direction = direction % 360
             self.manual_direction_set = True  # Mark as manually set
-            self.update_direction_indicator()
-            self.update_direction_label()
+            self.render_loop.mark_dirty("direction")
             self.log_message("INFO", f"🧭 Direction manually set to {self.current_direction:.1f}° (will not auto-calculate)")
         except ValueError:
             messagebox.showerror("Invalid Input", "Please enter a valid number for direction")
@@ -374,8 +730,7 @@ class WebSocketReactClient:
         self.manual_direction_set = False  # Reset manual flag
         self.last_lat = None
         self.last_lng = None
-        self.update_direction_indicator()
-        self.update_direction_label()
+        self.render_loop.mark_dirty("direction")
         self.log_message("INFO", "🧭 Direction reset to North (0°) - auto-calculation enabled")
         
     def update_direction_label(self):
@@ -389,13 +744,48 @@ class WebSocketReactClient:
         closest_direction = min(direction_names.keys(), key=lambda x: abs(x - self.current_direction))
         direction_name = direction_names[closest_direction]
         
-        self.direction_label.config(text=f"{self.current_direction:.1f}° ({direction_name})")
+        self.set_label_text(self.direction_label, f"{self.current_direction:.1f}° ({direction_name})")
         
         # Update mode indicator
         if self.manual_direction_set:
-            self.direction_mode_label.config(text="Manual", foreground="red")
+            self.set_label_text(self.direction_mode_label, "Manual", foreground="red")
         else:
-            self.direction_mode_label.config(text="Auto", foreground="blue")
+            self.set_label_text(self.direction_mode_label, "Auto", foreground="blue")
+            
+    def draw_direction(self):
+        self.update_direction_indicator()
+        self.update_direction_label()
+        
+    def draw_position(self):
+        """Show the latest auto-increment/playback position in the location fields"""
+        if self.display_position is None:
+            return
+        lat, lng = self.display_position
+        self.rendered_lat_text = f"{lat:.6f}"
+        self.lat_var.set(self.rendered_lat_text)
+        if lng is not None:
+            self.lng_var.set(f"{lng:.6f}")
+            
+    def draw_playback_status(self):
+        if self.playback_active and self.route_playback:
+            self.set_label_text(self.playback_status_label, f"Playing ({self.route_playback.progress * 100:.0f}%)", foreground="green")
+            
+    def draw_message_count(self):
+        self.set_label_text(self.message_count_label, f"Messages: {self.message_count}")
+        
+    def set_label_text(self, label, text, **options):
+        """Reconfigure a label only when its text changed"""
+        if self.label_texts.get(label) != text:
+            self.label_texts[label] = text
+            label.config(text=text, **options)
+            
+    def set_render_fps(self, event=None):
+        """Apply the UI FPS selection"""
+        try:
+            self.render_loop.set_fps(int(self.render_fps_var.get()))
+        except ValueError:
+            return
+        self.log_message("INFO", f"🖼️ UI refresh capped at {self.render_loop.fps} FPS")
         
     def on_hold_start(self, event):
         """Start auto-increment when button is pressed"""
@@ -421,16 +811,37 @@ class WebSocketReactClient:
             self.log_message("ERROR", "❌ Invalid step size or interval")
             return
             
+        self.location_batcher = None
+        if self.batch_enabled_var.get():
+            try:
+                self.location_batcher = LocationBatcher(
+                    flush_window=float(self.batch_window_var.get()) / 1000.0,
+                    max_points=int(self.batch_size_var.get())
+                )
+            except ValueError:
+                self.log_message("ERROR", "❌ Invalid batch window or size")
+                return
+            
+        if self.send_interval <= 0:
+            self.log_message("ERROR", "❌ Send interval must be greater than 0")
+            return
+            
+        try:
+            self.auto_increment_lat = float(self.lat_var.get())
+            self.auto_increment_lng = float(self.lng_var.get())
+        except ValueError:
+            self.log_message("ERROR", "❌ Invalid latitude value")
+            return
+            
+        self.auto_increment_scheduler = scheduler.FixedRateScheduler(self.send_interval, policy=self.policy_var.get())
         self.auto_increment_active = True
         self.auto_status_label.config(text="Moving North", foreground="green")
         self.hold_btn.config(state=tk.DISABLED)
         self.stop_btn.config(state=tk.NORMAL)
         
-        self.log_message("INFO", f"🚀 Started auto-increment: step={self.increment_step}, interval={self.send_interval}s")
+        self.log_message("INFO", f"🚀 Started auto-increment: step={self.increment_step}, interval={self.send_interval}s, late ticks={self.policy_var.get()}")
         
-        # Start auto-increment thread
-        self.auto_increment_thread = threading.Thread(target=self.auto_increment_loop, daemon=True)
-        self.auto_increment_thread.start()
+        self.auto_increment_task = self.loop.spawn(self.auto_increment_loop())
         
     def stop_auto_increment(self):
         """Stop auto-incrementing latitude"""
@@ -438,66 +849,169 @@ class WebSocketReactClient:
             return
             
         self.auto_increment_active = False
+        if self.auto_increment_task:
+            self.auto_increment_task.cancel()
+            self.auto_increment_task = None
         self.auto_status_label.config(text="Stopped", foreground="red")
         self.hold_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
         
         self.log_message("INFO", "🛑 Stopped auto-increment")
-        
-    def auto_increment_loop(self):
-        """Auto-increment loop that runs in a separate thread"""
-        while self.auto_increment_active and self.connected:
-            try:
-                # Get current latitude
-                current_lat = float(self.lat_var.get())
-                
-                # Increment latitude
-                new_lat = current_lat + self.increment_step
-                
-                # Update the UI
-                self.root.after(0, lambda: self.lat_var.set(f"{new_lat:.6f}"))
-                
-                # Send location update
-                self.send_location_auto()
-                
-                # Wait for next iteration
-                time.sleep(self.send_interval)
-                
-            except ValueError:
-                self.log_message("ERROR", "❌ Invalid latitude value")
-                break
-            except Exception as e:
-                self.log_message("ERROR", f"❌ Auto-increment error: {e}")
-                break
+        if self.location_batcher:
+            self.flush_location_batch(force=True)
+            self.log_message("INFO", f"📦 Sent {self.location_batcher.samples} locations in {self.location_batcher.batches} batches")
+        if self.auto_increment_scheduler and self.auto_increment_scheduler.ticks:
+            self.update_rate_label()
+            self.log_message("INFO", f"⏱️ Auto-increment timing: {self.auto_increment_scheduler.summary()}")
+        
+    async def auto_increment_loop(self):
+        """Auto-increment task on the event loop, on a fixed-rate schedule"""
+        await self.auto_increment_scheduler.run_async(self.auto_increment_tick, lambda: self.auto_increment_active)
                 
         # Clean up when loop ends
-        self.root.after(0, self.stop_auto_increment)
+        self.ui.post(self.stop_auto_increment)
         
-    def send_location_auto(self):
-        """Send location data automatically (without logging)"""
+    async def auto_increment_tick(self):
+        """One scheduled auto-increment step; returns False to stop the loop"""
+        if not (self.auto_increment_active and self.outbound_ready()):
+            return False
+            
         try:
-            lat = float(self.lat_var.get())
-            lng = float(self.lng_var.get())
+            # Continue from our own position; on_location_field_edited moves it when the fields are edited
+            new_lat = self.auto_increment_lat + self.increment_step
+            self.auto_increment_lat = new_lat
+            
+            # The render loop shows it on its next frame
+            self.display_position = (new_lat, None)
+            self.render_loop.mark_dirty("position")
+            
+            # Send location update
+            self.send_location_auto(new_lat, self.auto_increment_lng)
+            
+            # Refresh the rate display about once a second
+            ticks_per_second = max(1, int(round(1.0 / self.send_interval)))
+            if self.auto_increment_scheduler.ticks % ticks_per_second == 0:
+                self.render_loop.mark_dirty("rate")
+                
+        except Exception as e:
+            self.ui.post(self.log_message, "ERROR", f"❌ Auto-increment error: {e}")
+            return False
+            
+    def on_location_field_edited(self, *args):
+        """Latitude/longitude typed in while auto-increment runs: it moves on from there (Tk thread)"""
+        lat_text = self.lat_var.get()
+        try:
+            if lat_text != self.rendered_lat_text:
+                self.auto_increment_lat = float(lat_text)
+            self.auto_increment_lng = float(self.lng_var.get())
+        except ValueError:
+            pass  # Half-typed numbers; the position stays where it was
+            
+    def update_rate_label(self):
+        """Show the achieved send rate and jitter of the auto-increment loop"""
+        if not self.auto_increment_scheduler:
+            return
+        stats = self.auto_increment_scheduler.stats()
+        self.set_label_text(self.rate_label, f"{stats['rate_hz']:.1f} Hz, jitter p95 {stats['jitter_p95_ms']:.2f}ms, dropped {stats['dropped']}")
+        
+    def get_route_geometry(self):
+        """Segment lengths and bearings of the current route (computed once per route)"""
+        if self.route_geometry is None or self.route_geometry_source is not self.route_waypoints:
+            self.route_geometry = RouteGeometry(self.route_waypoints)
+            self.route_geometry_source = self.route_waypoints
+        return self.route_geometry
+        
+    def start_route_playback(self):
+        """Start driving the client along the current route"""
+        if not self.connected:
+            self.log_message("WARNING", "⚠️ Not connected - cannot start route playback")
+            return
+            
+        if self.playback_active or self.auto_increment_active:
+            self.log_message("WARNING", "⚠️ Stop the running movement before starting route playback")
+            return
+            
+        try:
+            speed = float(self.playback_speed_var.get())
+            rate = float(self.playback_rate_var.get())
+            if rate <= 0:
+                raise ValueError("rate must be positive")
+            self.route_playback = RoutePlayback(self.get_route_geometry(), speed, loop=self.playback_loop_var.get())
+        except ValueError as e:
+            self.log_message("ERROR", f"❌ Invalid playback settings: {e}")
+            return
+            
+        self.playback_scheduler = scheduler.FixedRateScheduler(1.0 / rate)
+        self.playback_active = True
+        self.set_label_text(self.playback_status_label, "Playing", foreground="green")
+        self.playback_btn.config(state=tk.DISABLED)
+        self.playback_stop_btn.config(state=tk.NORMAL)
+        
+        geometry = self.route_playback.geometry
+        self.log_message("INFO", f"🛣️ Started route playback: {len(geometry)} segments, {geometry.total_length:.0f}m at {speed}m/s ({self.route_playback.duration:.1f}s), {rate}Hz")
+        
+        self.playback_task = self.loop.spawn(self.route_playback_loop())
+        
+    def stop_route_playback(self):
+        """Stop route playback"""
+        if not self.playback_active:
+            return
             
+        self.playback_active = False
+        if self.playback_task:
+            self.playback_task.cancel()
+            self.playback_task = None
+        self.set_label_text(self.playback_status_label, "Stopped", foreground="red")
+        self.playback_btn.config(state=tk.NORMAL if self.connected else tk.DISABLED)
+        self.playback_stop_btn.config(state=tk.DISABLED)
+        
+        progress = self.route_playback.progress * 100 if self.route_playback else 0
+        self.log_message("INFO", f"🛑 Stopped route playback at {progress:.0f}% ({self.playback_scheduler.summary()})")
+        
+    async def route_playback_loop(self):
+        """Route playback task on the event loop, on a fixed-rate schedule"""
+        await self.playback_scheduler.run_async(self.route_playback_tick, lambda: self.playback_active)
+        
+        # Clean up when loop ends
+        self.ui.post(self.stop_route_playback)
+        
+    async def route_playback_tick(self):
+        """Send the interpolated route position for this tick; returns False when done"""
+        if not (self.playback_active and self.outbound_ready()):
+            return False
+            
+        lat, lng, bearing = self.route_playback.position(self.playback_scheduler.scheduled_elapsed())
+        if not self.manual_direction_set:
+            self.current_direction = bearing
+        self.outbound_queue.put(message_schema.location(lat, lng, self.current_direction))
+        self.last_lat = lat
+        self.last_lng = lng
+        
+        # The render loop reflects the position on its next frame
+        self.display_position = (lat, lng)
+        self.render_loop.mark_dirty("position", "direction", "playback")
+        return not self.route_playback.finished
+        
+    def send_location_auto(self, lat, lng):
+        """Send location data automatically (without logging; event loop)"""
+        try:
             # Calculate direction only if not manually set and we have previous location
             if not self.manual_direction_set and self.last_lat is not None and self.last_lng is not None:
                 new_direction = self.calculate_direction(self.last_lat, self.last_lng, lat, lng)
                 self.current_direction = new_direction
-                self.root.after(0, self.update_direction_indicator)
-                self.root.after(0, self.update_direction_label)
-            
-            location_message = {
-                "type": "location",
-                "data": {
-                    "lat": lat,
-                    "lng": lng,
-                    "direction": self.current_direction,
-                    "timestamp": datetime.now().isoformat() + "Z"
-                }
-            }
-            
-            if self.ws and self.connected:
-                self.ws.send(json.dumps(location_message))
+                self.render_loop.mark_dirty("direction")
+            
+            if self.location_batcher:
+                batch = self.location_batcher.add(lat, lng, self.current_direction)
+                if batch:
+                    self.send_location_batch(batch)
+                else:
+                    self.schedule_batch_flush()
+            else:
+                location_message = message_schema.location(lat, lng, self.current_direction)
+                
+                if self.outbound_ready():
+                    self.outbound_queue.put(location_message)
                 
             # Store current location for next direction calculation
             self.last_lat = lat
@@ -506,7 +1020,36 @@ class WebSocketReactClient:
         except ValueError:
             pass  # Silently handle invalid values during auto-increment
         except Exception as e:
-            self.root.after(0, lambda: self.log_message("ERROR", f"❌ Auto-send error: {e}"))
+            self.ui.post(self.log_message, "ERROR", f"❌ Auto-send error: {e}")
+        
+    def schedule_batch_flush(self):
+        """Make sure a pending batch is sent when its flush window expires (event loop)"""
+        if self.batch_timer is not None:
+            return
+        delay = self.location_batcher.next_flush_in()
+        if delay is None:
+            return
+        self.batch_timer = asyncio.get_running_loop().call_later(delay, self.batch_flush_due)
+        
+    def batch_flush_due(self):
+        self.batch_timer = None
+        self.flush_location_batch()
+        
+    def flush_location_batch(self, force=False):
+        """Send the pending location batch if its window expired (or unconditionally with force)"""
+        batcher = self.location_batcher
+        if not batcher:
+            return
+        batch = batcher.flush() if force else batcher.flush_if_due()
+        if batch:
+            self.send_location_batch(batch)
+        elif batcher.pending:
+            self.schedule_batch_flush()
+            
+    def send_location_batch(self, batch):
+        """Queue a location_batch frame (without logging)"""
+        if self.outbound_ready():
+            self.outbound_queue.put(batch)
         
     def set_location(self, lat, lng):
         """Set latitude and longitude values and calculate direction"""
@@ -514,8 +1057,7 @@ class WebSocketReactClient:
         if not self.manual_direction_set and self.last_lat is not None and self.last_lng is not None:
             new_direction = self.calculate_direction(self.last_lat, self.last_lng, lat, lng)
             self.current_direction = new_direction
-            self.update_direction_indicator()
-            self.update_direction_label()
+            self.render_loop.mark_dirty("direction")
             self.log_message("INFO", f"🧭 Direction auto-calculated: {self.current_direction:.1f}°")
         
         # Update location
@@ -536,19 +1078,11 @@ class WebSocketReactClient:
             if not self.manual_direction_set and self.last_lat is not None and self.last_lng is not None:
                 new_direction = self.calculate_direction(self.last_lat, self.last_lng, lat, lng)
                 self.current_direction = new_direction
-                self.update_direction_indicator()
-                self.update_direction_label()
+                self.render_loop.mark_dirty("direction")
                 self.log_message("INFO", f"🧭 Direction auto-calculated: {self.current_direction:.1f}°")
             
-            location_message = {
-                "type": "location",
-                "data": {
-                    "lat": lat,
-                    "lng": lng,
-                    "direction": self.current_direction,
-                    "timestamp": datetime.now().isoformat() + "Z"
-                }
-            }
+            location_message = message_schema.location(lat, lng, self.current_direction)
+            location_message.encode()  # Validate before queueing
             
             self.send_message(location_message)
             direction_source = "manual" if self.manual_direction_set else "auto-calculated"
@@ -558,65 +1092,106 @@ class WebSocketReactClient:
             self.last_lat = lat
             self.last_lng = lng
             
+        except message_schema.SchemaError as e:
+            self.log_message("ERROR", f"❌ Invalid location: {e}")
+            messagebox.showerror("Invalid Input", f"Location is out of range: {e}")
         except ValueError:
             messagebox.showerror("Invalid Input", "Please enter valid latitude and longitude numbers")
             
     def send_status(self):
         """Send status data to WebSocket server"""
-        status_message = {
-            "type": "status",
-            "data": {
-                "battery": 85,
-                "speed": 2.5,
-                "mode": "autonomous",
-                "timestamp": datetime.now().isoformat() + "Z"
-            }
-        }
+        status_message = message_schema.status()
         
         self.send_message(status_message)
         self.log_message("SENT", f"📊 Sent status update")
         
     def send_ping(self):
         """Send ping to WebSocket server"""
-        ping_message = {
-            "type": "ping",
-            "timestamp": datetime.now().isoformat() + "Z"
-        }
+        ping_message = message_schema.ping(self.ping_tracker.next_ping(manual=True))
         
         self.send_message(ping_message)
         self.log_message("SENT", f"🏓 Sent ping")
         
     def send_route_waypoints(self):
         """Send route waypoints to WebSocket server"""
-        route_message = {
-            "type": "route_waypoints",
-            "action": "send_route",
-            "data": {
-                "waypoints": [
-                    { "lat": 37.7749, "lng": -122.4194 },
-                    { "lat": 37.7755, "lng": -122.4200 },
-                    { "lat": 37.7760, "lng": -122.4190 },
-                    { "lat": 37.7750, "lng": -122.4180 },
-                    { "lat": 37.7740, "lng": -122.4185 },
-                    { "lat": 37.7735, "lng": -122.4195 },
-                    { "lat": 37.7745, "lng": -122.4205 },
-                    { "lat": 37.7755, "lng": -122.4210 },
-                    { "lat": 37.7765, "lng": -122.4205 },
-                    { "lat": 37.7770, "lng": -122.4195 }
-                ],
-                "routeName": "Robot Generated Route",
-                "routeType": "delivery",
-                "totalStops": 10,
-                "startLocation": "Warehouse",
-                "endLocation": "Final Destination"
-            },
-            "timestamp": datetime.now().isoformat() + "Z",
-            "source": "robot"
-        }
+        route_message = message_schema.route_waypoints()
         
         self.send_message(route_message)
         self.log_message("SENT", f"🗺️ Sent route waypoints (10 stops)")
         
+    def toggle_route_upload(self):
+        """Pick a GPX/CSV route file and send it in chunks, or stop the running upload"""
+        if self.route_upload:
+            self.route_upload_stop.set()
+            return
+        if not self.outbound_ready():
+            self.log_message("WARNING", "⚠️ Not connected - cannot upload a route")
+            return
+        try:
+            chunk_size = int(self.upload_chunk_var.get())
+            rate = float(self.upload_rate_var.get())
+            tolerance = float(self.upload_tolerance_var.get() or 0)
+        except ValueError:
+            self.log_message("ERROR", "❌ Invalid chunk size, chunk rate or simplify tolerance")
+            return
+        if chunk_size < 1 or rate <= 0:
+            self.log_message("ERROR", "❌ Chunk size and chunk rate must be greater than 0")
+            return
+        if tolerance < 0:
+            self.log_message("ERROR", "❌ Simplify tolerance must not be negative")
+            return
+        path = filedialog.askopenfilename(title="Upload route", filetypes=route_upload.FILE_TYPES)
+        if not path:
+            return
+            
+        self.route_upload = route_upload.RouteUpload(path, chunk_size=chunk_size, rate=rate,
+                                                     compress=self.upload_compress_var.get(), tolerance_m=tolerance)
+        self.route_upload_stop.clear()
+        self.upload_route_btn.config(text="Stop Upload")
+        self.set_label_text(self.upload_status_label, "Simplifying route..." if tolerance else "Counting waypoints...")
+        self.loop.spawn(self.route_upload_loop(self.route_upload))
+        
+    async def route_upload_loop(self, upload):
+        """Count (in the executor, it reads the whole file), then stream the route file into the outbound queue"""
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, upload.prepare)
+            simplified = f" (simplified from {upload.source_stops} at {upload.tolerance_m:g}m)" if upload.tolerance_m else ""
+            self.ui.post(self.log_message, "SENT", f"🗺️ Uploading {upload.route_name}: {upload.total_stops} waypoints{simplified} in {upload.total_chunks} chunks (route {upload.route_id})")
+            completed = await upload.run_async(
+                self.outbound_queue.put,
+                lambda: not self.route_upload_stop.is_set(),
+                ready=self.route_upload_ready,
+                progress=self.route_upload_progress
+            )
+        except (OSError, ValueError) as err:
+            # message_schema.SchemaError is a ValueError
+            self.ui.post(self.log_message, "ERROR", f"❌ Route upload failed: {err}")
+            completed = False
+        self.ui.post(self.finish_route_upload, upload, completed)
+        
+    def route_upload_ready(self):
+        """Whether the next chunk may be queued: waits while the queue is backed up, gives up once offline for good"""
+        if not self.outbound_ready():
+            self.route_upload_stop.set()
+            return False
+        return self.outbound_queue.depth < self.route_upload_queued
+        
+    def route_upload_progress(self, upload):
+        text = f"{upload.chunks_sent}/{upload.total_chunks} chunks"
+        self.ui.post(self.set_label_text, self.upload_status_label, text)
+        
+    def finish_route_upload(self, upload, completed):
+        self.route_upload = None
+        self.upload_route_btn.config(text="Upload Route File...")
+        if completed:
+            self.log_message("SENT", f"🗺️ Uploaded {upload.route_name}: {upload.summary()}")
+            self.set_label_text(self.upload_status_label, f"Sent {upload.total_chunks} chunks")
+        elif upload.started is not None:
+            self.log_message("WARNING", f"⚠️ Route upload stopped: {upload.summary()}")
+            self.set_label_text(self.upload_status_label, "Stopped")
+        else:
+            self.set_label_text(self.upload_status_label, "Failed")
+        
     def send_location_update(self):
         """Send location update in the specified format using current input values"""
         try:
@@ -628,20 +1203,12 @@ class WebSocketReactClient:
             if not self.manual_direction_set and self.last_lat is not None and self.last_lng is not None:
                 new_direction = self.calculate_direction(self.last_lat, self.last_lng, lat, lng)
                 self.current_direction = new_direction
-                self.update_direction_indicator()
-                self.update_direction_label()
+                self.render_loop.mark_dirty("direction")
                 self.log_message("INFO", f"🧭 Direction auto-calculated: {self.current_direction:.1f}°")
             
             # Create location update message using current input values
-            location_update_message = {
-                "type": "location_track",
-                "data": {
-                    "lat": lat,                    # From latitude input field
-                    "lng": lng,                    # From longitude input field
-                    "direction": self.current_direction,  # Current direction value
-                    "timestamp": datetime.now().isoformat() + "Z"
-                }
-            }
+            location_update_message = message_schema.location_track(lat, lng, self.current_direction)
+            location_update_message.encode()  # Validate before queueing
             
             self.send_message(location_update_message)
             direction_source = "manual" if self.manual_direction_set else "auto-calculated"
@@ -651,6 +1218,9 @@ class WebSocketReactClient:
             self.last_lat = lat
             self.last_lng = lng
             
+        except message_schema.SchemaError as e:
+            self.log_message("ERROR", f"❌ Invalid location update: {e}")
+            messagebox.showerror("Invalid Input", f"Location is out of range: {e}")
         except ValueError as e:
             self.log_message("ERROR", f"❌ Invalid input values - lat: '{self.lat_var.get()}', lng: '{self.lng_var.get()}'")
             messagebox.showerror("Invalid Input", "Please enter valid latitude and longitude numbers")
@@ -673,18 +1243,15 @@ class WebSocketReactClient:
                 return
             
             # Create icon pin message using current input values
-            icon_pin_message = {
-                "type": "icon_pin",
-                "data": {
-                    "lat": lat,                    # From latitude input field
-                    "lng": lng,                    # From longitude input field
-                    "type": icon_type          # From icon type input field
-                }
-            }
+            icon_pin_message = message_schema.icon_pin(lat, lng, icon_type)
+            icon_pin_message.encode()  # Validate before queueing
             
             self.send_message(icon_pin_message)
             self.log_message("SENT", f"📍 Sent icon pin: lat={lat}, lng={lng}, iconType={icon_type}")
             
+        except message_schema.SchemaError as e:
+            self.log_message("ERROR", f"❌ Invalid icon pin: {e}")
+            messagebox.showerror("Invalid Input", f"Invalid icon pin: {e}")
         except ValueError as e:
             self.log_message("ERROR", f"❌ Invalid input values - lat: '{self.lat_var.get()}', lng: '{self.lng_var.get()}'")
             messagebox.showerror("Invalid Input", "Please enter valid latitude and longitude numbers")
@@ -695,59 +1262,112 @@ class WebSocketReactClient:
     def send_message(self, message):
         """Send message to WebSocket server"""
         if self.ws and self.connected:
-            try:
-                self.ws.send(json.dumps(message))
-                self.log_message("SENT", f"⬆️ Sent: {json.dumps(message, indent=2)}")
-            except Exception as e:
-                self.log_message("ERROR", f"❌ Failed to send message: {e}")
+            self.outbound_queue.put(message)
+            self.log_message("SENT", "⬆️ Sent: ", message)
+        elif self.reconnect_pending:
+            # Held in the outbox and sent once the connection is back
+            self.outbound_queue.put(message)
+            self.log_message("SENT", f"📦 Offline - queued ({self.outbound_queue.depth} waiting): ", message)
         else:
             self.log_message("WARNING", "⚠️ Not connected - cannot send message")
         
-    def log_message(self, message_type, content):
-        """Log a message to the text area with timestamp and color coding"""
+    async def send_frame(self, message):
+        """Send a message with the negotiated wire codec (JSON unless the server accepted binary)
+        
+        Only called by the send writer; everything else goes through outbound_queue.
+        """
+        msg_type = message_schema.message_type(message)
+        if self.wire_codec == wire_codec.CODEC_BINARY and msg_type in wire_codec.BINARY_TYPES:
+            frame = message_schema.to_binary(message)  # bytes: sent as a binary frame
+        else:
+            frame = message_schema.to_json(message)
+        if msg_type == "ping":
+            self.ping_tracker.mark_sent(message_schema.field(message, "seq"))
+        started = time.perf_counter()
+        await self.ws.send(frame)
+        self.metrics.observe("send_seconds", time.perf_counter() - started)
+        self.metrics.inc("messages_sent_total", type=msg_type)
+        self.metrics.inc("bytes_sent_total", len(frame), type=msg_type)
+        if self.capture_writer:
+            self.capture_writer.record(capture.OUTBOUND, frame)
+        
+    def log_message(self, message_type, content, payload=None):
+        """Append a message to the bounded log; the view redraws on the next idle cycle
+        
+        payload is stored as-is and only pretty-printed when the entry is displayed.
+        """
+        if not self.message_log.is_enabled(message_type):
+            return
+            
         timestamp = datetime.now().strftime("%H:%M:%S")
         
-        # Color coding
-        colors = {
-            "SUCCESS": "darkgreen",
-            "ERROR": "red",
-            "INFO": "purple",
-            "WARNING": "orange",
-            "DIAGNOSTIC": "darkblue",
-            "CONNECTED": "darkgreen",
-            "DISCONNECTED": "red",
-            "RECEIVED": "green",
-            "ROBOT_LOCATION": "green",
-            "ROBOT_STATUS": "darkgreen",
-            "SENT": "blue",
-            "RAW_MESSAGE": "black",
-            "PARSED_MESSAGE": "darkblue"
-        }
+        self.message_log.append(LogEntry(timestamp, message_type, content, payload))
+        self.messages_view.refresh()
         
-        log_entry = f"[{timestamp}] {message_type}: {content}\n"
+        # Update counter
+        self.message_count += 1
+        self.render_loop.mark_dirty("message_count")
         
-        self.messages_text.config(state=tk.NORMAL)
-        self.messages_text.insert(tk.END, log_entry)
         
-        # Apply color
-        if message_type in colors:
-            start = self.messages_text.index(tk.END + "-2l")
-            end = self.messages_text.index(tk.END + "-1l")
-            self.messages_text.tag_add(message_type, start, end)
-            self.messages_text.tag_config(message_type, foreground=colors[message_type])
+    def get_ssl_context(self):
+        """Client SSL context honouring the skip-verification setting, rebuilt only when it changes"""
+        verify = not self.skip_ssl_verification.get()
+        if self.ssl_context is None or self.ssl_context_verify != verify:
+            self.ssl_context = tls_session.client_context(verify=verify)
+            self.ssl_context_verify = verify
+        return self.ssl_context
         
-        self.messages_text.config(state=tk.DISABLED)
-        self.messages_text.see(tk.END)
+    def probe_endpoints(self, connect=False):
+        """Measure handshake time and RTT of every configured endpoint in the background
         
-        # Update counter
-        self.message_count += 1
-        self.message_count_label.config(text=f"Messages: {self.message_count}")
+        With connect=True the fastest endpoint that answered is connected to afterwards.
+        """
+        if self.endpoint_probe_active:
+            return
+        self.endpoint_probe_active = True
+        self.probe_btn.config(state=tk.DISABLED)
+        self.endpoint_manager.set_urls(self.endpoints_var.get().split(","))
+        ssl_context = self.get_ssl_context()
+        self.log_message("DIAGNOSTIC", f"📶 Probing {len(self.endpoint_manager.urls)} endpoints...")
+        
+        async def run():
+            ranked = await self.endpoint_manager.probe_all_async(ssl_context=ssl_context)
+            self.ui.post(self.finish_endpoint_probe, ranked, connect)
+            
+        self.loop.spawn(run())
         
+    def finish_endpoint_probe(self, ranked, connect):
+        self.endpoint_probe_active = False
+        self.probe_btn.config(state=tk.NORMAL)
+        self.log_message("DIAGNOSTIC", f"📶 Endpoints: {self.endpoint_manager.summary()}", ranked)
+        if not connect:
+            return
+        best = self.endpoint_manager.best()
+        if best is None:
+            self.log_message("WARNING", f"⚠️ No endpoint answered the probe - trying {self.url_var.get().strip()}")
+        self.open_connection(best)
         
     def connect(self):
-        """Connect to WebSocket server (matching React hook behavior)"""
+        """Connect to WebSocket server (matching React hook behavior)
+        
+        With endpoint selection on, the endpoints are probed first and the fastest one is used.
+        """
+        self.disconnect_requested = False
+        self.failover_enabled = self.auto_endpoint_var.get()
+        self.failover_attempts = 0
+        if self.failover_enabled:
+            self.probe_endpoints(connect=True)
+        else:
+            self.open_connection()
+            
+    def open_connection(self, url=None):
+        """Open the WebSocket to url (default: the URL field)"""
+        if url:
+            self.set_url(url)
         # Update server URL before connecting
         self.update_server_url()
+        self.binary_requested = self.prefer_binary.get() or wire_codec.url_requests_binary(self.server_url)
+        self.auto_ping_enabled = self.auto_ping_var.get()
         
         self.log_message("DIAGNOSTIC", f"🔍 Connecting to: {self.server_url}")
         self.log_message("INFO", "📡 Starting WebSocket connection (React hook behavior)...")
@@ -758,29 +1378,14 @@ class WebSocketReactClient:
             # Create SSL context for WSS connections
             ssl_context = None
             if self.server_url.startswith('wss://'):
-                ssl_context = ssl.create_default_context()
+                ssl_context = self.get_ssl_context()
                 if self.skip_ssl_verification.get():
                     self.log_message("WARNING", "⚠️ SSL certificate verification disabled (development mode)")
-                    ssl_context.check_hostname = False
-                    ssl_context.verify_mode = ssl.CERT_NONE
                 else:
                     self.log_message("INFO", "🔒 SSL certificate verification enabled")
             
-            # Create WebSocket connection
-            self.ws = websocket.WebSocketApp(
-                self.server_url,
-                on_open=self.on_open,
-                on_message=self.on_message,
-                on_error=self.on_error,
-                on_close=self.on_close
-            )
-            
-            # Start connection in a separate thread with SSL context
-            self.connection_thread = threading.Thread(
-                target=lambda: self.ws.run_forever(sslopt={"context": ssl_context} if ssl_context else {})
-            )
-            self.connection_thread.daemon = True
-            self.connection_thread.start()
+            # Connect on the event loop
+            self.connection_task = self.loop.spawn(self.run_connection(self.server_url, ssl_context))
             
         except Exception as e:
             self.log_message("ERROR", f"❌ Connection failed: {str(e)}")
@@ -788,79 +1393,349 @@ class WebSocketReactClient:
             self.update_error_display()
             messagebox.showerror("Connection Error", f"Failed to connect: {str(e)}")
             
+    async def run_connection(self, url, ssl_context):
+        """One connection on the event loop: open, hand every frame to on_message, then on_close"""
+        ws = None
+        close_reason = None
+        self.connect_started = time.perf_counter()
+        try:
+            async with websockets.connect(url, ssl=ssl_context, ping_interval=None, compression=None,
+                                          max_size=None) as ws:
+                self.ws = ws
+                self.on_open(ws)
+                async for event_data in ws:
+                    self.on_message(ws, event_data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            close_reason = str(e) or type(e).__name__
+            self.on_error(ws, e)
+        self.on_close(ws, ws.close_code if ws else None, close_reason or (ws.close_reason if ws else None))
+        
     def disconnect(self):
         """Disconnect from WebSocket server"""
         if self.ws:
-            self.ws.close()
+            self.disconnect_requested = True
+            self.outbound_queue.clear()
+            self.cancel_reconnect()
+            self.loop.spawn(self.ws.close())
             self.log_message("INFO", "🔌 Disconnection requested")
             
+    def cancel_reconnect(self):
+        if self.reconnect_timeout is not None:
+            self.loop.call(self.reconnect_timeout.cancel)
+            self.reconnect_timeout = None
+            
     def on_open(self, ws):
         """WebSocket connection opened (matching React hook)"""
         self.connected = True
         self.error = None
         self.reconnect_attempts = 0
-        self.root.after(0, self.update_connection_ui)
-        self.root.after(0, lambda: self.log_message("CONNECTED", f"🔗 WebSocket connected to {self.server_url}"))
-        self.root.after(0, lambda: self.log_message("INFO", "🌐 Connected as web client (like React hook)"))
-        self.root.after(0, lambda: self.log_message("INFO", "👂 Listening for broadcasted messages..."))
+        self.failover_attempts = 0
+        self.reconnect_pending = False
+        self.endpoint_manager.mark_connected(self.server_url)
+        ssl_object = ws.transport.get_extra_info("ssl_object")
+        self.last_handshake = tls_session.handshake_timings(ssl_object, self.connect_started, time.perf_counter())
+        if self.ssl_context is not None:
+            self.ssl_context.save_session_from(ssl_object)  # Resumed by the next reconnect
+        self.metrics.inc("connections_total")
+        self.metrics.observe("handshake_seconds", self.last_handshake["total_ms"] / 1000)
+        if self.disconnected_at is not None:
+            self.metrics.inc("reconnects_total")
+            self.metrics.observe("reconnect_seconds", time.perf_counter() - self.disconnected_at)
+            self.disconnected_at = None
+        self.wire_codec = wire_codec.CODEC_JSON
+        # Messages kept from a dropped connection go out first
+        pending = self.outbound_queue.depth
+        self.outbound_queue.reopen()
+        if self.binary_requested:
+            # Offer the binary codec; stay on JSON until the server acknowledges it
+            self.outbound_queue.put(wire_codec.hello_message())
+        self.send_writer = AsyncSendWriter(self.outbound_queue, self.send_frame, on_error=self.on_send_error,
+                                           backlog=pending, backlog_rate=self.outbox_flush_rate)
+        asyncio.ensure_future(self.send_writer.run())
+        self.ping_tracker.reset_connection()
+        if self.auto_ping_enabled:
+            self.ping_task = asyncio.ensure_future(self.ping_sampler_loop())
+        self.ui.post(self.update_connection_ui)
+        self.ui.post(self.log_message, "CONNECTED", f"🔗 WebSocket connected to {self.server_url}")
+        handshake = self.last_handshake
+        self.ui.post(self.log_message, "DIAGNOSTIC", f"🤝 Handshake {tls_session.describe_timings(handshake)}", handshake)
+        self.ui.post(self.log_message, "INFO", "🌐 Connected as web client (like React hook)")
+        self.ui.post(self.log_message, "INFO", "👂 Listening for broadcasted messages...")
+        if pending:
+            self.ui.post(self.log_message, "INFO", f"📤 Flushing {pending} messages queued while disconnected (up to {self.outbox_flush_rate:.0f}/s)")
         
     def on_message(self, ws, event_data):
         """WebSocket message received (matching React hook behavior)"""
-        try:
-            # Parse the message (matching React hook)
-            message = json.loads(event_data)
+        received_at = time.perf_counter()
+        if self.capture_writer:
+            self.capture_writer.record(capture.INBOUND, event_data)
+        message = self.dispatch_frame(self.dispatcher, event_data)
+        if message is not None:
             self.last_message = message
+        self.record_received(event_data, message, received_at)
+        
+    def dispatch_frame(self, dispatcher, event_data):
+        """Hand a frame to its handler; returns the message, or None if skipped or unreadable (logged)"""
+        try:
+            # Disabled types are dropped before parsing; the rest go to their handler
+            return dispatcher.dispatch(event_data)
+        except wire_codec.WireCodecError as err:
+            self.ui.post(self.log_message, "ERROR", f"❌ Error decoding binary WebSocket message: {err}")
+        except message_schema.SchemaError as err:
+            self.ui.post(self.log_message, "WARNING", f"⚠️ Ignored invalid WebSocket message: {err}")
+        except json.JSONDecodeError as err:
+            self.ui.post(self.log_message, "ERROR", f"❌ Error parsing WebSocket message: {err}")
+            self.ui.post(self.log_message, "ERROR", f"❌ Raw data: {event_data}")
+        except Exception as err:
+            # A handler failed on this frame: log it and keep the connection (the dispatcher counted it)
+            msg_type = peek(event_data)[0] or "unknown"
+            self.ui.post(self.log_message, "ERROR", f"❌ Error handling {msg_type} message: {err!r}")
+        return None
+        
+    def record_received(self, frame, message, received_at):
+        """Count a received frame, and time it from arrival until its handler returned"""
+        if message is not None:
+            msg_type = message_schema.message_type(message)
+            self.metrics.observe("receive_to_handle_seconds", time.perf_counter() - received_at, type=msg_type)
+        else:
+            # Skipped before decoding, or not decodable
+            msg_type = peek(frame)[0] or "unknown"
+        self.metrics.inc("messages_received_total", type=msg_type)
+        self.metrics.inc("bytes_received_total", len(frame), type=msg_type)
+        
+    def setup_dispatcher(self):
+        """Register a handler per received message type (matching React hook switch statement)"""
+        self.dispatcher = MessageDispatcher()
+        self.dispatcher.register("codec_ack", self.handle_codec_ack)
+        self.dispatcher.register("robot_location", self.handle_robot_location)
+        self.dispatcher.register("location_batch", self.handle_location_batch)
+        self.dispatcher.register("pong", self.handle_pong)
+        self.dispatcher.register("robot_status", self.handle_robot_status)
+        self.dispatcher.register(OTHER, self.handle_other)
+        
+    def setup_replay_dispatcher(self):
+        """Dispatcher for replayed frames: robot states and the log only, so a capture never
+        sends, switches the codec, answers pings or counts as received traffic"""
+        dispatcher = MessageDispatcher()
+        dispatcher.register("codec_ack", self.log_received)
+        dispatcher.register("robot_location", self.handle_robot_location)
+        dispatcher.register("location_batch", self.handle_location_batch)
+        dispatcher.register("pong", self.log_received)
+        dispatcher.register("robot_status", self.handle_robot_status)
+        dispatcher.register(OTHER, self.log_received)
+        # Same Types menu and robot filter as live traffic
+        dispatcher.disabled = self.dispatcher.disabled
+        dispatcher.robot_filter = self.dispatcher.robot_filter
+        return dispatcher
+        
+    def log_received(self, message):
+        """Log the message once (like React hook console.log)"""
+        if self.message_log.is_enabled("RECEIVED"):
+            self.ui.post(self.log_message, "RECEIVED", "📨 Received WebSocket message: ", message)
             
-            # Log the message once (like React hook console.log)
-            self.root.after(0, lambda: self.log_message("RECEIVED", f"📨 Received WebSocket message: {json.dumps(message, indent=2)}"))
-            
-            # Handle different message types (matching React hook switch statement)
-            msg_type = message.get('type', 'unknown')
+    def handle_codec_ack(self, message):
+        codec = wire_codec.accepted_codec(message)
+        if self.binary_requested:
+            self.wire_codec = codec
+        self.ui.post(self.log_message, "INFO", f"🧬 Server selected wire codec: {self.wire_codec}")
+        
+    def handle_robot_location(self, message):
+        robot_id = message.get('robotId')
+        data = message.get('data', {})
+        if robot_id is not None:
+            self.robot_states.update_location(robot_id, data.get('lat'), data.get('lng'), data.get('direction'))
+        self.log_received(message)
+        if self.message_log.is_enabled("ROBOT_LOCATION"):
+            robot_id = message.get('robotId', 'unknown')
+            self.ui.post(self.log_message, "ROBOT_LOCATION", f"📍 Robot {robot_id} location: ", data)
             
-            if msg_type == 'robot_location':
-                robot_id = message.get('robotId', 'unknown')
-                data = message.get('data', {})
-                self.root.after(0, lambda: self.log_message("ROBOT_LOCATION", f"📍 Robot {robot_id} location: {json.dumps(data, indent=2)}"))
-            elif msg_type == 'robot_status':
-                robot_id = message.get('robotId', 'unknown')
-                data = message.get('data', {})
-                self.root.after(0, lambda: self.log_message("ROBOT_STATUS", f"📊 Robot {robot_id} status: {json.dumps(data, indent=2)}"))  
-            else:
-                self.root.after(0, lambda: self.log_message("INFO", f"📨 Other message type '{msg_type}': {json.dumps(message, indent=2)}"))
-                if message.get('command') == 'sendlocation':
-                    self.send_location()
+    def handle_location_batch(self, message):
+        robot_id = message.get('robotId')
+        points = message.get('data', {}).get('points')
+        if robot_id is not None and points:
+            latest = points[-1]
+            self.robot_states.update_location(robot_id, latest.get('lat'), latest.get('lng'), latest.get('direction'))
+        self.log_received(message)
+        if self.message_log.is_enabled("ROBOT_LOCATION"):
+            for location in protocol.unpack_location_batch(message):
+                robot_id = location.get('robotId', 'unknown')
+                data = location['data']
+                self.ui.post(self.log_message, "ROBOT_LOCATION", f"📍 Robot {robot_id} location: ", data)
                 
-        except json.JSONDecodeError as err:
-            self.root.after(0, lambda: self.log_message("ERROR", f"❌ Error parsing WebSocket message: {err}"))
-            self.root.after(0, lambda: self.log_message("ERROR", f"❌ Raw data: {event_data}"))
+    def handle_pong(self, message):
+        self.log_received(message)
+        result = self.ping_tracker.on_pong(message.get('seq'))
+        if result and result[1] and self.message_log.is_enabled("INFO"):
+            rtt = result[0]
+            self.ui.post(self.log_message, "INFO", f"🏓 Pong #{message.get('seq', '?')}: RTT {rtt * 1000:.1f}ms")
+            
+    def handle_robot_status(self, message):
+        robot_id = message.get('robotId')
+        data = message.get('data', {})
+        if robot_id is not None:
+            self.robot_states.update_status(robot_id, data)
+        self.log_received(message)
+        if self.message_log.is_enabled("ROBOT_STATUS"):
+            robot_id = message.get('robotId', 'unknown')
+            self.ui.post(self.log_message, "ROBOT_STATUS", f"📊 Robot {robot_id} status: ", data)
+            
+    def handle_other(self, message):
+        self.log_received(message)
+        msg_type = message.get('type', 'unknown')
+        if self.message_log.is_enabled("INFO"):
+            self.ui.post(self.log_message, "INFO", f"📨 Other message type '{msg_type}': ", message)
+        if message.get('command') == 'sendlocation':
+            # send_location reads the location fields and logs, so it runs on the Tk thread
+            self.ui.post(self.send_location)
+            
+    def toggle_message_type(self, msg_type):
+        """Enable or skip a received message type from the Types menu"""
+        self.dispatcher.set_enabled(msg_type, self.message_type_vars[msg_type].get())
+        
+    def apply_robot_filter(self, event=None):
+        """Only handle messages from the robots listed in the filter field (empty = all)"""
+        robot_ids = [robot_id.strip() for robot_id in self.robot_filter_var.get().split(",") if robot_id.strip()]
+        if set(robot_ids) == (self.dispatcher.robot_filter or set()):
+            return
+        self.dispatcher.set_robot_filter(robot_ids)
+        if robot_ids:
+            self.log_message("INFO", f"🔎 Only handling messages from: {', '.join(robot_ids)}")
+        else:
+            self.log_message("INFO", "🔎 Handling messages from all robots")
+            
+    def locate_robot(self, event=None):
+        """Log the latest known state of the robot named in the locate field"""
+        robot_id = self.locate_robot_var.get().strip()
+        if not robot_id:
+            return
+        state = self.get_robot_state(robot_id)
+        if state is None:
+            self.log_message("WARNING", f"⚠️ Robot {robot_id} has not been seen in the last {self.robot_states.stale_after:.0f}s")
+            return
+        position = f"{state['lat']}, {state['lng']}" if state['lat'] is not None else "unknown position"
+        self.log_message("INFO", f"🤖 Robot {robot_id}: {position}, seen {state['age_s']:.1f}s ago", state)
+        
+    def show_nearby_robots(self):
+        """Log the robots nearest the position in the send fields"""
+        try:
+            lat = float(self.lat_var.get())
+            lng = float(self.lng_var.get())
+        except ValueError:
+            self.log_message("ERROR", f"❌ Invalid input values - lat: '{self.lat_var.get()}', lng: '{self.lng_var.get()}'")
+            return
+        nearby = self.find_robots_near(lat, lng, self.nearby_count)
+        if not nearby:
+            self.log_message("INFO", "🧭 No robots seen nearby")
+            return
+        summary = ", ".join(f"{state['robotId']} {state['distance_m']:.0f}m @ {state['bearing']:.0f}°" for state in nearby)
+        self.log_message("INFO", f"🧭 Nearest to {lat:.6f}, {lng:.6f}: {summary}", nearby)
+        
+    def find_robots_near(self, lat, lng, k=5, max_distance_m=None):
+        """Latest state of the k robots nearest a point, with distance_m and bearing from it"""
+        return self.robot_states.nearest(lat, lng, k, max_distance_m)
+        
+    def find_robots_within(self, lat, lng, radius_m):
+        """Latest state of every robot within radius_m of a point, nearest first"""
+        return self.robot_states.within(lat, lng, radius_m)
+        
+    def get_robot_state(self, robot_id):
+        """Latest position, direction and status of a robot (None if unknown)"""
+        return self.robot_states.get(robot_id)
+        
+    def get_robot_snapshot(self, max_age=None):
+        """Latest state of every known robot, most recently seen first"""
+        return self.robot_states.snapshot(max_age)
+        
+    def show_dispatch_stats(self):
+        """Log per type counters and handler timings"""
+        self.log_message("INFO", f"📊 Dispatch: {self.dispatcher.summary()}", self.dispatcher.stats())
         
     def on_error(self, ws, error):
         """WebSocket error occurred (matching React hook)"""
-        self.root.after(0, lambda: self.log_message("ERROR", f"❌ WebSocket error: {error}"))
+        self.ui.post(self.log_message, "ERROR", f"❌ WebSocket error: {error}")
         self.error = "WebSocket connection error"
-        self.root.after(0, self.update_error_display)
+        self.ui.post(self.update_error_display)
+        
+    async def ping_sampler_loop(self):
+        """Send a sequenced ping every ping_interval seconds and reconnect if the link degrades"""
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            if not (self.connected and self.ws):
+                break
+            self.ping_tracker.expire()
+            if self.ping_tracker.is_degraded():
+                stats = self.ping_tracker.stats()
+                self.ui.post(self.log_message, "WARNING", f"⚠️ Link degraded (RTT p95 {stats['p95_ms']:.0f}ms, {self.ping_tracker.consecutive_losses} lost pongs) - reconnecting")
+                self.ping_tracker.reset_connection()
+                # on_close schedules the reconnect with the usual backoff
+                await self.ws.close()
+                break
+            self.outbound_queue.put(message_schema.ping(self.ping_tracker.next_ping()))
+            
+    def get_latency_stats(self):
+        """Round-trip latency statistics: count, p50/p95/p99/max/mean in ms, sent, lost"""
+        return self.ping_tracker.stats()
+        
+    def on_send_error(self, error, message):
+        """A queued message could not be sent (called by the send writer)"""
+        if not self.connected or isinstance(error, websockets.ConnectionClosed):
+            # The connection went away mid-send: keep the message for the next one
+            self.outbound_queue.requeue(message)
+            return
+        self.ui.post(self.log_message, "ERROR", f"❌ Failed to send {message_schema.message_type(message)}: {error}")
         
     def on_close(self, ws, close_status_code, close_msg):
         """WebSocket connection closed (matching React hook with reconnection)"""
         self.connected = False
-        self.root.after(0, self.update_connection_ui)
-        self.root.after(0, lambda: self.log_message("DISCONNECTED", "🔌 WebSocket disconnected"))
-        
-        # Stop auto-increment if running
-        self.root.after(0, self.stop_auto_increment)
+        self.wire_codec = wire_codec.CODEC_JSON
+        # Keep queued messages for the next connection; the writer exits
+        self.outbound_queue.hold()
+        if self.send_writer:
+            self.send_writer.stop()
+            self.send_writer = None
+        # Until reconnecting gives up, senders keep queueing into the outbox
+        self.reconnect_pending = not self.disconnect_requested
+        if self.reconnect_pending and self.disconnected_at is None:
+            self.disconnected_at = time.perf_counter()
+            self.metrics.inc("disconnects_total")
+        if self.ping_task:
+            self.ping_task.cancel()
+            self.ping_task = None
+        self.ui.post(self.update_connection_ui)
+        self.ui.post(self.log_message, "DISCONNECTED", "🔌 WebSocket disconnected")
+        
+        if self.failover_enabled and not self.disconnect_requested and self.failover_attempts < len(self.endpoint_manager.urls):
+            failed_url = self.server_url
+            self.endpoint_manager.record_failure(failed_url, close_msg or "connection closed")
+            fallback = self.endpoint_manager.best(exclude={failed_url})
+            if fallback:
+                # Fail over straight away; the backoff only applies once every endpoint has failed
+                self.failover_attempts += 1
+                self.metrics.inc("reconnect_attempts_total", kind="failover")
+                queued = self.outbound_queue.depth
+                self.ui.post(self.log_message, "WARNING", f"🔀 Failing over from {failed_url} to {fallback} ({queued} messages kept queued)")
+                self.ui.post(self.open_connection, fallback)
+                return
         
         # Attempt to reconnect (matching React hook behavior)
         if self.reconnect_attempts < self.max_reconnect_attempts:
             self.reconnect_attempts += 1
-            delay = min(1000 * (2 ** self.reconnect_attempts), 30000)  # Exponential backoff
-            self.root.after(0, lambda: self.log_message("INFO", f"🔄 Attempting to reconnect in {delay}ms (attempt {self.reconnect_attempts})"))
+            self.metrics.inc("reconnect_attempts_total", kind="backoff")
+            delay = protocol.reconnect_delay_ms(self.reconnect_attempts)  # Exponential backoff
+            self.ui.post(self.log_message, "INFO", f"🔄 Attempting to reconnect in {delay}ms (attempt {self.reconnect_attempts})")
             
-            # Schedule reconnection
-            self.reconnect_timeout = self.root.after(delay, self.connect)
+            # Schedule reconnection; connect reads the settings, so it runs on the Tk thread
+            self.reconnect_timeout = asyncio.get_running_loop().call_later(delay / 1000.0, self.ui.post, self.connect)
         else:
+            # Queued messages stay held (and on disk) for the next manual connect
+            self.reconnect_pending = False
+            self.disconnected_at = None
+            self.ui.post(self.update_connection_ui)
             self.error = "Failed to reconnect to WebSocket server"
-            self.root.after(0, lambda: self.log_message("ERROR", f"❌ {self.error}"))
-            self.root.after(0, self.update_error_display)
+            self.ui.post(self.log_message, "ERROR", f"❌ {self.error}")
+            self.ui.post(self.update_error_display)
         
     def update_connection_ui(self):
         """Update UI based on connection status"""
@@ -876,6 +1751,8 @@ class WebSocketReactClient:
             self.send_location_update_btn.config(state=tk.NORMAL)
             self.send_icon_pin_btn.config(state=tk.NORMAL)
             self.hold_btn.config(state=tk.NORMAL)
+            if not self.playback_active:
+                self.playback_btn.config(state=tk.NORMAL)
         else:
             self.status_label.config(text="Not Connected", foreground="red")
             self.connect_btn.config(state=tk.NORMAL)
@@ -888,9 +1765,150 @@ class WebSocketReactClient:
             self.send_location_update_btn.config(state=tk.DISABLED)
             self.send_icon_pin_btn.config(state=tk.DISABLED)
             self.hold_btn.config(state=tk.DISABLED)
-            # Stop auto-increment if running
-            self.stop_auto_increment()
+            self.playback_btn.config(state=tk.DISABLED)
+            # Stop auto-increment and route playback, unless they keep filling the outbox until the reconnect
+            if not self.reconnect_pending:
+                self.stop_auto_increment()
+                self.stop_route_playback()
+            
+    def update_queue_label(self):
+        """Show outbound queue depth, drop counts, RTT and live robots (refreshed twice a second)
+        
+        How late this runs is how long anything posted to the Tk thread waits: the UI event lag.
+        """
+        now = time.perf_counter()
+        if self.ui_heartbeat_due is not None:
+            self.metrics.observe("ui_event_lag_seconds", max(0.0, now - self.ui_heartbeat_due))
+        self.ui_heartbeat_due = now + 0.5
+        self.robot_states.evict_stale()
+        if not self.connected or not self.outbound_queue.depth:
+            try:
+                self.outbox.save()
+            except OSError as e:
+                self.log_message("ERROR", f"❌ Could not save outbox: {e}")
+                self.outbox.path = None
+                self.persist_outbox_var.set(False)
+        self.set_label_text(self.robots_label, f"Robots: {len(self.robot_states)}")
+        stats = self.outbound_queue.stats()
+        self.set_label_text(self.queue_label, f"Queue: {stats['depth']} (peak {stats['peak_depth']}) | dropped {stats['dropped_total']} | coalesced {stats['coalesced_total']}")
+        self.update_latency_label()
+        self.root.after(500, self.update_queue_label)
+        
+    def setup_metrics(self):
+        """Describe the exported metrics and register the gauges read at scrape time"""
+        for name, kind, help_text in (
+            ("messages_sent_total", metrics.COUNTER, "Messages sent, by type"),
+            ("bytes_sent_total", metrics.COUNTER, "Frame bytes sent (characters for text frames), by type"),
+            ("messages_received_total", metrics.COUNTER, "Frames received, by type"),
+            ("bytes_received_total", metrics.COUNTER, "Frame bytes received (characters for text frames), by type"),
+            ("connections_total", metrics.COUNTER, "Connections opened"),
+            ("disconnects_total", metrics.COUNTER, "Connections lost without a disconnect request"),
+            ("reconnect_attempts_total", metrics.COUNTER, "Reconnects scheduled, by kind (backoff or failover)"),
+            ("reconnects_total", metrics.COUNTER, "Connections restored after a drop"),
+            ("send_seconds", metrics.SUMMARY, "Time spent awaiting ws.send in the asyncio send writer"),
+            ("receive_to_handle_seconds", metrics.SUMMARY, "Frame arrival until its handler returned, by type"),
+            ("handshake_seconds", metrics.SUMMARY, "TCP, TLS and WebSocket upgrade of each connection"),
+            ("reconnect_seconds", metrics.SUMMARY, "Connection drop until the next connection opened"),
+            ("ui_event_lag_seconds", metrics.SUMMARY, "How late the Tk thread ran a timer due twice a second"),
+            ("ui_event_backlog", metrics.GAUGE, "Calls posted to the Tk thread and not run yet"),
+            ("connected", metrics.GAUGE, "1 while connected"),
+            ("outbound_queue_depth", metrics.GAUGE, "Messages waiting for the asyncio send writer (or the reconnect)"),
+            ("outbound_queue_peak_depth", metrics.GAUGE, "Deepest the outbound queue has been"),
+            ("outbound_dropped", metrics.GAUGE, "Outbound messages dropped by the queue policy"),
+            ("robots_tracked", metrics.GAUGE, "Robots in the state store"),
+            ("ui_dirty_widgets", metrics.GAUGE, "Widgets waiting for the next render frame")
+        ):
+            self.metrics.describe(name, kind, help_text)
+        self.metrics.gauge("connected", lambda: int(self.connected))
+        self.metrics.gauge("outbound_queue_depth", lambda: self.outbound_queue.depth)
+        self.metrics.gauge("outbound_queue_peak_depth", lambda: self.outbound_queue.peak_depth)
+        self.metrics.gauge("outbound_dropped", lambda: sum(self.outbound_queue.dropped.values()))
+        self.metrics.gauge("robots_tracked", lambda: len(self.robot_states))
+        self.metrics.gauge("ui_dirty_widgets", self.render_loop.pending)
+        self.metrics.gauge("ui_event_backlog", lambda: self.ui.backlog)
+        
+    def start_metrics(self, port=None, path=None, interval=metrics.DEFAULT_SNAPSHOT_INTERVAL):
+        """Export the metrics as Prometheus text on a localhost port and/or as JSON lines appended to path"""
+        if port is not None:
+            try:
+                self.metrics_server = metrics.MetricsServer(self.metrics, port).start()
+            except OSError as e:
+                self.log_message("ERROR", f"❌ Could not serve metrics on port {port}: {e}")
+            else:
+                self.log_message("INFO", f"📈 Metrics served on {self.metrics_server.url}")
+        if path:
+            self.metrics_writer = metrics.SnapshotWriter(self.metrics, path, interval)
+            self.metrics_writer.start()
+            self.log_message("INFO", f"📈 Metrics snapshot appended to {path} every {interval:g}s")
             
+    def stop_metrics(self):
+        if self.metrics_server:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        if self.metrics_writer:
+            self.metrics_writer.stop()
+            if self.metrics_writer.error:
+                self.log_message("ERROR", f"❌ Could not write metrics snapshots: {self.metrics_writer.error}")
+            self.metrics_writer = None
+        
+    def setup_profiling(self):
+        """Register the hot paths with the profiler; ROBOT_CLIENT_PROFILE starts it right away"""
+        self.profiler.hook(self, "on_message")
+        self.profiler.hook(self, "log_message")
+        self.profiler.hook(self, "update_direction_indicator")
+        self.profiler.hook(json, "dumps", "json.dumps")
+        try:
+            options = profiling.options_from_env()
+        except ValueError as e:
+            self.log_message("ERROR", f"❌ {e}")
+            return
+        if options is not None:
+            self.profile_var.set(True)
+            self.start_profiling(options)
+            
+    def start_profiling(self, options=profiling.EXTRAS):
+        self.profiler.start(cprofile="cprofile" in options, tracemalloc="tracemalloc" in options)
+        extras = ", ".join(option for option in profiling.EXTRAS if option in options) or "timings only"
+        self.log_message("DIAGNOSTIC", f"🔬 Profiling hot paths ({extras})")
+        
+    def toggle_profiling(self):
+        """Start profiling the hot paths, or stop and log the report"""
+        if self.profile_var.get():
+            try:
+                options = profiling.options_from_env()
+            except ValueError:
+                options = None
+            self.start_profiling(profiling.EXTRAS if options is None else options)
+        else:
+            self.profiler.stop()
+            self.show_profile_report()
+            
+    def show_profile_report(self):
+        """Log the hook timings, the top functions and allocations, and dump the cProfile data"""
+        if self.profiler.started is None:
+            self.log_message("INFO", "🔬 Profiling has not been started")
+            return
+        self.log_message("DIAGNOSTIC", f"🔬 Hot paths: {self.profiler.summary()}", self.profiler.report())
+        functions = self.profiler.top_functions()
+        if functions:
+            self.log_message("DIAGNOSTIC", "🔬 Top functions by own time under the hot paths: ", functions)
+            try:
+                self.profiler.dump_stats(profiling.DEFAULT_STATS_PATH)
+                self.log_message("DIAGNOSTIC", f"🔬 cProfile data written to {profiling.DEFAULT_STATS_PATH} (python -m pstats)")
+            except OSError as e:
+                self.log_message("ERROR", f"❌ Could not write {profiling.DEFAULT_STATS_PATH}: {e}")
+        allocations = self.profiler.top_allocations()
+        if allocations:
+            self.log_message("DIAGNOSTIC", "🔬 Allocation growth since profiling started: ", allocations)
+        
+    def update_latency_label(self):
+        """Show the round-trip latency percentiles"""
+        stats = self.ping_tracker.stats()
+        if not stats["count"]:
+            self.set_label_text(self.latency_label, f"RTT: no samples (sent {stats['sent']}, lost {stats['lost']})")
+            return
+        self.set_label_text(self.latency_label, f"RTT: p50 {stats['p50_ms']:.1f}ms | p95 {stats['p95_ms']:.1f}ms | p99 {stats['p99_ms']:.1f}ms | max {stats['max_ms']:.1f}ms ({stats['count']} samples, {stats['lost']} lost)")
+        
     def update_error_display(self):
         """Update error display"""
         if self.error:
@@ -898,26 +1916,135 @@ class WebSocketReactClient:
         else:
             self.error_label.config(text="", foreground="red")
             
+    def toggle_capture(self):
+        """Start or stop streaming all inbound and outbound frames to a capture file"""
+        if self.capture_writer:
+            writer, self.capture_writer = self.capture_writer, None
+            writer.close()
+            self.capture_btn.config(text="Start Capture")
+            self.log_message("INFO", f"💾 Capture stopped: {writer.records} frames, {writer.bytes_written / 1024:.0f} KB written to {writer.path} ({writer.dropped} dropped)")
+            return
+            
+        path = filedialog.asksaveasfilename(
+            title="Capture Traffic To",
+            defaultextension=".rbcap",
+            filetypes=[("Capture files", "*.rbcap"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            self.capture_writer = capture.CaptureWriter(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Capture Error", f"Failed to start capture: {e}")
+            return
+        self.capture_btn.config(text="Stop Capture")
+        self.log_message("INFO", f"💾 Capturing traffic to {path}")
+        
+    def toggle_replay(self):
+        """Replay the inbound frames of a capture into the robot states and log, or stop a running replay"""
+        if self.replay_active:
+            self.replay_stop.set()
+            return
+            
+        path = filedialog.askopenfilename(
+            title="Replay Capture",
+            filetypes=[("Capture files", "*.rbcap"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            reader = capture.CaptureReader(path)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Replay Error", f"Failed to open capture: {e}")
+            return
+            
+        speed_text = self.replay_speed_var.get()
+        speed = None if speed_text == "max" else float(speed_text.rstrip("x"))
+        self.replay_stop.clear()
+        self.replay_active = True
+        self.replay_btn.config(text="Stop Replay")
+        self.log_message("INFO", f"⏯️ Replaying {len(reader)} captured frames from {path} at {speed_text}")
+        self.loop.spawn(self.replay_loop(reader, speed))
+        
+    async def replay_loop(self, reader, speed):
+        """Feed captured inbound frames to the replay dispatcher, on the event loop"""
+        started = time.monotonic()
+        count = 0
+        dispatcher = self.setup_replay_dispatcher()
+        try:
+            count = await capture.replay(
+                reader.records(direction=capture.INBOUND),
+                lambda frame: self.dispatch_frame(dispatcher, frame),
+                speed=speed,
+                is_running=lambda: not self.replay_stop.is_set()
+            )
+        except Exception as err:
+            self.ui.post(self.log_message, "ERROR", f"❌ Replay failed: {err}")
+        finally:
+            reader.close()
+            # Always, so the Replay button comes back even when the capture is broken
+            self.ui.post(self.finish_replay, count, time.monotonic() - started)
+        
+    def finish_replay(self, count, elapsed):
+        self.replay_active = False
+        self.replay_btn.config(text="Replay Capture")
+        rate = count / elapsed if elapsed > 0 else 0
+        self.log_message("INFO", f"⏹️ Replay finished: {count} frames in {elapsed:.1f}s ({rate:.0f} frames/s)")
+        
+    def toggle_log_category(self, message_type):
+        """Enable or mute a log category from the Categories menu"""
+        self.message_log.set_enabled(message_type, self.category_vars[message_type].get())
+        
+    def export_messages(self):
+        """Export the retained log entries to a text file"""
+        path = filedialog.asksaveasfilename(
+            title="Export Log",
+            defaultextension=".log",
+            filetypes=[("Log files", "*.log"), ("Text files", "*.txt"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        try:
+            self.message_log.export(path)
+            self.log_message("SUCCESS", f"💾 Exported {len(self.message_log)} log entries to {path}")
+        except OSError as e:
+            messagebox.showerror("Export Error", f"Failed to export log: {e}")
+            
     def clear_messages(self):
         """Clear the messages log"""
-        self.messages_text.config(state=tk.NORMAL)
-        self.messages_text.delete(1.0, tk.END)
-        self.messages_text.config(state=tk.DISABLED)
+        self.message_log.clear()
+        self.messages_view.refresh()
         self.message_count = 0
-        self.message_count_label.config(text="Messages: 0")
+        self.render_loop.mark_dirty("message_count")
 
-def main():
+def main(metrics_port=None, metrics_file=None, metrics_interval=metrics.DEFAULT_SNAPSHOT_INTERVAL):
     root = tk.Tk()
     app = WebSocketReactClient(root)
+    app.start_metrics(metrics_port, metrics_file, metrics_interval)
     
     # Handle window closing
     def on_closing():
         if app.auto_increment_active:
             app.stop_auto_increment()
+        if app.playback_active:
+            app.stop_route_playback()
+        if app.capture_writer:
+            app.toggle_capture()
+        app.replay_stop.set()
+        app.route_upload_stop.set()
+        app.render_loop.stop()
+        app.stop_metrics()
+        app.profiler.stop()
+        if not app.connected:
+            try:
+                app.outbox.save()
+            except OSError:
+                pass
         if app.connected and app.ws:
             app.disconnect()
-        if app.reconnect_timeout:
-            root.after_cancel(app.reconnect_timeout)
+        app.cancel_reconnect()
+        app.loop.stop()
+        app.ui.stop()
         root.destroy()
         
     root.protocol("WM_DELETE_WINDOW", on_closing)